@@ -0,0 +1,117 @@
+"""Per-worker throughput of concurrent requests, blocking vs. offloaded I/O.
+
+Drives the real FastAPI app in-process with a Supabase stand-in whose
+``execute()`` sleeps for a fixed network latency. "before" runs each query
+inline on the event loop (the old behaviour); "after" uses
+``db.asyncdb.execute``.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async_io --requests 200 --concurrency 50 --latency 0.02
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+import main
+
+USER_ROW = {
+    "id": "user123",
+    "email": "test@bu.edu",
+    "full_name": "Test User",
+    "role": "student",
+    "registrations": [{"event_id": 1}],
+    "created_events": 1,
+}
+EVENT_ROW = {
+    "id": 1,
+    "name": "Pizza Night",
+    "description": "Free pizza",
+    "location_name": "GSU",
+    "start_time": "2030-01-01T18:00:00+00:00",
+    "end_time": "2030-01-01T20:00:00+00:00",
+    "created_at": "2029-12-01T00:00:00+00:00",
+    "quantity_left": 10,
+}
+
+
+class StubQuery:
+    """Accepts any builder chain; ``execute()`` blocks for ``latency`` seconds."""
+
+    def __init__(self, rows, latency):
+        self._rows = rows
+        self._latency = latency
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self._latency)
+        return SimpleNamespace(data=[dict(r) for r in self._rows])
+
+
+class StubSupabase:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def table(self, name):
+        rows = {"users": [USER_ROW], "events": [EVENT_ROW]}.get(name, [])
+        return StubQuery(rows, self.latency)
+
+
+async def blocking_execute(query):
+    return query.execute()
+
+
+async def drive(paths, requests, concurrency):
+    transport = httpx.ASGITransport(app=main.app)
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with sem:
+                resp = await client.get(paths[i % len(paths)])
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return time.perf_counter() - start
+
+
+def run(mode, args):
+    paths = ["/users/user123", "/events/1", "/users/user123/created-events"]
+    patches = [patch("main.supabase", StubSupabase(args.latency))]
+    if mode == "before":
+        patches.append(patch("main.execute", blocking_execute))
+    for p in patches:
+        p.start()
+    try:
+        elapsed = asyncio.run(drive(paths, args.requests, args.concurrency))
+    finally:
+        for p in reversed(patches):
+            p.stop()
+    return elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per round trip")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.latency * 1000:.0f} ms per Supabase round trip")
+    results = {}
+    for mode in ("before", "after"):
+        elapsed = run(mode, args)
+        results[mode] = args.requests / elapsed
+        print(f"  {mode:<6} {elapsed:7.2f} s  {results[mode]:8.1f} req/s")
+    print(f"  speedup x{results['after'] / results['before']:.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
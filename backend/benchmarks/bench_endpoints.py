@@ -0,0 +1,292 @@
+"""Load test of every endpoint against the Supabase stand-in.
+
+Each scenario starts with empty caches, seeds a fresh ``FakeSupabase`` (a
+SQLite database in a temporary directory; users, events with food items,
+registrations), then drives one endpoint in-process at the given
+concurrency and reports throughput and p50/p95/p99 latency. Every Supabase
+round trip sleeps ``--latency`` seconds plus up to ``--jitter`` more, so
+handlers that make more sequential round trips show it.
+
+``--backend sqlite`` runs on the plain SQLite client (db/sqliteclient.py)
+instead, measuring the local storage engine itself; ``--latency`` and
+``--jitter`` do not apply to it.
+
+Results are compared with benchmarks/baselines.json when it was recorded
+with the same settings: a p95 or throughput more than ``--tolerance`` worse
+is flagged and the exit status is 1. So is any response status a scenario
+does not accept, since a failing endpoint is not a fast one. ``--save``
+records new baselines, unless some scenario had unexpected statuses.
+Baselines are machine-dependent; record them on the machine that checks
+them.
+
+Usage (from backend/):
+    python -m benchmarks.bench_endpoints --requests 200 --concurrency 20 --latency 0.01
+    python -m benchmarks.bench_endpoints --only "GET /events" --save
+    python -m benchmarks.bench_endpoints --backend sqlite
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+import main
+from benchmarks.fake_supabase import FakeSupabase
+from db.cache import catalog_cache, user_cache
+from db.sqliteclient import SQLiteClient
+from services import tracing
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+
+USERS = 200
+EVENTS = 400
+FOOD_PER_EVENT = 3
+CAPACITY = 50
+FOODS = [
+    ("Pizza", "gluten, dairy", False, True),
+    ("Falafel", "sesame", True, True),
+    ("Pad Thai", "peanuts, soy", False, False),
+    ("Bagels", "gluten", True, False),
+]
+LOCATIONS = ["GSU", "CAS", "Photonics Center", "Questrom", "CDS"]
+
+
+def user_id(i):
+    return f"user{i % USERS}"
+
+
+def event_id(i):
+    return i % EVENTS + 1
+
+
+def creator_of(event):
+    """Seeded event ``n`` is created by user ``n``."""
+    return user_id(event)
+
+
+def insert_rows(db, table, rows):
+    """Insert ``rows`` without latency; returns them with their ids."""
+    if isinstance(db, FakeSupabase):
+        return db.seed(table, rows)
+    return db.table(table).insert(rows).execute().data
+
+
+def seed(db):
+    now = datetime.now(timezone.utc)
+    insert_rows(db, "users", [
+        {"id": user_id(i), "email": f"student{i}@bu.edu", "full_name": f"Student {i}",
+         "role": "admin" if i == 0 else "student", "created_events": EVENTS // USERS}
+        for i in range(USERS)
+    ])
+    events = insert_rows(db, "events", [
+        {"name": f"Event {n}", "description": f"Free food #{n}", "location_name": LOCATIONS[n % len(LOCATIONS)],
+         "start_time": (now + timedelta(hours=n)).isoformat(), "end_time": (now + timedelta(hours=n + 2)).isoformat(),
+         "quantity_left": CAPACITY, "creator_id": creator_of(n), "creator_name": f"Student {n % USERS}"}
+        for n in range(1, EVENTS + 1)
+    ])
+    insert_rows(db, "food_items", [
+        {"event_id": e["id"], "name": name, "allergy_info": allergens, "is_kosher": kosher, "is_halal": halal}
+        for e in events
+        for name, allergens, kosher, halal in FOODS[e["id"] % len(FOODS):][:FOOD_PER_EVENT]
+    ])
+    # Every user holds a seat at five events
+    insert_rows(db, "registrations", [
+        {"user_id": user_id(i), "event_id": event_id(i * 7 + k)} for i in range(USERS) for k in range(5)
+    ])
+
+
+def new_event(i, creator):
+    start = datetime.now(timezone.utc) + timedelta(days=1, minutes=i)
+    return {
+        "name": f"Bench event {i}", "description": "Leftover catering", "location_name": "GSU",
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+        "capacity": 30, "creator_id": creator, "creator_name": "Bench",
+        "food_items": [{"name": "Pizza", "allergy_info": "gluten", "is_halal": True}],
+    }
+
+
+# name -> (request for the i-th call, accepted status codes). Writes use a
+# different user or event per call so most of them succeed.
+SCENARIOS = {
+    "GET /": (lambda i: ("GET", "/", {}), {200}),
+    "GET /events": (lambda i: ("GET", "/events?limit=50", {}), {200}),
+    "GET /events filtered": (
+        lambda i: ("GET", "/events?window=upcoming&is_halal=true&exclude_allergens=peanuts&location=gsu", {}), {200}),
+    "GET /events/export": (lambda i: ("GET", "/events/export?window=upcoming", {}), {200}),
+    "GET /events/search": (lambda i: ("GET", f"/events/search?q={('piz', 'falafel gsu', 'bagels')[i % 3]}", {}), {200}),
+    "GET /events/facets": (lambda i: ("GET", "/events/facets", {}), {200}),
+    "GET /events/{id}": (lambda i: ("GET", f"/events/{event_id(i)}", {}), {200}),
+    "GET /events/{id}?user_id": (lambda i: ("GET", f"/events/{event_id(i)}?user_id={user_id(i)}", {}), {200}),
+    "GET /users/{id}": (lambda i: ("GET", f"/users/{user_id(i)}", {}), {200}),
+    # NextAuth looks the same few users up on every sign-in
+    "GET /users/{id} repeated": (lambda i: ("GET", f"/users/{user_id(i % 10)}", {}), {200}),
+    "GET /users/{id}/created-events": (lambda i: ("GET", f"/users/{user_id(i)}/created-events", {}), {200}),
+    "GET /users/{id}/interested-events": (lambda i: ("GET", f"/users/{user_id(i)}/interested-events", {}), {200}),
+    "GET /users/{id}/dashboard": (lambda i: ("GET", f"/users/{user_id(i)}/dashboard", {}), {200}),
+    "GET /events/{id}/waitlist/{user}": (
+        lambda i: ("GET", f"/events/{event_id(i)}/waitlist/{user_id(i)}", {}), {200, 404}),
+    "POST /users": (
+        lambda i: ("POST", "/users", {"json": {"id": f"new{i}", "email": f"new{i}@bu.edu", "name": f"New {i}"}}),
+        {200}),
+    "POST /events": (lambda i: ("POST", "/events", {"json": new_event(i, user_id(i))}), {200}),
+    "POST /events/bulk": (
+        lambda i: ("POST", "/events/bulk", {"json": [new_event(i * 10 + k, user_id(i)) for k in range(10)]}), {200}),
+    "PUT /events/{id}": (
+        lambda i: ("PUT", f"/events/{event_id(i)}?user_id={creator_of(event_id(i))}",
+                   {"json": {"description": f"Updated {i}", "capacity": CAPACITY + 1}}), {200}),
+    "POST /events/{id}/register": (
+        lambda i: ("POST", f"/events/{event_id(i)}/register", {"json": {"user_id": user_id(i)}}), {200, 400}),
+    "POST /events/{id}/registrations/{user}": (
+        lambda i: ("POST", f"/events/{event_id(i)}/registrations/{user_id(i)}", {}), {200, 400}),
+    "POST /events/{id}/register/group": (
+        lambda i: ("POST", f"/events/{event_id(i)}/register/group",
+                   {"json": {"user_ids": [user_id(i + k * 37) for k in range(3)]}}), {200, 400}),
+    "POST /events/{id}/unregister": (
+        # User n was seeded into event 7n + 1
+        lambda i: ("POST", f"/events/{event_id(i * 7)}/unregister", {"json": {"user_id": user_id(i)}}), {200, 400}),
+    "POST /events/{id}/waitlist": (
+        lambda i: ("POST", f"/events/{event_id(i)}/waitlist", {"json": {"user_id": user_id(i + 1)}}), {200, 400}),
+    "DELETE /events/{id}/waitlist/{user}": (
+        lambda i: ("DELETE", f"/events/{event_id(i)}/waitlist/{user_id(i)}", {}), {200, 404}),
+    "DELETE /events/{id}": (
+        lambda i: ("DELETE", f"/events/{event_id(i)}?user_id={creator_of(event_id(i))}", {}), {200, 404}),
+    "GET /metrics": (lambda i: ("GET", "/metrics", {}), {200}),
+}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+async def drive(make_request, accepted, requests, concurrency):
+    transport = httpx.ASGITransport(app=main.app)
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    unexpected = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            method, url, kwargs = make_request(i)
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.request(method, url, **kwargs)
+                latencies.append(time.perf_counter() - start)
+            if resp.status_code not in accepted:
+                unexpected[resp.status_code] = unexpected.get(resp.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "unexpected": unexpected,
+    }
+
+
+def run_scenario(name, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        if args.backend == "sqlite":
+            db = SQLiteClient(path)
+        else:
+            db = FakeSupabase(latency=args.latency, jitter=args.jitter, seed=args.seed, path=path)
+        seed(db)
+        catalog_cache.clear()
+        user_cache.clear()
+        main.search_index.clear()
+        make_request, accepted = SCENARIOS[name]
+        trips = []
+        with patch("main.supabase", db), tracing.listen(lambda trace: trips.append(trace.total)):
+            result = asyncio.run(drive(make_request, accepted, args.requests, args.concurrency))
+        db.close()
+    result["round_trips_per_request"] = round(sum(trips) / args.requests, 2)
+    return result
+
+
+def regressions(name, result, baseline, tolerance):
+    found = []
+    if result["p95_ms"] > baseline["p95_ms"] * (1 + tolerance):
+        found.append(f"p95 {baseline['p95_ms']} -> {result['p95_ms']} ms")
+    if result["rps"] < baseline["rps"] / (1 + tolerance):
+        found.append(f"throughput {baseline['rps']} -> {result['rps']} req/s")
+    return found
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("fake", "sqlite"), default="fake")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per Supabase round trip")
+    parser.add_argument("--jitter", type=float, default=0.005, help="extra random seconds per round trip, up to")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="run scenarios whose name contains this text")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, 0.25 = 25%%")
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    parser.add_argument("--save", action="store_true", help="record the results as the new baselines")
+    args = parser.parse_args()
+
+    # Budget and N+1 warnings are expected under load; keep the table readable
+    logging.getLogger("services.tracing").setLevel(logging.ERROR)
+
+    config = {k: getattr(args, k) for k in ("backend", "requests", "concurrency", "latency", "jitter", "seed")}
+    stored = json.loads(args.baselines.read_text()) if args.baselines.exists() else {}
+    baselines = stored.get("results", {}) if stored.get("config") == config else {}
+
+    names = [n for n in SCENARIOS if not args.only or args.only in n]
+    storage = ("local SQLite" if args.backend == "sqlite"
+               else f"{args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms per Supabase round trip")
+    print(f"{args.requests} requests per scenario, concurrency {args.concurrency}, {storage}")
+    if stored and not baselines:
+        print("(baselines were recorded with other settings; not comparing)")
+    print(f"{'scenario':<40} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'trips':>6}")
+
+    results = {}
+    flagged = 0
+    broken = 0
+    for name in names:
+        result = run_scenario(name, args)
+        results[name] = result
+        notes = []
+        if result["unexpected"]:
+            broken += 1
+            notes.append(f"unexpected statuses {result['unexpected']}")
+        if name in baselines:
+            found = regressions(name, result, baselines[name], args.tolerance)
+            flagged += bool(found)
+            notes.extend(f"REGRESSION {r}" for r in found)
+        print(f"{name:<40} {result['rps']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['round_trips_per_request']:>6}" + ("  " + "; ".join(notes) if notes else ""))
+
+    if broken:
+        print(f"{broken} scenario(s) returned unexpected statuses" + ("; baselines not saved" if args.save else ""))
+        sys.exit(1)
+    if args.save:
+        merged = dict(baselines)
+        merged.update({n: {k: r[k] for k in ("rps", "p50_ms", "p95_ms", "p99_ms")} for n, r in results.items()})
+        args.baselines.write_text(json.dumps({"config": config, "results": merged}, indent=2) + "\n")
+        print(f"Saved baselines to {args.baselines}")
+    elif flagged:
+        print(f"{flagged} scenario(s) regressed beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
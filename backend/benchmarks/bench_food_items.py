@@ -0,0 +1,112 @@
+"""Round trips, URL length and latency of loading events with their food items.
+
+Compares three strategies as the number of events grows:
+
+  two-query  events, then one food_items ``in_`` query with every id (old get_events)
+  embedded   one ``select("*, food_items(*)")`` query (current get_events)
+  chunked    events, then ``db.loaders.load_food_items`` (fallback path)
+
+URL lengths come from the real supabase-py query builder (nothing is sent);
+latency comes from a stand-in client that sleeps per round trip.
+
+Usage (from backend/):
+    python -m benchmarks.bench_food_items --sizes 100 1000 10000 --latency 0.02
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from db.asyncdb import execute
+from db.loaders import FOOD_ITEMS_CHUNK_SIZE, chunked, load_food_items
+from db.supabaseclient import supabase as real_client
+
+# Typical proxy/server request-line limits sit around 8 KB; httpx itself
+# refuses query strings over 64 KB.
+URL_LIMIT = 8192
+
+
+def url_length(query) -> int:
+    return len(str(query.request.path)) + 1 + len(str(query.request.params))
+
+
+class StubQuery:
+    def __init__(self, client, rows):
+        self._client = client
+        self._rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self._client.round_trips += 1
+        time.sleep(self._client.latency)
+        return SimpleNamespace(data=self._rows)
+
+
+class StubClient:
+    def __init__(self, n, latency):
+        self.latency = latency
+        self.round_trips = 0
+        self.events = [{"id": i} for i in range(n)]
+        self.food = [{"id": i, "event_id": i, "name": "Pizza"} for i in range(n)]
+
+    def table(self, name):
+        return StubQuery(self, self.events if name == "events" else self.food)
+
+
+async def two_query(client, ids):
+    await execute(client.table("events").select("*"))
+    await execute(client.table("food_items").select("*").in_("event_id", ids))
+
+
+async def embedded(client, ids):
+    await execute(client.table("events").select("*, food_items(*)"))
+
+
+async def chunked_fallback(client, ids):
+    await execute(client.table("events").select("*"))
+    await load_food_items(client, ids)
+
+
+STRATEGIES = {
+    "two-query": (
+        two_query,
+        lambda ids: url_length(real_client.table("food_items").select("*").in_("event_id", ids)),
+    ),
+    "embedded": (
+        embedded,
+        lambda ids: url_length(real_client.table("events").select("*, food_items(*)")),
+    ),
+    "chunked": (
+        chunked_fallback,
+        lambda ids: max(
+            url_length(real_client.table("food_items").select("*").in_("event_id", chunk))
+            for chunk in chunked(ids, FOOD_ITEMS_CHUNK_SIZE)
+        ),
+    ),
+}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per round trip")
+    args = parser.parse_args()
+
+    print(f"{args.latency * 1000:.0f} ms per round trip, chunk size {FOOD_ITEMS_CHUNK_SIZE}")
+    print(f"{'events':>8} {'strategy':<10} {'round trips':>11} {'max URL':>9} {'latency':>9}")
+    for n in args.sizes:
+        ids = list(range(n))
+        for name, (load, max_url) in STRATEGIES.items():
+            client = StubClient(n, args.latency)
+            start = time.perf_counter()
+            asyncio.run(load(client, ids))
+            elapsed = time.perf_counter() - start
+            url = max_url(ids)
+            flag = "  (over limit)" if url > URL_LIMIT else ""
+            print(f"{n:>8} {name:<10} {client.round_trips:>11} {url:>9} {elapsed * 1000:>7.1f}ms{flag}")
+
+
+if __name__ == "__main__":
+    main_cli()
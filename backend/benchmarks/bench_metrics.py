@@ -0,0 +1,81 @@
+"""Per-request overhead of the metrics and tracing middleware and per-query timing.
+
+Drives a bare ASGI app that answers immediately, directly and wrapped in
+``MetricsMiddleware`` and ``TracingMiddleware`` as main.py stacks them, and
+times what ``db.asyncdb.execute`` records per query on a real supabase-py
+query builder (nothing is sent). The difference is what instrumentation adds
+to every request; the target is under 50 us.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metrics --requests 100000
+"""
+import argparse
+import asyncio
+import time
+
+from db.supabaseclient import supabase as real_client
+from services.metrics import REGISTRY, MetricsMiddleware, observe_query
+from services.tracing import RoundTripTrace, TracingMiddleware
+
+BUDGET_US = 50
+
+SCOPE = {"type": "http", "method": "GET", "path": "/events/42"}
+
+
+class Route:
+    path = "/events/{event_id}"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def drive(app, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(SCOPE), receive, send)
+    return time.perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    n = args.requests
+    bare = min(asyncio.run(drive(bare_app, n)) for _ in range(3))
+    wrapped = min(asyncio.run(drive(MetricsMiddleware(TracingMiddleware(bare_app)), n)) for _ in range(3))
+    middleware_us = (wrapped - bare) * 1e6 / n
+
+    query = real_client.table("events").select("*").eq("id", 42)
+    trace = RoundTripTrace("GET", "/events/42")
+    start = time.perf_counter()
+    for _ in range(n):
+        sequential = trace.start()
+        observe_query(query, 0.01)
+        trace.finish(query, 0.01, sequential)
+    query_us = (time.perf_counter() - start) * 1e6 / n
+    REGISTRY.clear()
+
+    print(f"{n} requests")
+    print(f"  bare app            {bare * 1e6 / n:6.2f} us per request")
+    print(f"  with middleware     {wrapped * 1e6 / n:6.2f} us per request")
+    print(f"  middleware overhead {middleware_us:6.2f} us per request")
+    print(f"  per-query recording {query_us:6.2f} us per Supabase call")
+    total = middleware_us + 5 * query_us
+    verdict = "within" if total < BUDGET_US else "OVER"
+    print(f"  request with 5 Supabase calls: {total:.2f} us, {verdict} the {BUDGET_US} us budget")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,92 @@
+"""Cost of finding due reminders: the scheduler's heap vs a scan per tick.
+
+Schedules N reminders spread evenly over the horizon, then advances a clock
+in equal ticks until all are due, collecting the due ones each tick:
+
+  scan   walk every pending reminder and pick the due ones (what polling
+         the events table for "due and not reminded" amounts to)
+  heap   ``services.reminders.ReminderHeap.pop_due``
+
+A share of reminders is rescheduled part-way through, as edits to events
+would, to include the heap's lazy-deletion overhead.
+
+Usage (from backend/):
+    python -m benchmarks.bench_reminders --reminders 100000 --ticks 200
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.reminders import ReminderHeap
+
+T0 = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+def make_schedule(n, horizon):
+    step = horizon / n
+    due = [(str(i), T0 + step * i) for i in range(n)]
+    random.Random(0).shuffle(due)
+    return due
+
+
+def run_scan(schedule, ticks, horizon, edits):
+    pending = dict(schedule)
+    fired = 0
+    start = time.perf_counter()
+    for t in range(1, ticks + 1):
+        now = T0 + horizon * t / ticks
+        if t == ticks // 2:
+            pending.update(edits)
+        due = [event_id for event_id, due_at in pending.items() if due_at <= now]
+        for event_id in due:
+            del pending[event_id]
+        fired += len(due)
+    return time.perf_counter() - start, fired
+
+
+def run_heap(schedule, ticks, horizon, edits):
+    heap = ReminderHeap()
+    build_start = time.perf_counter()
+    for event_id, due_at in schedule:
+        heap.schedule(event_id, due_at)
+    build = time.perf_counter() - build_start
+    fired = 0
+    start = time.perf_counter()
+    for t in range(1, ticks + 1):
+        now = T0 + horizon * t / ticks
+        if t == ticks // 2:
+            for event_id, due_at in edits:
+                heap.schedule(event_id, due_at)
+        fired += len(heap.pop_due(now))
+    return time.perf_counter() - start, fired, build
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reminders", type=int, default=100000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--horizon-hours", type=float, default=24)
+    parser.add_argument("--edit-share", type=float, default=0.05, help="share of reminders rescheduled mid-run")
+    args = parser.parse_args()
+
+    horizon = timedelta(hours=args.horizon_hours)
+    schedule = make_schedule(args.reminders, horizon)
+    # Push a share of the reminders that are still pending towards the end of the horizon
+    late = T0 + horizon * 0.9
+    edits = [(event_id, late) for event_id, due_at in schedule[:int(len(schedule) * args.edit_share)]
+             if due_at > T0 + horizon / 2]
+
+    scan_time, scan_fired = run_scan(schedule, args.ticks, horizon, edits)
+    heap_time, heap_fired, build = run_heap(schedule, args.ticks, horizon, edits)
+    assert scan_fired == heap_fired == args.reminders
+
+    print(f"{args.reminders} reminders, {args.ticks} ticks, {len(edits)} rescheduled")
+    print(f"  heap build {build * 1000:8.1f} ms")
+    for name, elapsed in (("scan", scan_time), ("heap", heap_time)):
+        print(f"  {name:<10} {elapsed * 1000:8.1f} ms total  {elapsed * 1e6 / args.ticks:9.1f} us per tick")
+    print(f"  speedup x{scan_time / heap_time:.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
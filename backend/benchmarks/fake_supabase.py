@@ -0,0 +1,77 @@
+"""Stand-in for the supabase-py client: SQLite storage plus injected latency.
+
+``FakeSupabase`` is the local storage engine (db/sqliteclient.py), so the
+query builder, keys, cascades and reservation/waitlist RPCs behave exactly
+as they do under ``STORAGE_BACKEND=sqlite``. Every ``execute()`` first
+sleeps for the configured latency (plus optional jitter) on the calling
+thread, as a round trip to PostgREST would, so handlers that make more
+sequential round trips are measurably slower.
+
+Used by the endpoint load benchmark (benchmarks/bench_endpoints.py) and by
+tests that need real query semantics instead of ``MagicMock`` chains.
+"""
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from db.sqliteclient import SQLiteClient
+
+
+class FakeSupabase(SQLiteClient):
+    """A SQLiteClient whose round trips each take ``latency`` seconds.
+
+    Up to ``jitter`` more seconds, drawn from a seeded RNG, are added per
+    ``execute()``; ``round_trips`` counts them. Without a ``path`` the
+    database lives in a temporary directory removed by ``close()``.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0, path=None):
+        self._tmp = tempfile.TemporaryDirectory() if path is None else None
+        super().__init__(path if path is not None else Path(self._tmp.name) / "fake.db")
+        self.latency = latency
+        self.jitter = jitter
+        self.round_trips = 0
+        self._random = random.Random(seed)
+        self._delay_lock = threading.Lock()
+        self._local_latency = threading.local()
+
+    def close(self):
+        super().close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    # ----- direct access for seeding and assertions, without latency -----
+
+    def seed(self, table, rows):
+        """Insert ``rows`` without a round trip; returns them with their ids."""
+        return self._direct(self.table(table).insert(rows))
+
+    def lookup(self, table, *key):
+        """The row of ``table`` with primary key ``key``, or None."""
+        query = self.table(table).select("*")
+        for column, value in zip(self._primary_keys[table], key):
+            query = query.eq(column, value)
+        rows = self._direct(query)
+        return rows[0] if rows else None
+
+    def lookup_by(self, table, column, value):
+        """Rows of ``table`` whose ``column`` equals ``value``."""
+        return self._direct(self.table(table).select("*").eq(column, value))
+
+    def _direct(self, query):
+        self._local_latency.off = True
+        try:
+            return query.execute().data
+        finally:
+            self._local_latency.off = False
+
+    def _transaction(self, run, write, table=None, payload=None):
+        if not getattr(self._local_latency, "off", False):
+            with self._delay_lock:
+                self.round_trips += 1
+                delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            if delay:
+                time.sleep(delay)
+        return super()._transaction(run, write, table=table, payload=payload)
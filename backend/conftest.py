@@ -0,0 +1,32 @@
+import pytest
+
+from db.cache import catalog_cache, user_cache
+from main import search_index
+from services import tracing
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    """Keep cached catalog and user reads, and the search index, from leaking between tests."""
+    catalog_cache.clear()
+    user_cache.clear()
+    search_index.clear()
+    yield
+    catalog_cache.clear()
+    user_cache.clear()
+    search_index.clear()
+
+
+@pytest.fixture(autouse=True)
+def round_trips():
+    """Fail any request whose handler makes more sequential Supabase round
+    trips than its @round_trip_budget allows; yields the traces of the
+    test's requests, oldest first."""
+    traces = []
+
+    def check(trace):
+        traces.append(trace)
+        trace.check_budget()
+
+    with tracing.listen(check):
+        yield traces
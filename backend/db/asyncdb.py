@@ -0,0 +1,51 @@
+"""Non-blocking execution of Supabase queries.
+
+supabase-py's query builders do a blocking HTTP round trip inside
+``execute()``. Calling that directly from an ``async def`` handler stalls the
+event loop, so every endpoint awaits ``execute(query)`` instead: the round
+trip runs on a dedicated, bounded thread pool and the loop keeps serving
+other requests while it waits.
+
+Every round trip is timed by table and operation for ``GET /metrics`` and
+added to the current request's round-trip trace (services/tracing.py).
+
+Only ``query.execute()`` itself runs on the pool; ``execute`` records its
+timing after the await, back on the event loop thread. The in-process state
+handlers share -- the caches (db/cache.py), metrics (services/metrics.py)
+and the search index (services/search.py) -- is therefore only ever
+touched from that one thread and needs no locks.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.metrics import observe_query
+from services.tracing import current_trace
+
+# Upper bound on concurrent Supabase round trips per worker process. Requests
+# beyond this queue up instead of opening an unbounded number of connections.
+MAX_CONCURRENCY = int(os.environ.get("SUPABASE_MAX_CONCURRENCY", "32"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENCY,
+    thread_name_prefix="supabase",
+)
+
+
+async def execute(query):
+    """Run ``query.execute()`` off the event loop and return its response."""
+    loop = asyncio.get_running_loop()
+    trace = current_trace()
+    sequential = trace.start() if trace is not None else False
+    start = time.perf_counter()
+    failed = True
+    try:
+        resp = await loop.run_in_executor(_executor, query.execute)
+        failed = False
+        return resp
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_query(query, elapsed, failed=failed)
+        if trace is not None:
+            trace.finish(query, elapsed, sequential)
@@ -0,0 +1,176 @@
+"""In-process caches for catalog and user reads.
+
+``TTLCache`` is a bounded LRU map whose entries also expire after a fixed
+TTL. Entries can carry tags so a write can drop exactly the entries that
+depend on the rows it touched (for example every cached page containing
+event 42) without flushing the whole cache.
+
+``user_cache`` holds ``users`` rows by id for ``db.loaders.load_user``.
+Writes in this process invalidate them; the short TTL bounds how long a
+change made by another worker can go unnoticed.
+"""
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize=512, ttl=30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, value, tags), least recently used first
+        self._entries = OrderedDict()
+        # tag -> keys carrying it
+        self._tags = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value, _ = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, tags=()):
+        if key in self._entries:
+            self._remove(key)
+        tags = frozenset(tags)
+        self._entries[key] = (self._clock() + self.ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if key in self._entries:
+            self._remove(key)
+
+    def invalidate_tag(self, tag):
+        """Drop every entry carrying ``tag``."""
+        for key in list(self._tags.get(tag, ())):
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class CatalogVersion:
+    """Generation counter for the event catalog, used as a cheap ETag source.
+
+    Every catalog write bumps the generation. Tokens embed a per-process boot
+    id, so a token issued by another worker (or before a restart) never
+    matches and simply yields a full response.
+
+    A write handled by another worker does not bump this process's counter,
+    so with ``max_age`` set, tokens also carry the current ``max_age``-second
+    time bucket. A token therefore stops matching within ``max_age`` seconds,
+    the same bound the catalog cache's TTL puts on its entries.
+    """
+
+    def __init__(self, max_age: Optional[float] = None, clock=time.time):
+        self.boot_id = secrets.token_hex(4)
+        self.generation = 0
+        self.max_age = max_age
+        self._clock = clock
+
+    def bump(self):
+        self.generation += 1
+
+    def etag(self, *qualifiers) -> str:
+        if self.max_age:
+            qualifiers += (f"a{int(self._clock() // self.max_age)}",)
+        suffix = "".join(f"-{q}" for q in qualifiers)
+        return f'W/"{self.boot_id}-{self.generation}{suffix}"'
+
+
+# ===== Event catalog cache =====
+
+# Tag carried by every cached page of GET /events
+EVENT_LIST_TAG = "events:list"
+
+catalog_cache = TTLCache(
+    maxsize=int(os.environ.get("CATALOG_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("CATALOG_CACHE_TTL", "30")),
+)
+catalog_version = CatalogVersion(max_age=catalog_cache.ttl)
+
+
+def event_tag(event_id) -> str:
+    """Tag carried by every cached response that includes ``event_id``."""
+    return f"event:{event_id}"
+
+
+def invalidate_event(event_id):
+    """Drop the cached detail of one event and every list page showing it."""
+    catalog_version.bump()
+    catalog_cache.invalidate_tag(event_tag(event_id))
+
+
+def invalidate_event_lists():
+    """Drop every cached list page, e.g. when an event is added or re-sorted."""
+    catalog_version.bump()
+    catalog_cache.invalidate_tag(EVENT_LIST_TAG)
+
+
+# ===== User cache =====
+
+user_cache = TTLCache(
+    maxsize=int(os.environ.get("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("USER_CACHE_TTL", "10")),
+)
+# Bumped by every user invalidation, so a read that overlapped one is not cached
+user_version = CatalogVersion()
+
+
+def invalidate_user(*user_ids):
+    """Drop the cached rows of ``user_ids``, e.g. after their registrations changed."""
+    user_version.bump()
+    for user_id in user_ids:
+        user_cache.invalidate(str(user_id))
+
+
+def invalidate_event_registrants(event_id):
+    """Drop the cached row of every user registered for ``event_id``."""
+    user_version.bump()
+    user_cache.invalidate_tag(event_tag(event_id))
@@ -0,0 +1,60 @@
+"""Batched loaders for related rows.
+
+Reads normally embed related rows in the parent query (for example
+``select("*, food_items(*)")``). ``load_food_items`` is the fallback for id
+sets that did not come back embedded: a single ``in_`` filter puts every id
+in the URL, which keeps growing with the id set until PostgREST or a proxy
+rejects the request, so ids are split into fixed-size chunks that are
+fetched concurrently.
+
+``load_user`` reads a ``users`` row through the in-process user cache.
+"""
+import asyncio
+import os
+
+from db.asyncdb import execute
+from db.cache import event_tag, user_cache, user_version
+
+FOOD_ITEMS_CHUNK_SIZE = int(os.environ.get("FOOD_ITEMS_CHUNK_SIZE", "100"))
+
+# A cached user carries its registrations, so GET /users/{user_id} needs nothing else
+USER_COLUMNS = "*, registrations(event_id)"
+
+
+def chunked(items, size):
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def load_food_items(client, event_ids, chunk_size=None):
+    """Return the food_items rows of ``event_ids`` in ceil(n / chunk_size) concurrent queries."""
+    if not event_ids:
+        return []
+    responses = await asyncio.gather(*(
+        execute(client.table("food_items").select("*").in_("event_id", chunk))
+        for chunk in chunked(event_ids, chunk_size or FOOD_ITEMS_CHUNK_SIZE)
+    ))
+    return [row for resp in responses for row in (resp.data or [])]
+
+
+async def load_user(client, user_id):
+    """Return the users row of ``user_id`` with its registrations embedded, or None.
+
+    Served from ``user_cache`` when possible. The entry is tagged with the
+    user's events so deleting one of them drops it. Unknown ids are not
+    cached, so a user who signs up is found right away.
+    """
+    key = str(user_id)
+    cached = user_cache.get(key)
+    if cached is not None:
+        return cached
+
+    version = user_version.generation
+    resp = await execute(client.table("users").select(USER_COLUMNS).eq("id", user_id))
+    if not resp.data:
+        return None
+    user = resp.data[0]
+    if user_version.generation == version:
+        tags = [event_tag(r["event_id"]) for r in user.get("registrations") or []]
+        user_cache.set(key, user, tags=tags)
+    return user
@@ -0,0 +1,61 @@
+-- Atomic seat reservation for POST /events/{event_id}/register.
+--
+-- Replaces the read-check-write sequence in the handler with one call:
+-- the seat is taken by a conditional decrement (quantity_left > 0) and the
+-- user's registered_events array is extended in the same transaction, with
+-- the user row locked so concurrent requests for one user cannot lose
+-- updates. Assumes users.registered_events is jsonb.
+--
+-- Returns one row: status is 'reserved', 'sold_out', 'already_registered',
+-- 'event_not_found' or 'user_not_found'; quantity_left is the seats left
+-- after the call (null when the event does not exist).
+
+create or replace function public.reserve_seat(
+  p_event_id events.id%type,
+  p_user_id users.id%type
+)
+returns table (status text, quantity_left integer)
+language plpgsql
+as $$
+declare
+  v_registered jsonb;
+  v_left integer;
+begin
+  select coalesce(u.registered_events, '[]'::jsonb)
+    into v_registered
+    from users u
+   where u.id = p_user_id
+     for update;
+  if not found then
+    return query select 'user_not_found'::text, null::integer;
+    return;
+  end if;
+
+  if v_registered ? p_event_id::text then
+    return query select 'already_registered'::text,
+                        (select e.quantity_left from events e where e.id = p_event_id);
+    return;
+  end if;
+
+  update events e
+     set quantity_left = e.quantity_left - 1
+   where e.id = p_event_id
+     and e.quantity_left > 0
+  returning e.quantity_left into v_left;
+
+  if not found then
+    if exists (select 1 from events e where e.id = p_event_id) then
+      return query select 'sold_out'::text, 0;
+    else
+      return query select 'event_not_found'::text, null::integer;
+    end if;
+    return;
+  end if;
+
+  update users u
+     set registered_events = v_registered || to_jsonb(p_event_id::text)
+   where u.id = p_user_id;
+
+  return query select 'reserved'::text, v_left;
+end;
+$$;
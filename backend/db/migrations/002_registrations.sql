@@ -0,0 +1,130 @@
+-- Normalized registrations: one (user_id, event_id) row per registration
+-- instead of a jsonb array on the users row.
+--
+-- Every register/unregister used to rewrite the whole array and membership
+-- checks scanned it. With a primary key on (user_id, event_id) each write
+-- touches one row and duplicates are impossible.
+--
+-- Migration path:
+--   1. Run this file. It creates the table, backfills it from
+--      users.registered_events and moves reserve_seat/release_seat onto it.
+--   2. Deploy the backend that reads and writes registrations.
+--   3. Once no older backend is running, drop the legacy column:
+--        alter table public.users drop column registered_events;
+
+-- Column types follow users.id and events.id, whatever they are in this project.
+do $$
+declare
+  v_user_id_type text;
+  v_event_id_type text;
+begin
+  select format_type(a.atttypid, a.atttypmod) into v_user_id_type
+    from pg_attribute a
+   where a.attrelid = 'public.users'::regclass and a.attname = 'id';
+  select format_type(a.atttypid, a.atttypmod) into v_event_id_type
+    from pg_attribute a
+   where a.attrelid = 'public.events'::regclass and a.attname = 'id';
+
+  execute format(
+    'create table if not exists public.registrations (
+       user_id %s not null references public.users(id) on delete cascade,
+       event_id %s not null references public.events(id) on delete cascade,
+       created_at timestamptz not null default now(),
+       primary key (user_id, event_id)
+     )',
+    v_user_id_type, v_event_id_type
+  );
+end;
+$$;
+
+-- The primary key serves per-user lookups; this one serves per-event ones.
+create index if not exists registrations_event_id_idx
+  on public.registrations (event_id);
+
+-- Backfill from the legacy arrays, skipping ids of events that no longer exist.
+insert into public.registrations (user_id, event_id)
+select u.id, e.id
+  from public.users u
+ cross join lateral jsonb_array_elements_text(coalesce(u.registered_events, '[]'::jsonb)) as r(event_id)
+  join public.events e on e.id::text = r.event_id
+on conflict do nothing;
+
+-- New users no longer write the legacy column.
+alter table public.users alter column registered_events set default '[]'::jsonb;
+
+
+-- reserve_seat, rebuilt on registrations. Same contract as 001: returns one
+-- row (status, quantity_left) with status 'reserved', 'sold_out',
+-- 'already_registered', 'event_not_found' or 'user_not_found'.
+create or replace function public.reserve_seat(
+  p_event_id events.id%type,
+  p_user_id users.id%type
+)
+returns table (status text, quantity_left integer)
+language plpgsql
+as $$
+declare
+  v_left integer;
+begin
+  -- Lock the event row: reservations for one event serialize here.
+  select e.quantity_left into v_left
+    from events e
+   where e.id = p_event_id
+     for update;
+  if not found then
+    return query select 'event_not_found'::text, null::integer;
+    return;
+  end if;
+
+  if not exists (select 1 from users u where u.id = p_user_id) then
+    return query select 'user_not_found'::text, v_left;
+    return;
+  end if;
+
+  if exists (select 1 from registrations r
+              where r.user_id = p_user_id and r.event_id = p_event_id) then
+    return query select 'already_registered'::text, v_left;
+    return;
+  end if;
+
+  if coalesce(v_left, 0) <= 0 then
+    return query select 'sold_out'::text, 0;
+    return;
+  end if;
+
+  insert into registrations (user_id, event_id) values (p_user_id, p_event_id);
+  update events e set quantity_left = v_left - 1 where e.id = p_event_id;
+
+  return query select 'reserved'::text, v_left - 1;
+end;
+$$;
+
+
+-- Atomic unregister: deletes the registration and returns the seat in one call.
+-- Returns one row (status, quantity_left) with status 'released' or
+-- 'not_registered'.
+create or replace function public.release_seat(
+  p_event_id events.id%type,
+  p_user_id users.id%type
+)
+returns table (status text, quantity_left integer)
+language plpgsql
+as $$
+declare
+  v_left integer;
+begin
+  delete from registrations r
+   where r.user_id = p_user_id and r.event_id = p_event_id;
+  if not found then
+    return query select 'not_registered'::text, null::integer;
+    return;
+  end if;
+
+  update events e
+     set quantity_left = e.quantity_left + 1
+   where e.id = p_event_id
+  returning e.quantity_left into v_left;
+
+  return query select 'released'::text, v_left;
+end;
+$$;
@@ -0,0 +1,81 @@
+-- Group registration for POST /events/{event_id}/register/group.
+--
+-- Reserves seats for a list of users in one call. The event row is locked
+-- as in reserve_seat, so group and single reservations for one event
+-- serialize. Either every eligible user gets a seat or none does: a group
+-- never takes the last few seats and leaves the rest of its members out.
+--
+-- Returns one row per distinct requested user, in request order:
+-- (user_id, status, quantity_left) with status
+--   'reserved'            seat taken (only when the whole group fits)
+--   'sold_out'            not enough seats for every eligible user; nothing written
+--   'already_registered'  the user already had a seat; unchanged
+--   'user_not_found'      no such user; unchanged
+--   'event_not_found'     no such event (every row)
+-- quantity_left is the event's seats left after the call.
+
+create or replace function public.reserve_seats(
+  p_event_id events.id%type,
+  p_user_ids text[]
+)
+returns table (user_id text, status text, quantity_left integer)
+language plpgsql
+as $$
+declare
+  v_left integer;
+  v_ids text[];
+  v_statuses text[];
+  v_wanted integer;
+begin
+  -- Lock the event row: reservations for one event serialize here.
+  select e.quantity_left into v_left
+    from events e
+   where e.id = p_event_id
+     for update;
+  if not found then
+    return query
+      select req.uid, 'event_not_found'::text, null::integer
+        from unnest(p_user_ids) with ordinality as req(uid, ord)
+       order by req.ord;
+    return;
+  end if;
+
+  -- Classify each distinct user, keeping the order of first mention.
+  select coalesce(array_agg(req.uid order by req.ord), '{}'),
+         coalesce(array_agg(case
+                              when u.id is null then 'user_not_found'
+                              when r.user_id is not null then 'already_registered'
+                              else 'reserved'
+                            end order by req.ord), '{}')
+    into v_ids, v_statuses
+    from (select distinct on (t.uid) t.uid, t.ord
+            from unnest(p_user_ids) with ordinality as t(uid, ord)
+           order by t.uid, t.ord) req
+    left join users u on u.id::text = req.uid
+    left join registrations r on r.user_id = u.id and r.event_id = p_event_id;
+
+  v_wanted := coalesce(cardinality(array_positions(v_statuses, 'reserved')), 0);
+
+  if v_wanted > coalesce(v_left, 0) then
+    return query
+      select t.uid, case when t.st = 'reserved' then 'sold_out' else t.st end, v_left
+        from unnest(v_ids, v_statuses) as t(uid, st);
+    return;
+  end if;
+
+  if v_wanted > 0 then
+    insert into registrations (user_id, event_id)
+    select u.id, p_event_id
+      from users u
+     where u.id::text = any(
+             array(select t.uid from unnest(v_ids, v_statuses) as t(uid, st) where t.st = 'reserved')
+           );
+    v_left := v_left - v_wanted;
+    update events e set quantity_left = v_left where e.id = p_event_id;
+  end if;
+
+  return query
+    select t.uid, t.st, v_left
+      from unnest(v_ids, v_statuses) as t(uid, st);
+end;
+$$;
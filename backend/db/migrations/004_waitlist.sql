@@ -0,0 +1,230 @@
+-- FIFO waitlist per event.
+--
+-- When an event is full, POST /events/{event_id}/waitlist queues the user
+-- instead of failing, and a seat freed by an unregister goes straight to
+-- the head of the queue (release_and_promote) rather than back into
+-- quantity_left, where it would go to whichever retry arrived first.
+--
+-- Each queue hands out tickets. The tickets of the users waiting for an
+-- event are kept dense, head_ticket .. next_ticket - 1, so a user's
+-- position is ticket - head_ticket + 1: one primary-key lookup however
+-- long the queue is. Promotion advances head_ticket; leaving from the
+-- middle renumbers the users behind (rare compared to position reads).
+--
+-- Depends on 002_registrations.sql.
+
+do $$
+declare
+  v_user_id_type text;
+  v_event_id_type text;
+begin
+  select format_type(a.atttypid, a.atttypmod) into v_user_id_type
+    from pg_attribute a
+   where a.attrelid = 'public.users'::regclass and a.attname = 'id';
+  select format_type(a.atttypid, a.atttypmod) into v_event_id_type
+    from pg_attribute a
+   where a.attrelid = 'public.events'::regclass and a.attname = 'id';
+
+  execute format(
+    'create table if not exists public.waitlist_queues (
+       event_id %s primary key references public.events(id) on delete cascade,
+       next_ticket bigint not null default 1,
+       head_ticket bigint not null default 1
+     )',
+    v_event_id_type
+  );
+
+  execute format(
+    'create table if not exists public.waitlist (
+       event_id %s not null references public.waitlist_queues(event_id) on delete cascade,
+       user_id %s not null references public.users(id) on delete cascade,
+       ticket bigint not null,
+       created_at timestamptz not null default now(),
+       primary key (event_id, user_id)
+     )',
+    v_event_id_type, v_user_id_type
+  );
+end;
+$$;
+
+create index if not exists waitlist_event_ticket_idx
+  on public.waitlist (event_id, ticket);
+
+
+-- Seat the head of the queue while the event has seats left. The caller's
+-- transaction may already hold the event row lock; taking it again is a no-op.
+-- Returns the ids of the promoted users, in queue order.
+create or replace function public.promote_waitlist(
+  p_event_id events.id%type
+)
+returns table (user_id text)
+language plpgsql
+as $$
+declare
+  v_left integer;
+  v_user users.id%type;
+begin
+  loop
+    select e.quantity_left into v_left
+      from events e
+     where e.id = p_event_id
+       for update;
+    exit when coalesce(v_left, 0) <= 0;
+
+    select w.user_id into v_user
+      from waitlist w
+      join waitlist_queues q on q.event_id = w.event_id and w.ticket = q.head_ticket
+     where w.event_id = p_event_id;
+    exit when not found;
+
+    delete from waitlist w where w.event_id = p_event_id and w.user_id = v_user;
+    update waitlist_queues q set head_ticket = q.head_ticket + 1 where q.event_id = p_event_id;
+
+    insert into registrations (user_id, event_id) values (v_user, p_event_id)
+    on conflict do nothing;
+    if found then
+      update events e set quantity_left = v_left - 1 where e.id = p_event_id;
+      user_id := v_user::text;
+      return next;
+    end if;
+  end loop;
+end;
+$$;
+
+
+-- Register if a seat is free, otherwise join the back of the queue.
+-- Returns one row (status, position, quantity_left) with status 'reserved',
+-- 'waitlisted' (position is 1 for the head), 'already_registered',
+-- 'event_not_found' or 'user_not_found'. Joining twice keeps the first place.
+create or replace function public.join_waitlist(
+  p_event_id events.id%type,
+  p_user_id users.id%type
+)
+returns table (status text, "position" bigint, quantity_left integer)
+language plpgsql
+as $$
+declare
+  v_left integer;
+  v_ticket bigint;
+  v_head bigint;
+begin
+  -- Same lock as reserve_seat and release_and_promote
+  select e.quantity_left into v_left
+    from events e
+   where e.id = p_event_id
+     for update;
+  if not found then
+    return query select 'event_not_found'::text, null::bigint, null::integer;
+    return;
+  end if;
+
+  if not exists (select 1 from users u where u.id = p_user_id) then
+    return query select 'user_not_found'::text, null::bigint, v_left;
+    return;
+  end if;
+
+  if exists (select 1 from registrations r
+              where r.user_id = p_user_id and r.event_id = p_event_id) then
+    return query select 'already_registered'::text, null::bigint, v_left;
+    return;
+  end if;
+
+  insert into waitlist_queues (event_id) values (p_event_id)
+  on conflict (event_id) do nothing;
+
+  select w.ticket, q.head_ticket into v_ticket, v_head
+    from waitlist w
+    join waitlist_queues q on q.event_id = w.event_id
+   where w.event_id = p_event_id and w.user_id = p_user_id;
+  if found then
+    return query select 'waitlisted'::text, v_ticket - v_head + 1, v_left;
+    return;
+  end if;
+
+  -- Nobody can be waiting while seats are free, so a free seat is ours
+  if coalesce(v_left, 0) > 0 then
+    insert into registrations (user_id, event_id) values (p_user_id, p_event_id);
+    update events e set quantity_left = v_left - 1 where e.id = p_event_id;
+    return query select 'reserved'::text, null::bigint, v_left - 1;
+    return;
+  end if;
+
+  update waitlist_queues q
+     set next_ticket = q.next_ticket + 1
+   where q.event_id = p_event_id
+  returning q.next_ticket - 1, q.head_ticket into v_ticket, v_head;
+
+  insert into waitlist (event_id, user_id, ticket) values (p_event_id, p_user_id, v_ticket);
+
+  return query select 'waitlisted'::text, v_ticket - v_head + 1, v_left;
+end;
+$$;
+
+
+-- Leave the queue. Returns one row (status) with status 'left' or 'not_waitlisted'.
+create or replace function public.leave_waitlist(
+  p_event_id events.id%type,
+  p_user_id users.id%type
+)
+returns table (status text)
+language plpgsql
+as $$
+declare
+  v_ticket bigint;
+begin
+  perform 1 from events e where e.id = p_event_id for update;
+
+  delete from waitlist w
+   where w.event_id = p_event_id and w.user_id = p_user_id
+  returning w.ticket into v_ticket;
+  if not found then
+    return query select 'not_waitlisted'::text;
+    return;
+  end if;
+
+  -- Close the gap so tickets stay dense
+  update waitlist w set ticket = w.ticket - 1
+   where w.event_id = p_event_id and w.ticket > v_ticket;
+  update waitlist_queues q set next_ticket = q.next_ticket - 1
+   where q.event_id = p_event_id;
+
+  return query select 'left'::text;
+end;
+$$;
+
+
+-- Unregister, handing the freed seat to the head of the waitlist if anyone
+-- is waiting. Returns one row (status, quantity_left, promoted_user_ids)
+-- with status 'released' or 'not_registered'.
+create or replace function public.release_and_promote(
+  p_event_id events.id%type,
+  p_user_id users.id%type
+)
+returns table (status text, quantity_left integer, promoted_user_ids text[])
+language plpgsql
+as $$
+declare
+  v_left integer;
+  v_promoted text[];
+begin
+  perform 1 from events e where e.id = p_event_id for update;
+
+  delete from registrations r
+   where r.user_id = p_user_id and r.event_id = p_event_id;
+  if not found then
+    return query select 'not_registered'::text, null::integer, '{}'::text[];
+    return;
+  end if;
+
+  update events e
+     set quantity_left = e.quantity_left + 1
+   where e.id = p_event_id;
+
+  select coalesce(array_agg(p.user_id), '{}') into v_promoted
+    from promote_waitlist(p_event_id) p;
+
+  select e.quantity_left into v_left from events e where e.id = p_event_id;
+
+  return query select 'released'::text, v_left, v_promoted;
+end;
+$$;
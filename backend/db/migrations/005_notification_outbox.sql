@@ -0,0 +1,213 @@
+-- Durable outbox for notification emails.
+--
+-- Triggers queue one row per recipient in the same transaction as the write
+-- that caused it, whichever endpoint or database function made that write:
+--   registrations insert  -> 'registered' (or 'waitlist_promoted' when the
+--                            seat came from the waitlist)
+--   registrations delete  -> 'unregistered'
+--   events insert         -> 'event_created' to the creator
+--   events update         -> 'event_updated' to every registrant, when a
+--                            detail shown in emails changed
+-- The backend's outbox worker (services/notifications.py) claims due rows
+-- in batches, sends them and marks them sent, or reschedules them with
+-- exponential backoff. Requests never wait on email delivery.
+--
+-- No foreign keys: a row outlives its event or user, and the worker marks
+-- rows whose recipient or event is gone as 'skipped'.
+--
+-- Depends on 002_registrations.sql and 004_waitlist.sql.
+
+do $$
+declare
+  v_user_id_type text;
+  v_event_id_type text;
+begin
+  select format_type(a.atttypid, a.atttypmod) into v_user_id_type
+    from pg_attribute a
+   where a.attrelid = 'public.users'::regclass and a.attname = 'id';
+  select format_type(a.atttypid, a.atttypmod) into v_event_id_type
+    from pg_attribute a
+   where a.attrelid = 'public.events'::regclass and a.attname = 'id';
+
+  execute format(
+    'create table if not exists public.notification_outbox (
+       id bigserial primary key,
+       kind text not null,
+       user_id %s not null,
+       event_id %s not null,
+       status text not null default ''pending'',
+       attempts integer not null default 0,
+       next_attempt_at timestamptz not null default now(),
+       last_error text,
+       created_at timestamptz not null default now(),
+       sent_at timestamptz
+     )',
+    v_user_id_type, v_event_id_type
+  );
+end;
+$$;
+
+-- Serves the worker's "due pending rows, oldest first" scan.
+create index if not exists notification_outbox_due_idx
+  on public.notification_outbox (next_attempt_at, id)
+  where status = 'pending';
+
+
+create or replace function public.outbox_on_registration()
+returns trigger
+language plpgsql
+as $$
+begin
+  -- Registrations removed by cascading event/user deletes are not unregisters
+  if pg_trigger_depth() > 1 then
+    return null;
+  end if;
+
+  if tg_op = 'INSERT' then
+    insert into notification_outbox (kind, user_id, event_id)
+    values (
+      case when current_setting('spark_bytes.registration_source', true) = 'waitlist'
+           then 'waitlist_promoted' else 'registered' end,
+      new.user_id, new.event_id
+    );
+  else
+    insert into notification_outbox (kind, user_id, event_id)
+    values ('unregistered', old.user_id, old.event_id);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists registrations_outbox on public.registrations;
+create trigger registrations_outbox
+  after insert or delete on public.registrations
+  for each row execute function public.outbox_on_registration();
+
+
+create or replace function public.outbox_on_event()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'INSERT' then
+    if new.creator_id is not null then
+      insert into notification_outbox (kind, user_id, event_id)
+      values ('event_created', new.creator_id, new.id);
+    end if;
+  else
+    insert into notification_outbox (kind, user_id, event_id)
+    select 'event_updated', r.user_id, new.id
+      from registrations r
+     where r.event_id = new.id;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists events_outbox_insert on public.events;
+create trigger events_outbox_insert
+  after insert on public.events
+  for each row execute function public.outbox_on_event();
+
+-- quantity_left changes on every registration and must not notify anyone.
+drop trigger if exists events_outbox_update on public.events;
+create trigger events_outbox_update
+  after update on public.events
+  for each row
+  when (old.name is distinct from new.name
+        or old.description is distinct from new.description
+        or old.location_name is distinct from new.location_name
+        or old.start_time is distinct from new.start_time
+        or old.end_time is distinct from new.end_time)
+  execute function public.outbox_on_event();
+
+
+-- promote_waitlist from 004, now marking its registrations as promotions
+-- for the registrations trigger.
+create or replace function public.promote_waitlist(
+  p_event_id events.id%type
+)
+returns table (user_id text)
+language plpgsql
+as $$
+declare
+  v_left integer;
+  v_user users.id%type;
+begin
+  loop
+    select e.quantity_left into v_left
+      from events e
+     where e.id = p_event_id
+       for update;
+    exit when coalesce(v_left, 0) <= 0;
+
+    select w.user_id into v_user
+      from waitlist w
+      join waitlist_queues q on q.event_id = w.event_id and w.ticket = q.head_ticket
+     where w.event_id = p_event_id;
+    exit when not found;
+
+    delete from waitlist w where w.event_id = p_event_id and w.user_id = v_user;
+    update waitlist_queues q set head_ticket = q.head_ticket + 1 where q.event_id = p_event_id;
+
+    perform set_config('spark_bytes.registration_source', 'waitlist', true);
+    insert into registrations (user_id, event_id) values (v_user, p_event_id)
+    on conflict do nothing;
+    if found then
+      update events e set quantity_left = v_left - 1 where e.id = p_event_id;
+      user_id := v_user::text;
+      return next;
+    end if;
+    perform set_config('spark_bytes.registration_source', '', true);
+  end loop;
+end;
+$$;
+
+
+-- Claim up to p_limit due rows for sending. Claimed rows are leased: they
+-- stay 'pending' but are not due again for p_lease_seconds, so a worker that
+-- dies mid-batch only delays them. Concurrent workers skip each other's rows.
+create or replace function public.claim_outbox(
+  p_limit integer,
+  p_lease_seconds integer default 60
+)
+returns setof public.notification_outbox
+language sql
+as $$
+  update notification_outbox o
+     set attempts = o.attempts + 1,
+         next_attempt_at = now() + make_interval(secs => p_lease_seconds)
+   where o.id in (
+           select d.id
+             from notification_outbox d
+            where d.status = 'pending' and d.next_attempt_at <= now()
+            order by d.next_attempt_at, d.id
+            limit p_limit
+              for update skip locked
+         )
+  returning o.*;
+$$;
+
+
+-- Reschedule rows whose send failed: p_errors[i] belongs to p_ids[i]. The
+-- next attempt waits p_backoff_seconds * 2^(attempts - 1), capped at an hour;
+-- rows that have used p_max_attempts attempts become 'failed'.
+create or replace function public.retry_outbox(
+  p_ids bigint[],
+  p_errors text[],
+  p_max_attempts integer,
+  p_backoff_seconds integer
+)
+returns void
+language sql
+as $$
+  update notification_outbox o
+     set status = case when o.attempts >= p_max_attempts then 'failed' else 'pending' end,
+         last_error = f.error,
+         next_attempt_at = now() + least(
+           make_interval(secs => p_backoff_seconds * power(2, greatest(o.attempts - 1, 0))),
+           interval '1 hour'
+         )
+    from unnest(p_ids, p_errors) as f(id, error)
+   where o.id = f.id;
+$$;
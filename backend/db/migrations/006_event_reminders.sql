@@ -0,0 +1,68 @@
+-- Pre-event reminder emails.
+--
+-- The backend's reminder scheduler (services/reminders.py) keeps upcoming
+-- reminders in memory and, when some fall due, calls
+-- enqueue_event_reminders once per batch. That call queues a 'reminder'
+-- outbox row per registrant and stamps events.reminder_sent_at in one
+-- statement, so each event is reminded once however many backend
+-- processes run or restart.
+--
+-- Moving an event's start_time clears reminder_sent_at, so the new time
+-- gets its own reminder.
+--
+-- Depends on 002_registrations.sql and 005_notification_outbox.sql.
+
+alter table public.events add column if not exists reminder_sent_at timestamptz;
+
+-- Serves the scheduler's "events starting in this window, not reminded yet" loads.
+create index if not exists events_reminder_due_idx
+  on public.events (start_time, id)
+  where reminder_sent_at is null;
+
+
+create or replace function public.reset_event_reminder()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.reminder_sent_at := null;
+  return new;
+end;
+$$;
+
+drop trigger if exists events_reset_reminder on public.events;
+create trigger events_reset_reminder
+  before update on public.events
+  for each row
+  when (old.start_time is distinct from new.start_time)
+  execute function public.reset_event_reminder();
+
+
+-- Queue reminders for the given events. Events already reminded, already
+-- started, or starting later than p_lead_seconds (plus a minute of slack)
+-- from now are skipped, so stale scheduler entries are harmless. Returns
+-- the ids of the events that were reminded.
+create or replace function public.enqueue_event_reminders(
+  p_event_ids text[],
+  p_lead_seconds integer
+)
+returns table (event_id text)
+language sql
+as $$
+  with stamped as (
+    update events e
+       set reminder_sent_at = now()
+     where e.id::text = any(p_event_ids)
+       and e.reminder_sent_at is null
+       and e.start_time > now()
+       and e.start_time <= now() + make_interval(secs => p_lead_seconds) + interval '1 minute'
+    returning e.id
+  ), queued as (
+    insert into notification_outbox (kind, user_id, event_id)
+    select 'reminder', r.user_id, r.event_id
+      from registrations r
+      join stamped s on s.id = r.event_id
+    returning 1
+  )
+  select s.id::text from stamped s;
+$$;
@@ -0,0 +1,7 @@
+-- Default role for new users.
+--
+-- PUT /users/{user_id} creates users with an upsert that leaves role out,
+-- so signing in again can never demote an admin. New rows need the
+-- default the column would otherwise get from the signup endpoint.
+
+alter table public.users alter column role set default 'student';
@@ -0,0 +1,20 @@
+-- Atomic created_events counters for POST /events and POST /events/bulk.
+--
+-- The handlers used to write back a count read earlier (possibly from the
+-- user cache), so two events created at once by one user could record
+-- only one of them. This adds to the stored value in the same statement.
+--
+-- p_counts maps user ids to how many events each created, e.g.
+-- {"u1": 1} or {"u1": 3, "u2": 1}. Returns one row per updated user:
+-- (user_id, created_events) with the new count; unknown ids are skipped.
+
+create or replace function public.add_created_events(p_counts jsonb)
+returns table (user_id text, created_events integer)
+language sql
+as $$
+  update users u
+     set created_events = coalesce(u.created_events, 0) + c.value::integer
+    from jsonb_each_text(p_counts) c
+   where u.id::text = c.key
+  returning u.id::text, u.created_events;
+$$;
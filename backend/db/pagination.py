@@ -0,0 +1,77 @@
+"""Keyset (cursor) pagination over the events table.
+
+Events are ordered by ``(start_time, id)``. A cursor is the opaque, URL-safe
+encoding of the last row's sort key; the next page is everything strictly
+after it. Every page costs the same index range scan no matter how many
+events came before, unlike OFFSET paging.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row: dict) -> str:
+    """Build the cursor that resumes after ``row``."""
+    key = json.dumps([str(row["start_time"]), row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return ``(start_time, id)`` from a cursor made by ``encode_cursor``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_time, event_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    # Both values are interpolated into the or_() filter, so only accept a
+    # timestamp and an int or UUID id, never arbitrary text
+    if not isinstance(start_time, str) or not _is_safe_id(event_id):
+        raise InvalidCursor("Malformed cursor")
+    try:
+        datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+    except ValueError:
+        raise InvalidCursor("Malformed cursor")
+    return start_time, event_id
+
+
+def _is_safe_id(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int) or (isinstance(value, str) and value.isdecimal() and value.isascii()):
+        return True
+    try:
+        uuid.UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        return False
+    return True
+
+
+def keyset_page(query, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Order ``query`` by (start_time, id) and restrict it to one page.
+
+    Fetches ``limit + 1`` rows so the caller can tell whether another page
+    exists without a separate count query.
+    """
+    if cursor:
+        start_time, event_id = decode_cursor(cursor)
+        query = query.or_(
+            f'start_time.gt."{start_time}",'
+            f'and(start_time.eq."{start_time}",id.gt."{event_id}")'
+        )
+    return query.order("start_time").order("id").limit(limit + 1)
+
+
+def split_page(rows, limit):
+    """Trim the look-ahead row and return ``(page, next_cursor)``."""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
@@ -0,0 +1,870 @@
+"""Local SQLite storage engine with the Supabase client's interface.
+
+``SQLiteClient`` answers the same ``table()`` / ``rpc()`` query builder
+calls as the supabase-py client (see db/storage.py), compiled to SQL on a
+local database file in WAL mode: readers never block the writer or each
+other, and a lookup by id is an index probe in-process instead of an HTTPS
+round trip to PostgREST.
+
+The schema mirrors db/migrations, with indexes on ``events.start_time``,
+``events.creator_id`` and ``food_items.event_id``. The reservation,
+waitlist, outbox, reminder and counter functions are ported to Python,
+each running in one ``BEGIN IMMEDIATE`` transaction, which serializes
+writers the way the event row lock does in Postgres; the outbox triggers
+are SQLite triggers.
+
+Timestamps are stored as fixed-width UTC strings
+(``2025-01-31T18:00:00.000+00:00``), so comparing and sorting them as text
+matches comparing them as times. Values written to or compared with
+timestamp columns are converted to that form.
+"""
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from postgrest import APIResponse
+from postgrest.exceptions import APIError
+
+# How long a writer waits for another writer's transaction before failing
+BUSY_TIMEOUT_SECONDS = 5.0
+
+_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%f+00:00"
+
+# The current time in the stored timestamp format
+NOW = f"strftime('{_TIMESTAMP_FORMAT}', 'now')"
+
+SCHEMA = f"""
+create table if not exists users (
+    id text primary key,
+    email text,
+    full_name text,
+    role text not null default 'student',
+    created_events integer not null default 0,
+    created_at timestamp not null default ({NOW})
+);
+
+create table if not exists events (
+    id integer primary key autoincrement,
+    name text,
+    description text,
+    location_name text,
+    start_time timestamp,
+    end_time timestamp,
+    quantity_left integer,
+    creator_id text,
+    creator_name text,
+    created_at timestamp not null default ({NOW}),
+    reminder_sent_at timestamp
+);
+-- Catalog pages: ORDER BY start_time, id and time-window filters
+create index if not exists events_start_time_idx on events (start_time, id);
+create index if not exists events_creator_id_idx on events (creator_id);
+create index if not exists events_reminder_due_idx
+    on events (start_time, id) where reminder_sent_at is null;
+
+create table if not exists food_items (
+    id integer primary key autoincrement,
+    event_id integer not null references events(id) on delete cascade,
+    name text not null,
+    allergy_info text,
+    is_kosher boolean,
+    is_halal boolean,
+    category text,
+    created_at timestamp not null default ({NOW})
+);
+create index if not exists food_items_event_id_idx on food_items (event_id);
+
+create table if not exists registrations (
+    user_id text not null references users(id) on delete cascade,
+    event_id integer not null references events(id) on delete cascade,
+    created_at timestamp not null default ({NOW}),
+    primary key (user_id, event_id)
+);
+create index if not exists registrations_event_id_idx on registrations (event_id);
+
+create table if not exists waitlist_queues (
+    event_id integer primary key references events(id) on delete cascade,
+    next_ticket integer not null default 1,
+    head_ticket integer not null default 1
+);
+
+create table if not exists waitlist (
+    event_id integer not null references waitlist_queues(event_id) on delete cascade,
+    user_id text not null references users(id) on delete cascade,
+    ticket integer not null,
+    created_at timestamp not null default ({NOW}),
+    primary key (event_id, user_id)
+);
+create index if not exists waitlist_event_ticket_idx on waitlist (event_id, ticket);
+
+create table if not exists notification_outbox (
+    id integer primary key autoincrement,
+    kind text not null,
+    user_id text not null,
+    event_id integer not null,
+    status text not null default 'pending',
+    attempts integer not null default 0,
+    next_attempt_at timestamp not null default ({NOW}),
+    last_error text,
+    created_at timestamp not null default ({NOW}),
+    sent_at timestamp
+);
+create index if not exists notification_outbox_due_idx
+    on notification_outbox (next_attempt_at, id) where status = 'pending';
+
+-- registration_source() is defined on each connection by SQLiteClient
+create trigger if not exists registrations_outbox_insert
+after insert on registrations
+begin
+    insert into notification_outbox (kind, user_id, event_id)
+    values (case when registration_source() = 'waitlist' then 'waitlist_promoted' else 'registered' end,
+            new.user_id, new.event_id);
+end;
+
+-- Registrations removed by cascading event/user deletes are not unregisters
+create trigger if not exists registrations_outbox_delete
+after delete on registrations
+when exists (select 1 from events where id = old.event_id)
+ and exists (select 1 from users where id = old.user_id)
+begin
+    insert into notification_outbox (kind, user_id, event_id)
+    values ('unregistered', old.user_id, old.event_id);
+end;
+
+create trigger if not exists events_outbox_insert
+after insert on events
+when new.creator_id is not null
+begin
+    insert into notification_outbox (kind, user_id, event_id)
+    values ('event_created', new.creator_id, new.id);
+end;
+
+-- quantity_left changes on every registration and must not notify anyone.
+create trigger if not exists events_outbox_update
+after update on events
+when old.name is not new.name
+  or old.description is not new.description
+  or old.location_name is not new.location_name
+  or old.start_time is not new.start_time
+  or old.end_time is not new.end_time
+begin
+    insert into notification_outbox (kind, user_id, event_id)
+    select 'event_updated', r.user_id, new.id from registrations r where r.event_id = new.id;
+end;
+
+-- A moved event gets its own reminder
+create trigger if not exists events_reset_reminder
+after update of start_time on events
+when old.start_time is not new.start_time
+begin
+    update events set reminder_sent_at = null where id = new.id;
+end;
+"""
+
+# (table, embedded resource) -> (one or many, local column, remote column)
+RELATIONS = {
+    ("events", "food_items"): ("many", "id", "event_id"),
+    ("events", "registrations"): ("many", "id", "event_id"),
+    ("users", "registrations"): ("many", "id", "user_id"),
+    ("registrations", "events"): ("one", "event_id", "id"),
+    ("registrations", "users"): ("one", "user_id", "id"),
+    ("waitlist", "waitlist_queues"): ("one", "event_id", "event_id"),
+}
+
+_OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "ilike": "like"}
+
+_METHODS = {"select": "GET", "insert": "POST", "upsert": "POST", "update": "PATCH", "delete": "DELETE"}
+
+_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def to_timestamp(value):
+    """``value`` (ISO 8601 text or a datetime) in the stored timestamp form.
+
+    Naive times are taken as UTC. Text that is not a timestamp is returned
+    unchanged, so comparing with it behaves like any other text.
+    """
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}+00:00"
+
+
+def _split_top_level(text):
+    """Split ``text`` on commas outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for c in text:
+        if c == '"':
+            quoted = not quoted
+        elif not quoted and c == "(":
+            depth += 1
+        elif not quoted and c == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and c == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(c)
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _parse_columns(text):
+    """Selected columns and embeds, by the name they appear under in each row.
+
+    ``"*, food_items(*), k:food_items!inner(id)"`` ->
+    (["*"], {"food_items": ("food_items", False, ["*"]), "k": ("food_items", True, ["id"])}).
+    """
+    columns, embeds = [], {}
+    for part in _split_top_level(text):
+        if "(" in part:
+            name, inner = part.split("(", 1)
+            alias, _, resource = name.strip().rpartition(":")
+            resource, _, hint = resource.partition("!")
+            embeds[alias or resource] = (resource, hint == "inner", _parse_columns(inner[:-1])[0])
+        else:
+            columns.append(part)
+    return columns, embeds
+
+
+def _relation(table, resource):
+    relation = RELATIONS.get((table, resource))
+    if relation is None:
+        raise _api_error("PGRST200", f"Could not find a relationship between '{table}' and '{resource}'")
+    return relation
+
+
+def _project(row, columns):
+    if "*" in columns:
+        return dict(row)
+    return {c: row.get(c) for c in columns}
+
+
+def _api_error(code, message, details=None):
+    return APIError({"code": code, "message": message, "details": details, "hint": None})
+
+
+class SQLiteQuery:
+    """One ``table()`` query; builder methods return the query itself."""
+
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._operation = "select"
+        self._columns = "*"
+        self._payload = None
+        # (column, op, value); dotted columns filter embedded rows, and
+        # is_(<embed>, "null") keeps the rows whose embed is empty
+        self._filters = []
+        self._logic = []  # or_() filter strings
+        self._order = []
+        self._limit = None
+        self._on_conflict = None  # (conflict columns, ignore duplicates) for upsert()
+        # Read by services/metrics.py to label the query like a PostgREST request
+        self.request = SimpleNamespace(path=f"/rest/v1/{table}", http_method="GET", headers={})
+
+    def _set(self, operation, payload=None):
+        self._operation = operation
+        self._payload = payload
+        self.request.http_method = _METHODS[operation]
+        return self
+
+    def select(self, columns="*"):
+        self._columns = columns
+        return self
+
+    def insert(self, rows):
+        return self._set("insert", rows)
+
+    def upsert(self, rows, on_conflict="", ignore_duplicates=False):
+        """``INSERT ... ON CONFLICT``: merge into (or skip) rows whose
+        ``on_conflict`` columns, by default the primary key, already exist."""
+        columns = [c.strip() for c in on_conflict.split(",") if c.strip()]
+        self._on_conflict = (columns, ignore_duplicates)
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        self.request.headers["prefer"] = f"return=representation,resolution={resolution}"
+        return self._set("upsert", rows)
+
+    def update(self, values):
+        return self._set("update", values)
+
+    def delete(self):
+        return self._set("delete")
+
+    def _filter(self, column, op, value):
+        self._filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, "ilike", pattern)
+
+    def or_(self, filters):
+        self._logic.append(filters)
+        return self
+
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self._limit = size
+        return self
+
+    def execute(self):
+        write = self._operation != "select"
+        return self._client._transaction(self._run, write=write, table=self._table, payload=self._payload)
+
+    # ----- SQL -----
+
+    def _run(self, conn):
+        client = self._client
+        table = client._table_name(self._table)
+        if self._operation in ("insert", "upsert"):
+            return client._insert(conn, table, self._payload, self._on_conflict)
+
+        params = []
+        where = self._where(table, params)
+        if self._operation == "update":
+            if not self._payload:
+                return []
+            assignments = []
+            values = []
+            for column, value in self._payload.items():
+                assignments.append(f"{client._column(table, column)} = ?")
+                values.append(client._to_sql(table, column, value))
+            sql = f"update {table} set {', '.join(assignments)}{where} returning *"
+            return [client._row(table, r) for r in conn.execute(sql, values + params)]
+        if self._operation == "delete":
+            return [client._row(table, r) for r in conn.execute(f"delete from {table}{where} returning *", params)]
+
+        sql = f"select * from {table}{where}"
+        if self._order:
+            # Postgres puts nulls last when ascending and first when descending
+            sql += " order by " + ", ".join(
+                f"{client._column(table, c)} {'desc nulls first' if desc else 'asc nulls last'}"
+                for c, desc in self._order
+            )
+        if self._limit is not None:
+            sql += " limit ?"
+            params.append(int(self._limit))
+        rows = [client._row(table, r) for r in conn.execute(sql, params)]
+        return self._shape(conn, table, rows)
+
+    def _where(self, table, params):
+        embeds = _parse_columns(self._columns)[1] if self._operation == "select" else {}
+        conditions = [
+            self._client._condition(table, c, op, v, params)
+            for c, op, v in self._filters if "." not in c and c not in embeds
+        ]
+        # Inner embeds keep the rows with a matching related row; null ones the rows without
+        for name, (resource, inner, _) in embeds.items():
+            empty = any(c == name and op == "is" and str(v).lower() == "null" for c, op, v in self._filters)
+            if inner or empty:
+                subquery = self._related(table, name, resource, params)
+                conditions.append(f"{'not exists' if empty else 'exists'} ({subquery})")
+        conditions.extend(self._client._logic(table, text, params) for text in self._logic)
+        return " where " + " and ".join(conditions) if conditions else ""
+
+    def _embed_conditions(self, name, resource, params):
+        """SQL conditions of the filters on embed ``name`` (``name.column``)."""
+        prefix = name + "."
+        return [
+            self._client._condition(resource, c[len(prefix):], op, v, params)
+            for c, op, v in self._filters if c.startswith(prefix)
+        ]
+
+    def _related(self, table, name, resource, params):
+        """A subquery for the rows of embed ``name`` related to the current ``table`` row."""
+        _, local, remote = _relation(table, resource)
+        conditions = [f"{resource}.{self._client._column(resource, remote)} = {table}.{local}"]
+        conditions.extend(self._embed_conditions(name, resource, params))
+        return f"select 1 from {resource} where {' and '.join(conditions)}"
+
+    def _shape(self, conn, table, rows):
+        client = self._client
+        columns, embeds = _parse_columns(self._columns)
+        shaped = [_project(row, columns) for row in rows]
+        for name, (resource, _, inner_columns) in embeds.items():
+            kind, local, remote = _relation(table, resource)
+            values = list({row[local] for row in rows if row.get(local) is not None})
+            related = {}
+            if values:
+                params = list(values)
+                conditions = [f"{client._column(resource, remote)} in ({', '.join('?' * len(values))})"]
+                conditions.extend(self._embed_conditions(name, resource, params))
+                sql = f"select * from {resource} where {' and '.join(conditions)}"
+                for r in conn.execute(sql, params):
+                    r = client._row(resource, r)
+                    related.setdefault(r[remote], []).append(_project(r, inner_columns))
+            for row, out in zip(rows, shaped):
+                found = related.get(row.get(local), [])
+                out[name] = found if kind == "many" else (found[0] if found else None)
+        return shaped
+
+
+class SQLiteRpc:
+    def __init__(self, client, fn, params):
+        self._client = client
+        self._fn = fn
+        self._params = params
+        self.request = SimpleNamespace(path=f"/rest/v1/rpc/{fn}", http_method="POST", headers={})
+
+    def execute(self):
+        handler = getattr(self._client, f"_rpc_{self._fn}", None)
+        if handler is None:
+            raise _api_error("PGRST202", f"Could not find the function public.{self._fn}")
+        return self._client._transaction(lambda conn: handler(conn, **self._params), write=True)
+
+
+class SQLiteClient:
+    """Storage on a local SQLite database file (created if missing).
+
+    Each thread that executes queries gets its own connection; WAL mode
+    needs a real file, so ``path`` cannot be ``":memory:"``.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute("pragma journal_mode = wal")
+        conn.executescript(SCHEMA)
+        # table -> column -> declared type, table -> boolean columns,
+        # table -> primary key columns, and table -> [(column, parent, parent column)]
+        self._types = {}
+        self._booleans = {}
+        self._primary_keys = {}
+        self._foreign_keys = {}
+        for (table,) in conn.execute("select name from sqlite_master where type = 'table'"):
+            if table.startswith("sqlite_"):
+                continue
+            info = conn.execute(f"pragma table_info({table})").fetchall()
+            self._types[table] = {r["name"]: r["type"].lower() for r in info}
+            self._primary_keys[table] = [r["name"] for r in sorted(info, key=lambda r: r["pk"]) if r["pk"]]
+            self._booleans[table] = tuple(c for c, t in self._types[table].items() if t == "boolean")
+            self._foreign_keys[table] = [
+                (r["from"], r["table"], r["to"]) for r in conn.execute(f"pragma foreign_key_list({table})")
+            ]
+
+    # ----- supabase-py surface -----
+
+    def table(self, name):
+        return SQLiteQuery(self, name)
+
+    def rpc(self, fn, params):
+        return SQLiteRpc(self, fn, params)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # ----- connections and transactions -----
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma foreign_keys = on")
+            # Durable across application crashes; WAL makes this safe and fast
+            conn.execute("pragma synchronous = normal")
+            conn.create_function(
+                "registration_source", 0, lambda: getattr(self._local, "registration_source", None),
+            )
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _transaction(self, run, write, table=None, payload=None):
+        """Run ``run(conn)`` in one transaction and wrap its rows in a response.
+
+        Writers take the write lock up front (``BEGIN IMMEDIATE``), so a
+        read-then-write inside ``run`` cannot interleave with another writer.
+        """
+        conn = self._connection()
+        conn.execute("begin immediate" if write else "begin")
+        try:
+            data = run(conn)
+            conn.execute("commit")
+        except sqlite3.IntegrityError as e:
+            conn.execute("rollback")
+            raise self._integrity_error(conn, e, table, payload) from e
+        except BaseException:
+            conn.execute("rollback")
+            raise
+        # The rows come straight from SQLite; skip re-validating every one of them
+        return APIResponse.model_construct(data=data if data is not None else [], count=None)
+
+    def _integrity_error(self, conn, error, table, payload):
+        """The PostgREST error Postgres would have raised for ``error``."""
+        message = str(error)
+        if message.startswith("UNIQUE") or "PRIMARY KEY" in message:
+            return _api_error("23505", f'duplicate key value violates unique constraint "{table}_pkey"', message)
+        if message.startswith("NOT NULL"):
+            return _api_error("23502", f"null value violates not-null constraint ({message})")
+        if message.startswith("FOREIGN KEY"):
+            # SQLite does not say which key failed; find the first missing parent
+            rows = payload if isinstance(payload, list) else [payload or {}]
+            for column, parent, parent_column in self._foreign_keys.get(table, ()):
+                for row in rows:
+                    value = row.get(column)
+                    found = conn.execute(f"select 1 from {parent} where {parent_column} = ?", (value,)).fetchone()
+                    if found is None:
+                        return _api_error(
+                            "23503",
+                            f'insert or update on table "{table}" violates foreign key constraint',
+                            f'Key ({column})=({value}) is not present in table "{parent}".',
+                        )
+            return _api_error("23503", f'violates foreign key constraint on table "{table}"', message)
+        return _api_error("23514", message)
+
+    # ----- SQL building blocks -----
+
+    def _table_name(self, table):
+        if table not in self._types:
+            raise _api_error("42P01", f'relation "public.{table}" does not exist')
+        return table
+
+    def _column(self, table, column):
+        if column not in self._types.get(table, {}) or not _IDENTIFIER_RE.match(column):
+            raise _api_error("42703", f"column {table}.{column} does not exist")
+        return column
+
+    def _to_sql(self, table, column, value):
+        kind = self._types[table].get(column)
+        if value is None:
+            return None
+        if kind == "timestamp":
+            return to_timestamp(value)
+        if kind == "boolean" and isinstance(value, str):
+            return {"true": 1, "false": 0}.get(value.lower(), value)
+        return value
+
+    def _row(self, table, row):
+        out = dict(row)
+        for column in self._booleans[table]:
+            if out[column] is not None:
+                out[column] = bool(out[column])
+        return out
+
+    def _condition(self, table, column, op, value, params):
+        name = self._column(table, column)
+        if op == "is":
+            text = str(value).lower()
+            if text == "null":
+                return f"{name} is null"
+            params.append(1 if text == "true" else 0)
+            return f"{name} is ?"
+        if op == "in":
+            values = [self._to_sql(table, column, v) for v in value]
+            if not values:
+                return "0"
+            params.extend(values)
+            return f"{name} in ({', '.join('?' * len(values))})"
+        if op not in _OPERATORS:
+            raise _api_error("PGRST100", f"unsupported operator {op}")
+        params.append(self._to_sql(table, column, value))
+        return f"{name} {_OPERATORS[op]} ?"
+
+    def _logic(self, table, text, params, how="or"):
+        """SQL for a PostgREST logic tree like ``a.gt.1,and(b.eq."x",c.lt.2)``."""
+        terms = []
+        for part in _split_top_level(text):
+            for keyword in ("and", "or"):
+                if part.startswith(keyword + "(") and part.endswith(")"):
+                    terms.append(self._logic(table, part[len(keyword) + 1:-1], params, keyword))
+                    break
+            else:
+                column, op, value = part.split(".", 2)
+                if value.startswith('"') and value.endswith('"'):
+                    value = value[1:-1]
+                terms.append(self._condition(table, column, op, value, params))
+        return "(" + f" {how} ".join(terms) + ")"
+
+    def _insert(self, conn, table, payload, on_conflict=None):
+        rows = payload if isinstance(payload, list) else [payload]
+        if not rows:
+            return []
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        if not columns:
+            return [self._row(table, r) for r in conn.execute(f"insert into {table} default values returning *")]
+        placeholders = "(" + ", ".join("?" * len(columns)) + ")"
+        params = [self._to_sql(table, c, row.get(c)) for row in rows for c in columns]
+        sql = (f"insert into {table} ({', '.join(self._column(table, c) for c in columns)}) "
+               f"values {', '.join([placeholders] * len(rows))}")
+        if on_conflict is not None:
+            sql += self._conflict_clause(table, columns, *on_conflict)
+        return [self._row(table, r) for r in conn.execute(sql + " returning *", params)]
+
+    def _conflict_clause(self, table, columns, conflict, ignore_duplicates):
+        conflict = [self._column(table, c) for c in conflict or self._primary_keys[table]]
+        if ignore_duplicates:
+            return f" on conflict ({', '.join(conflict)}) do nothing"
+        # With nothing else to merge, a no-op assignment still returns the existing row
+        merged = [c for c in columns if c not in conflict] or conflict[:1]
+        return (f" on conflict ({', '.join(conflict)}) do update set "
+                + ", ".join(f"{c} = excluded.{c}" for c in merged))
+
+    # ----- helpers for the RPCs -----
+
+    @staticmethod
+    def _event(conn, event_id):
+        return conn.execute("select id, quantity_left from events where id = ?", (event_id,)).fetchone()
+
+    @staticmethod
+    def _user_exists(conn, user_id):
+        return conn.execute("select 1 from users where id = ?", (user_id,)).fetchone() is not None
+
+    @staticmethod
+    def _registered(conn, user_id, event_id):
+        return conn.execute(
+            "select 1 from registrations where user_id = ? and event_id = ?", (user_id, event_id),
+        ).fetchone() is not None
+
+    @staticmethod
+    def _register(conn, user_id, event_id):
+        """Insert a registration; False if the user already had one."""
+        cursor = conn.execute(
+            "insert into registrations (user_id, event_id) values (?, ?) on conflict do nothing",
+            (user_id, event_id),
+        )
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def _set_seats(conn, event_id, left):
+        conn.execute("update events set quantity_left = ? where id = ?", (left, event_id))
+
+    # ----- RPCs (db/migrations) -----
+
+    def _rpc_reserve_seat(self, conn, p_event_id, p_user_id):
+        event = self._event(conn, p_event_id)
+        if event is None:
+            return [{"status": "event_not_found", "quantity_left": None}]
+        left = event["quantity_left"]
+        if not self._user_exists(conn, p_user_id):
+            return [{"status": "user_not_found", "quantity_left": left}]
+        if self._registered(conn, p_user_id, event["id"]):
+            return [{"status": "already_registered", "quantity_left": left}]
+        if (left or 0) <= 0:
+            return [{"status": "sold_out", "quantity_left": 0}]
+        self._register(conn, p_user_id, event["id"])
+        self._set_seats(conn, event["id"], left - 1)
+        return [{"status": "reserved", "quantity_left": left - 1}]
+
+    def _rpc_reserve_seats(self, conn, p_event_id, p_user_ids):
+        event = self._event(conn, p_event_id)
+        if event is None:
+            return [{"user_id": u, "status": "event_not_found", "quantity_left": None} for u in p_user_ids]
+        left = event["quantity_left"]
+        statuses = {}
+        for user_id in p_user_ids:
+            if user_id not in statuses:
+                statuses[user_id] = (
+                    "user_not_found" if not self._user_exists(conn, user_id)
+                    else "already_registered" if self._registered(conn, user_id, event["id"])
+                    else "reserved"
+                )
+        wanted = [u for u, s in statuses.items() if s == "reserved"]
+        if len(wanted) > (left or 0):
+            return [{"user_id": u, "status": "sold_out" if s == "reserved" else s, "quantity_left": left}
+                    for u, s in statuses.items()]
+        if wanted:
+            for user_id in wanted:
+                self._register(conn, user_id, event["id"])
+            left -= len(wanted)
+            self._set_seats(conn, event["id"], left)
+        return [{"user_id": u, "status": s, "quantity_left": left} for u, s in statuses.items()]
+
+    def _rpc_promote_waitlist(self, conn, p_event_id):
+        promoted = []
+        # Read by the registrations trigger, like spark_bytes.registration_source in 005
+        self._local.registration_source = "waitlist"
+        try:
+            while True:
+                event = self._event(conn, p_event_id)
+                if event is None or (event["quantity_left"] or 0) <= 0:
+                    break
+                head = conn.execute(
+                    "select w.user_id from waitlist w"
+                    " join waitlist_queues q on q.event_id = w.event_id and w.ticket = q.head_ticket"
+                    " where w.event_id = ?",
+                    (event["id"],),
+                ).fetchone()
+                if head is None:
+                    break
+                user_id = head["user_id"]
+                conn.execute("delete from waitlist where event_id = ? and user_id = ?", (event["id"], user_id))
+                conn.execute("update waitlist_queues set head_ticket = head_ticket + 1 where event_id = ?",
+                             (event["id"],))
+                if self._register(conn, user_id, event["id"]):
+                    self._set_seats(conn, event["id"], event["quantity_left"] - 1)
+                    promoted.append({"user_id": str(user_id)})
+        finally:
+            self._local.registration_source = None
+        return promoted
+
+    def _rpc_join_waitlist(self, conn, p_event_id, p_user_id):
+        event = self._event(conn, p_event_id)
+        if event is None:
+            return [{"status": "event_not_found", "position": None, "quantity_left": None}]
+        left = event["quantity_left"]
+        if not self._user_exists(conn, p_user_id):
+            return [{"status": "user_not_found", "position": None, "quantity_left": left}]
+        if self._registered(conn, p_user_id, event["id"]):
+            return [{"status": "already_registered", "position": None, "quantity_left": left}]
+
+        conn.execute("insert into waitlist_queues (event_id) values (?) on conflict (event_id) do nothing",
+                     (event["id"],))
+        mine = conn.execute(
+            "select w.ticket - q.head_ticket + 1 as position from waitlist w"
+            " join waitlist_queues q on q.event_id = w.event_id"
+            " where w.event_id = ? and w.user_id = ?",
+            (event["id"], p_user_id),
+        ).fetchone()
+        if mine is not None:
+            return [{"status": "waitlisted", "position": mine["position"], "quantity_left": left}]
+
+        # Nobody can be waiting while seats are free, so a free seat is ours
+        if (left or 0) > 0:
+            self._register(conn, p_user_id, event["id"])
+            self._set_seats(conn, event["id"], left - 1)
+            return [{"status": "reserved", "position": None, "quantity_left": left - 1}]
+
+        queue = conn.execute(
+            "update waitlist_queues set next_ticket = next_ticket + 1 where event_id = ?"
+            " returning next_ticket - 1 as ticket, head_ticket",
+            (event["id"],),
+        ).fetchone()
+        conn.execute("insert into waitlist (event_id, user_id, ticket) values (?, ?, ?)",
+                     (event["id"], p_user_id, queue["ticket"]))
+        return [{"status": "waitlisted", "position": queue["ticket"] - queue["head_ticket"] + 1,
+                 "quantity_left": left}]
+
+    def _rpc_leave_waitlist(self, conn, p_event_id, p_user_id):
+        left = conn.execute(
+            "delete from waitlist where event_id = ? and user_id = ? returning event_id, ticket",
+            (p_event_id, p_user_id),
+        ).fetchone()
+        if left is None:
+            return [{"status": "not_waitlisted"}]
+        # Close the gap so tickets stay dense
+        conn.execute("update waitlist set ticket = ticket - 1 where event_id = ? and ticket > ?",
+                     (left["event_id"], left["ticket"]))
+        conn.execute("update waitlist_queues set next_ticket = next_ticket - 1 where event_id = ?",
+                     (left["event_id"],))
+        return [{"status": "left"}]
+
+    def _rpc_release_and_promote(self, conn, p_event_id, p_user_id):
+        released = conn.execute(
+            "delete from registrations where user_id = ? and event_id = ? returning event_id",
+            (p_user_id, p_event_id),
+        ).fetchone()
+        if released is None:
+            return [{"status": "not_registered", "quantity_left": None, "promoted_user_ids": []}]
+        event_id = released["event_id"]
+        conn.execute("update events set quantity_left = quantity_left + 1 where id = ?", (event_id,))
+        promoted = [p["user_id"] for p in self._rpc_promote_waitlist(conn, event_id)]
+        left = self._event(conn, event_id)["quantity_left"]
+        return [{"status": "released", "quantity_left": left, "promoted_user_ids": promoted}]
+
+    def _rpc_claim_outbox(self, conn, p_limit, p_lease_seconds=60):
+        rows = conn.execute(
+            f"update notification_outbox"
+            f"   set attempts = attempts + 1,"
+            f"       next_attempt_at = strftime('{_TIMESTAMP_FORMAT}', 'now', ?)"
+            f" where id in (select id from notification_outbox"
+            f"               where status = 'pending' and next_attempt_at <= {NOW}"
+            f"               order by next_attempt_at, id limit ?)"
+            f" returning *",
+            (f"+{int(p_lease_seconds)} seconds", int(p_limit)),
+        )
+        return sorted((self._row("notification_outbox", r) for r in rows), key=lambda r: r["id"])
+
+    def _rpc_retry_outbox(self, conn, p_ids, p_errors, p_max_attempts, p_backoff_seconds):
+        conn.executemany(
+            f"update notification_outbox"
+            f"   set status = case when attempts >= ? then 'failed' else 'pending' end,"
+            f"       last_error = ?,"
+            f"       next_attempt_at = strftime('{_TIMESTAMP_FORMAT}', 'now',"
+            f"           '+' || min(? * (1 << max(attempts - 1, 0)), 3600) || ' seconds')"
+            f" where id = ?",
+            [(p_max_attempts, error, p_backoff_seconds, outbox_id) for outbox_id, error in zip(p_ids, p_errors)],
+        )
+        return None
+
+    def _rpc_enqueue_event_reminders(self, conn, p_event_ids, p_lead_seconds):
+        ids = list(p_event_ids)
+        if not ids:
+            return []
+        # Events starting within the lead time plus a minute of slack
+        stamped = [r["id"] for r in conn.execute(
+            f"update events set reminder_sent_at = {NOW}"
+            f" where id in ({', '.join('?' * len(ids))})"
+            f"   and reminder_sent_at is null"
+            f"   and start_time > {NOW}"
+            f"   and start_time <= strftime('{_TIMESTAMP_FORMAT}', 'now', ?)"
+            f" returning id",
+            ids + [f"+{int(p_lead_seconds) + 60} seconds"],
+        )]
+        if stamped:
+            conn.execute(
+                f"insert into notification_outbox (kind, user_id, event_id)"
+                f" select 'reminder', user_id, event_id from registrations"
+                f" where event_id in ({', '.join('?' * len(stamped))})",
+                stamped,
+            )
+        return [{"event_id": str(event_id)} for event_id in stamped]
+
+    def _rpc_add_created_events(self, conn, p_counts):
+        updated = []
+        for user_id, count in p_counts.items():
+            row = conn.execute(
+                "update users set created_events = coalesce(created_events, 0) + ? where id = ?"
+                " returning id, created_events",
+                (int(count), str(user_id)),
+            ).fetchone()
+            if row is not None:
+                updated.append({"user_id": row["id"], "created_events": row["created_events"]})
+        return updated
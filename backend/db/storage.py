@@ -0,0 +1,56 @@
+"""The storage interface the backend depends on, and the backend behind it.
+
+Handlers, loaders and background workers reach storage only through the
+supabase-py client surface:
+
+* ``table(name)`` returns a query builder: ``select(columns)`` (with
+  embedded resources such as ``"*, food_items(*)"``), ``insert(rows)``,
+  ``upsert(rows, on_conflict=...)``, ``update(values)`` or ``delete()``, narrowed by ``eq``, ``neq``, ``gt``,
+  ``gte``, ``lt``, ``lte``, ``in_``, ``is_``, ``ilike`` and ``or_`` and
+  shaped by ``order`` and ``limit``;
+* ``rpc(fn, params)`` calls one of the functions in db/migrations;
+* ``execute()`` on either runs it and returns a response whose ``data``
+  holds the rows. Constraint violations raise
+  ``postgrest.exceptions.APIError`` carrying the Postgres error code.
+
+``STORAGE_BACKEND`` picks the implementation:
+
+``supabase`` (default)
+    Supabase over HTTPS (db/supabaseclient.py).
+``sqlite``
+    A local SQLite database in WAL mode at ``SQLITE_PATH`` (db/sqliteclient.py),
+    for single-node deployments and benchmark runs: no network hop per query.
+"""
+import os
+from typing import Any, Protocol
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "spark_bytes.db")
+
+
+class Query(Protocol):
+    def execute(self) -> Any: ...
+
+
+class Storage(Protocol):
+    def table(self, name: str) -> Any: ...
+
+    def rpc(self, fn: str, params: dict) -> Query: ...
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    """The client for ``backend``; only the chosen backend's module is imported."""
+    if backend == "supabase":
+        from db.supabaseclient import supabase
+        return supabase
+    if backend == "sqlite":
+        from db.sqliteclient import SQLiteClient
+        return SQLiteClient(SQLITE_PATH)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected 'supabase' or 'sqlite'")
+
+
+storage = create_storage()
@@ -1,16 +1,85 @@
-from fastapi import FastAPI, HTTPException, status
-from db.supabaseclient import supabase
-from datetime import datetime
-from models.user import User, UserResponse
-from models.event import EventCreate, EventUpdate, FoodItem
-
-from pydantic import BaseModel
-
-app = FastAPI()
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+# Whichever backend STORAGE_BACKEND selects (db/storage.py); handlers use the Supabase client API
+from db.storage import storage as supabase
+from db.asyncdb import execute
+from db.cache import EVENT_LIST_TAG, catalog_cache, catalog_version, event_tag, invalidate_event, invalidate_event_lists, invalidate_event_registrants, invalidate_user, user_cache, user_version
+from db.loaders import load_food_items, load_user
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor, keyset_page, split_page
+from services.bulk_import import InvalidImport, parse_import
+from services.event_filters import EventFilters, FoodIndex
+from services.notifications import MailgunSender, OutboxWorker
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render as render_metrics
+from services.reminders import ReminderScheduler
+from services.search import SearchIndex
+from services.tracing import TracingMiddleware, round_trip_budget
+from datetime import datetime, timezone
+from models.user import DashboardResponse, User, UserProfile, UserResponse
+from models.event import BulkImportResponse, EventCreate, EventCreateResponse, EventFacets, EventListItemOut, EventOut, EventSearchHit, EventUpdate, EventUpdateResponse, EventWithFoodOut, FoodItem
+
+from postgrest.exceptions import APIError
+from pydantic import BaseModel, Field, ValidationError
+
+# Sends the emails that database triggers queue in notification_outbox
+# (db/migrations/005_notification_outbox.sql); handlers only wake it.
+outbox_worker = OutboxWorker(supabase, MailgunSender.from_env())
+
+# Queues reminder emails REMINDER_LEAD_MINUTES before events start
+# (services/reminders.py); event writes keep its schedule current.
+reminder_scheduler = ReminderScheduler(supabase, on_enqueued=outbox_worker.wake)
+
+# Answers GET /events/search and GET /events/facets from memory (services/search.py);
+# event writes keep it current and a background task reloads it for other workers' writes.
+search_index = SearchIndex()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [asyncio.create_task(search_index.run_forever(supabase))]
+    if outbox_worker.sender:
+        tasks.append(asyncio.create_task(outbox_worker.run_forever()))
+        tasks.append(asyncio.create_task(reminder_scheduler.run_forever()))
+    yield
+    for task in tasks:
+        task.cancel()
+
+app = FastAPI(lifespan=lifespan)
+
+# Most batches of events GET /events scans to fill one filtered page
+MAX_SCAN_BATCHES = 5
+
+# Events fetched per Supabase round trip by GET /events/export
+EXPORT_PAGE_SIZE = MAX_PAGE_SIZE
+
+# Event columns that decide a row's position in, or membership of, list pages
+LIST_FILTER_FIELDS = {"start_time", "end_time", "location_name"}
+
+# Cached stand-in for "no such event" so repeated misses skip Supabase too
+EVENT_NOT_FOUND = object()
+
+# Postgres error codes surfaced by PostgREST
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+# reserve_seat() outcomes other than "reserved", mapped to HTTP errors
+RESERVATION_ERRORS = {
+    "event_not_found": (404, "Event not found"),
+    "user_not_found": (404, "User not found"),
+    "sold_out": (400, "No spots left"),
+    "already_registered": (400, "Already registered"),
+}
+
+# Most users one group registration may include
+MAX_GROUP_SIZE = 100
 
 class RegisterPayload(BaseModel):
     user_id: str
 
+class GroupRegisterPayload(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=MAX_GROUP_SIZE)
+
 
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -21,8 +90,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+# Counts each request's Supabase round trips against its @round_trip_budget
+app.add_middleware(TracingMiddleware)
+# Outermost, so the latency it records covers every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Utility functions
 def get_bu_email_id(email: str) -> str:
     """Convert email to bu.edu ID format (without @bu.edu)"""
@@ -40,18 +115,120 @@ def now_with_tz(tz):
     """Return current time aligned with provided tz (or UTC if None)."""
     return datetime.now(tz) if tz else datetime.utcnow()
 
+def event_time_error(start_time, end_time) -> Optional[str]:
+    """Why an event's start/end times are not acceptable, or None when they are."""
+    try:
+        start_dt = parse_iso_datetime(str(start_time))
+        end_dt = parse_iso_datetime(str(end_time))
+    except Exception:
+        return "Invalid date format for start_time or end_time"
+    if start_dt <= now_with_tz(start_dt.tzinfo):
+        return "Start time must be in the future"
+    try:
+        if end_dt <= start_dt:
+            return "End time must be after start time"
+    except TypeError:
+        # One time has a timezone and the other does not
+        return "Invalid date format for start_time or end_time"
+    return None
+
+def new_event_row(event_data: EventCreate) -> dict:
+    """The events row inserted for a newly created event."""
+    return {
+        "name": event_data.name,
+        "description": event_data.description,
+        "location_name": event_data.location_name,
+        "start_time": event_data.start_time,
+        "end_time": event_data.end_time,
+        "quantity_left": event_data.capacity,
+        "creator_name": event_data.creator_name,
+        "creator_id": event_data.creator_id,
+        "created_at": datetime.now().isoformat()
+    }
+
+def new_food_rows(food_items: Optional[List[FoodItem]], event_id) -> list:
+    """The food_items rows inserted for an event, skipping unnamed items."""
+    food_rows = []
+    for item in food_items or []:
+        # Skip empty rows to avoid DB errors on required columns
+        if not item or not item.name:
+            continue
+        food_rows.append({
+            "name": item.name,
+            "allergy_info": item.allergy_info,
+            "is_kosher": item.is_kosher,
+            "is_halal": item.is_halal,
+            "event_id": event_id,
+        })
+    return food_rows
+
+def start_time_key(event: dict) -> datetime:
+    """Sort key for events by start_time; naive times are taken as UTC, unparseable ones sort last."""
+    try:
+        dt = parse_iso_datetime(str(event.get("start_time")))
+    except ValueError:
+        return datetime.max.replace(tzinfo=timezone.utc)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+async def attach_food_items(events: list) -> list:
+    """Give each event its food_items list and return all of their food rows.
+
+    Rows that came back without the embedded relation get theirs from chunked id lookups.
+    """
+    food_rows = []
+    not_embedded = []
+    for e in events:
+        if "food_items" in e:
+            e["food_items"] = e["food_items"] or []
+            food_rows.extend(e["food_items"])
+        else:
+            not_embedded.append(e)
+    if not_embedded:
+        loaded = await load_food_items(supabase, [e["id"] for e in not_embedded])
+        food_rows.extend(loaded)
+        food_items_map = {}
+        for item in loaded:
+            food_items_map.setdefault(str(item.get("event_id")), []).append(item)
+        for e in not_embedded:
+            e["food_items"] = food_items_map.get(str(e["id"]), [])
+    return food_rows
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a bare 304 if the client's If-None-Match names etag, else tag the response."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in client_tags or etag.removeprefix("W/") in client_tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    # Let browsers keep the body but revalidate it on every use
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
 @app.get("/")
 def root():
     return {"message": "FastAPI is running!"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the in-process event catalog cache (and, under "users", the user cache),
+    plus the size of the search index under "search"."""
+    return {**catalog_cache.stats(), "users": user_cache.stats(), "search": search_index.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Per-route request and per-table Supabase metrics in Prometheus text format."""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/users")
+@round_trip_budget(2)
 async def signup(user_data: User):
     try:
         # Check if user already exists
         user_id = user_data.id
-        existing_user = supabase.table("users").select("*").eq("id", user_id).execute()
+        existing_user = await load_user(supabase, user_id)
         
-        if existing_user.data:
+        if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User already exists with this email"
@@ -62,13 +239,13 @@ async def signup(user_data: User):
             "id": user_id,
             "email": user_data.email,
             "full_name": user_data.name,
-            "role": "student",  # Default role
-            "registered_events": []  # Empty list for registered events
+            "role": "student"  # Default role
         }
         
-        response = supabase.table("users").insert(user_data_dict).execute()
+        response = await execute(supabase.table("users").insert(user_data_dict))
         
         if response.data:
+            invalidate_user(user_id)
             return {
                 "message": "User created successfully",
                 "user": {
@@ -92,35 +269,64 @@ async def signup(user_data: User):
             detail=f"Error during signup: {str(e)}"
         )
 
+@app.put("/users/{user_id}")
+@round_trip_budget(1)
+async def upsert_user(user_id: str, profile: UserProfile):
+    """
+    Sign-in in one round trip: creates the user on first login, otherwise
+    refreshes their name and email, and returns the stored user either way.
+    It is a single INSERT ... ON CONFLICT (id) DO UPDATE, so retries and
+    concurrent first logins are harmless; role and created_events of an
+    existing user are left alone.
+    """
+    try:
+        response = await execute(supabase.table("users").upsert({
+            "id": user_id,
+            "email": profile.email,
+            "full_name": profile.name,
+        }, on_conflict="id"))
+
+        if not response.data:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to save user"
+            )
+        invalidate_user(user_id)
+
+        user = response.data[0]
+        return {
+            "message": "User saved successfully",
+            "user": {
+                "id": user_id,
+                "email": user.get("email"),
+                "full_name": user.get("full_name"),
+                "role": user.get("role") or "student",
+                "created_events": user.get("created_events") or 0,
+            }
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error saving user: {str(e)}"
+        )
+
 @app.get("/users/{user_id}")
+@round_trip_budget(1)
 async def get_user(user_id: str):
     try:
-        response = supabase.table("users").select(
-            "email, full_name, role, registered_events, created_events"
-        ).eq("id", user_id).execute()
+        # Cached, with registrations embedded; pages ask on every load
+        raw_user = await load_user(supabase, user_id)
         
-        if not response.data:
+        if not raw_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        
-        raw_user = response.data[0]
 
-        # Normalize registered_events
-        registered_events_raw = raw_user.get("registered_events") or []
-        if isinstance(registered_events_raw, str):
-            try:
-                import json
-                parsed = json.loads(registered_events_raw)
-                if isinstance(parsed, list):
-                    registered_events_raw = parsed
-                else:
-                    registered_events_raw = []
-            except Exception:
-                registered_events_raw = []
-        elif not isinstance(registered_events_raw, list):
-            registered_events_raw = []
+        registrations = raw_user.get("registrations") or []
 
         # Normalize created_events
         created_raw = raw_user.get("created_events", 0)
@@ -133,7 +339,7 @@ async def get_user(user_id: str):
             "email": raw_user.get("email") or "",
             "name": raw_user.get("full_name") or "",  # Supabase uses full_name
             "role": raw_user.get("role") or "student",
-            "registered_events": [str(e) for e in registered_events_raw],
+            "registered_events": [str(r["event_id"]) for r in registrations],
             "created_events": created_val,
         }
 
@@ -150,108 +356,282 @@ async def get_user(user_id: str):
 
 # TODO: add exceptions for get events
 
-@app.get("/events")
-def get_events():
-    response = supabase.table("events").select("*").execute()
-
-    events = response.data
-    if not events:
-        return []
-
-    # Fetch related food items in one query
-    event_ids = [e["id"] for e in events]
-    food_items_map = {}
-    food_resp = supabase.table("food_items").select("*").in_("event_id", event_ids).execute()
-    for item in (food_resp.data or []):
-        event_id = str(item.get("event_id"))
-        food_items_map.setdefault(event_id, []).append({
-            "id": item.get("id"),
-            "name": item.get("name"),
-            "allergy_info": item.get("allergy_info"),
-            "is_kosher": item.get("is_kosher"),
-            "is_halal": item.get("is_halal"),
-            "category": item.get("category"),
-        })
+@app.get("/events", response_model=List[EventListItemOut])
+# Per scanned batch: the events, plus food items if they were not embedded
+@round_trip_budget(MAX_SCAN_BATCHES * 2)
+async def get_events(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    window: Optional[str] = None,
+    location: Optional[str] = None,
+    is_kosher: Optional[bool] = None,
+    is_halal: Optional[bool] = None,
+    exclude_allergens: List[str] = Query([]),
+):
+    """
+    Returns one page of events ordered by (start_time, id), optionally filtered.
+    window: "upcoming", "now" (happening now) or "active" (not ended yet).
+    When more events follow, the X-Next-Cursor header holds the cursor for the next page.
+    """
+    try:
+        filters = EventFilters.from_params(window, location, is_kosher, is_halal, exclude_allergens)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
-    for e in events:
-        e["id"] = str(e["id"])
-        e["start_time"] = str(e["start_time"])
-        e["end_time"] = str(e["end_time"])
-        e["location_name"] = str(e["location_name"])
-        e["end_time"] = str(e["end_time"])
-        e["created_at"] = str(e["created_at"])
-        e["quantity_left"] = str(e["quantity_left"])
-        e["description"] = str(e["description"])
-        e["food_items"] = food_items_map.get(e["id"], [])
+    now_dt = now_with_tz(timezone.utc)
+    # Time-window results change as the clock moves, so their tag also rolls over each minute
+    etag_qualifiers = (f"t{int(now_dt.timestamp() // 60)}",) if filters.window else ()
+    unchanged = not_modified(request, response, catalog_version.etag(*etag_qualifiers))
+    if unchanged:
+        return unchanged
+
+    cache_key = ("events", cursor, limit, filters)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        events, next_cursor = cached
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return events
+
+    # A write that lands while the batches are in flight makes them stale; don't cache them then
+    version = catalog_version.generation
+    events = []
+    scan_cursor = cursor
+    next_cursor = None
+
+    # Allergen exclusion can reject rows the database returned, so keep
+    # scanning batches until the page is full (bounded by MAX_SCAN_BATCHES).
+    for _ in range(MAX_SCAN_BATCHES):
+        # Food items come back embedded in the same round trip
+        query = filters.push_down(supabase.table("events").select(filters.columns("*, food_items(*)")), now_dt)
+        try:
+            query = keyset_page(query, scan_cursor, limit)
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
 
+        events_resp = await execute(query)
+        batch, scan_cursor = split_page(filters.strip(events_resp.data or []), limit)
+        if not batch:
+            break
+
+        food_rows = await attach_food_items(batch)
+
+        if filters.exclude_allergens:
+            excluded = FoodIndex(food_rows).excluded_by_allergens(filters.exclude_allergens)
+            batch = [e for e in batch if str(e["id"]) not in excluded]
+
+        events.extend(batch)
+        if len(events) >= limit:
+            if len(events) > limit or scan_cursor:
+                events = events[:limit]
+                next_cursor = encode_cursor(events[-1])
+            break
+        if scan_cursor is None:
+            break
+    else:
+        # Scan budget spent: resume after the last row examined.
+        next_cursor = scan_cursor
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    if catalog_version.generation == version:
+        catalog_cache.set(
+            cache_key,
+            (events, next_cursor),
+            tags=[EVENT_LIST_TAG] + [event_tag(e["id"]) for e in events],
+        )
     return events
 
 
-@app.get("/events/{event_id}")
-def get_event(event_id: str):
-    response = supabase.table("events").select("*").eq("id", event_id).execute()
-
-    events = response.data
-    if not events:
-        return []
-
-    # Fetch food items for this event
-    food_resp = supabase.table("food_items").select("*").eq("event_id", event_id).execute()
-    food_items = []
-    for item in (food_resp.data or []):
-        food_items.append({
-            "id": item.get("id"),
-            "name": item.get("name"),
-            "allergy_info": item.get("allergy_info"),
-            "is_kosher": item.get("is_kosher"),
-            "is_halal": item.get("is_halal"),
-            "category": item.get("category"),
-        })
+@app.get("/events/export")
+async def export_events(
+    cursor: Optional[str] = None,
+    window: Optional[str] = None,
+    location: Optional[str] = None,
+    is_kosher: Optional[bool] = None,
+    is_halal: Optional[bool] = None,
+    exclude_allergens: List[str] = Query([]),
+):
+    """
+    Streams every matching event, with its food items, as NDJSON (one event per line).
+    Takes the same filters as GET /events. Events are fetched EXPORT_PAGE_SIZE at a time
+    and written as each page arrives, so memory use and time to first byte do not grow
+    with the catalog. cursor (from X-Next-Cursor) resumes an export after that event.
+    """
+    try:
+        filters = EventFilters.from_params(window, location, is_kosher, is_halal, exclude_allergens)
+        if cursor:
+            decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
-    for e in events:
-        e["start_time"] = str(e["start_time"])
-        e["end_time"] = str(e["end_time"])
-        e["location_name"] = str(e["location_name"])
-        e["end_time"] = str(e["end_time"])
-        e["created_at"] = str(e["created_at"])
-        e["quantity_left"] = str(e["quantity_left"])
-        e["description"] = str(e["description"])
-        e["food_items"] = food_items
+    return StreamingResponse(
+        export_event_lines(filters, cursor, now_with_tz(timezone.utc)),
+        media_type="application/x-ndjson",
+    )
+
+async def export_event_lines(filters: EventFilters, cursor: Optional[str], now_dt: datetime):
+    """Yield one NDJSON chunk per page of events until the catalog is exhausted."""
+    while True:
+        query = filters.push_down(supabase.table("events").select(filters.columns("*, food_items(*)")), now_dt)
+        events_resp = await execute(keyset_page(query, cursor, EXPORT_PAGE_SIZE))
+        batch, cursor = split_page(filters.strip(events_resp.data or []), EXPORT_PAGE_SIZE)
+
+        food_rows = await attach_food_items(batch)
+        if filters.exclude_allergens:
+            excluded = FoodIndex(food_rows).excluded_by_allergens(filters.exclude_allergens)
+            batch = [e for e in batch if str(e["id"]) not in excluded]
+
+        if batch:
+            yield "".join(EventListItemOut.model_validate(e).model_dump_json() + "\n" for e in batch)
+        if cursor is None:
+            return
+
+
+@app.get("/events/search", response_model=List[EventSearchHit])
+# None once the index is loaded; the first search in a process loads it,
+# SEARCH_LOAD_PAGE_SIZE events per round trip
+@round_trip_budget(5)
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Full-text search over event names, descriptions and locations and the names and
+    categories of their food items, best match first. Every word of q must match;
+    words of two or more characters also match as prefixes ("piz" finds "pizza").
+    Answered from an in-memory index. Results carry no seat counts; GET /events/{event_id} has them.
+    """
+    try:
+        await search_index.ensure_loaded(supabase)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error loading search index: {str(e)}"
+        )
+    return search_index.search(q, limit)
 
-    return events
+
+@app.get("/events/facets", response_model=EventFacets)
+# As for search: only the first request in a process loads the index
+@round_trip_budget(5)
+async def get_event_facets():
+    """
+    Counts over the whole catalog: events with kosher / halal food, events per location
+    and per allergen, and events by time (happening now, starting within the next hour,
+    24 hours or 7 days, upcoming, ended). The counts are kept up to date as events change,
+    so a request only reads them.
+    """
+    try:
+        await search_index.ensure_loaded(supabase)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error loading search index: {str(e)}"
+        )
+    return search_index.facets.counts(now_with_tz(timezone.utc))
+
+
+@app.get("/events/{event_id}", response_model=EventWithFoodOut)
+@round_trip_budget(1)
+async def get_event(event_id: str, request: Request, response: Response, user_id: Optional[str] = None):
+    """
+    Returns one event with its food items, fetched in a single round trip.
+    user_id (optional): also report whether that user is registered (is_registered).
+    """
+    unchanged = not_modified(request, response, catalog_version.etag())
+    if unchanged:
+        return unchanged
+
+    # One entry per event, whoever asks; is_registered is added per request
+    cache_key = ("event", event_id)
+    cached = catalog_cache.get(cache_key)
+    if cached is EVENT_NOT_FOUND:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found")
+    if cached is not None:
+        if not user_id:
+            return cached
+        # The user's registrations come from user_cache, which registration writes invalidate
+        user = await load_user(supabase, user_id)
+        registered = user is not None and any(
+            str(r.get("event_id")) == str(cached["id"]) for r in user.get("registrations") or []
+        )
+        return dict(cached, is_registered=registered)
+
+    # Food items (and the caller's registration) come back as embedded resources
+    columns = "*, food_items(*)"
+    if user_id:
+        columns += ", registrations(user_id)"
+    query = supabase.table("events").select(columns).eq("id", event_id)
+    if user_id:
+        # Filters the embedded registrations only; the event is returned either way
+        query = query.eq("registrations.user_id", user_id)
+
+    # As in load_user: a write during the read leaves the row stale, so it is not cached
+    version = catalog_version.generation
+    event_resp = await execute(query)
+    if not event_resp.data:
+        if catalog_version.generation == version:
+            catalog_cache.set(cache_key, EVENT_NOT_FOUND, tags=[event_tag(event_id)])
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found")
+
+    event = event_resp.data[0]
+    event["food_items"] = event.get("food_items") or []
+    registrations = event.pop("registrations", None)
+    if catalog_version.generation == version:
+        catalog_cache.set(cache_key, event, tags=[event_tag(event_id)])
+    if user_id:
+        return dict(event, is_registered=bool(registrations))
+    return event
 
 # Additional endpoint to register for events
 @app.post("/events/{event_id}/registrations/{user_id}")
+@round_trip_budget(1)
 async def register_for_event(event_id: str, user_id: str):
     try:
-        # Get current user
-        user_response = supabase.table("users").select("registered_events").eq("id", user_id).execute()
-        
-        if not user_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        user = user_response.data[0]
-        registered_events = user.get("registered_events", [])
-        
-        # Check if already registered
-        if event_id in registered_events:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User already registered for this event"
-            )
-        
-        # Add event to registered events
-        registered_events.append(event_id)
-        
-        # Update user
-        update_response = supabase.table("users").update({
-            "registered_events": registered_events
-        }).eq("id", user_id).execute()
-        
-        if update_response.data:
+        # One insert; the (user_id, event_id) primary key rejects duplicates
+        # and the foreign keys reject unknown users or events.
+        try:
+            insert_response = await execute(supabase.table("registrations").insert({
+                "user_id": user_id,
+                "event_id": event_id,
+            }))
+        except APIError as e:
+            if e.code == UNIQUE_VIOLATION:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="User already registered for this event"
+                )
+            if e.code == FOREIGN_KEY_VIOLATION:
+                missing = "User" if "user_id" in str(e.details) else "Event"
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"{missing} not found"
+                )
+            raise
+
+        if insert_response.data:
+            # The event's per-user detail and the user's interested events changed
+            invalidate_event(event_id)
+            invalidate_user(user_id)
+            outbox_worker.wake()
             return {"message": "Successfully registered for event"}
         else:
             raise HTTPException(
@@ -269,108 +649,69 @@ async def register_for_event(event_id: str, user_id: str):
     
 # TODO look over rest of file for auth integration
     
-@app.post("/events")
+@app.post("/events", response_model=EventCreateResponse)
+@round_trip_budget(5)
 async def create_event(event_data: EventCreate):
     try:
         # Verify the user exists
-        user_response = supabase.table("users").select("*").eq("id", event_data.creator_id).execute()
+        user = await load_user(supabase, event_data.creator_id)
         
-        if not user_response.data:
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
         # Validate times
-        try:
-            start_dt = parse_iso_datetime(event_data.start_time)
-            end_dt = parse_iso_datetime(event_data.end_time)
-        except Exception:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid date format for start_time or end_time"
-            )
-        now_dt = now_with_tz(start_dt.tzinfo)
-        if start_dt <= now_dt:
+        time_error = event_time_error(event_data.start_time, event_data.end_time)
+        if time_error:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Start time must be in the future"
-            )
-        if end_dt <= start_dt:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="End time must be after start time"
+                detail=time_error
             )
 
         # Create the event with creator_name
-        event_dict = {
-            "name": event_data.name,
-            "description": event_data.description,
-            "location_name": event_data.location_name,
-            "start_time": event_data.start_time,
-            "end_time": event_data.end_time,
-            "quantity_left": event_data.capacity,
-            "creator_name": event_data.creator_name,
-            "creator_id": event_data.creator_id,
-            "created_at": datetime.now().isoformat()
-        }
+        event_dict = new_event_row(event_data)
 
         # Insert the event
-        response = supabase.table("events").insert(event_dict).execute()
+        response = await execute(supabase.table("events").insert(event_dict))
         
         if response.data:
             new_event = response.data[0]
+            invalidate_event_lists()
+            invalidate_event(new_event["id"])
             
             # Insert related food items if provided
-            if event_data.food_items:
-                food_rows = []
-                for item in event_data.food_items:
-                    # Skip empty rows to avoid DB errors on required columns
-                    if not item or not item.name:
-                        continue
-                    food_rows.append({
-                        "name": item.name,
-                        "allergy_info": item.allergy_info,
-                        "is_kosher": item.is_kosher,
-                        "is_halal": item.is_halal,
-                        "event_id": new_event["id"],
-                    })
-
-                if food_rows:
-                    food_insert_resp = supabase.table("food_items").insert(food_rows).execute()
-                    if not food_insert_resp.data:
-                        raise HTTPException(
-                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                            detail="Failed to create food items"
-                        )
-
-            # Update user's created_events count - handle None/undefined case safely
-            user = user_response.data[0]
-            current_created_events = user.get("created_events", 0)
-            
-            # Safely handle None, string, or any unexpected type
-            try:
-                if current_created_events is None:
-                    current_created_events = 0
-                else:
-                    current_created_events = int(current_created_events)
-            except (TypeError, ValueError):
-                current_created_events = 0
-            
-            new_created_events = current_created_events + 1
-            
-            update_response = supabase.table("users").update({
-                "created_events": new_created_events
-            }).eq("id", event_data.creator_id).execute()
+            food_rows = new_food_rows(event_data.food_items, new_event["id"])
+            created_food = []
+            if food_rows:
+                food_insert_resp = await execute(supabase.table("food_items").insert(food_rows))
+                if not food_insert_resp.data:
+                    raise HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail="Failed to create food items"
+                    )
+                created_food = food_insert_resp.data
+
+            # Count the event in the database (008), not from the possibly cached user row
+            update_response = await execute(supabase.rpc(
+                "add_created_events", {"p_counts": {event_data.creator_id: 1}}
+            ))
+            invalidate_user(event_data.creator_id)
             
             if update_response.data:
+                outbox_worker.wake()
+                reminder_scheduler.event_changed(new_event)
+                search_index.event_changed(new_event, created_food)
                 return {
                     "message": "Event created successfully",
                     "event": new_event
                 }
             else:
                 # Rollback event creation if user update fails
-                supabase.table("events").delete().eq("id", response.data[0]["id"]).execute()
+                await execute(supabase.table("events").delete().eq("id", response.data[0]["id"]))
+                invalidate_event_lists()
+                invalidate_event(new_event["id"])
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Failed to update user stats"
@@ -389,7 +730,147 @@ async def create_event(event_data: EventCreate):
             detail=f"Error creating event: {str(e)}"
         )
 
-@app.put("/events/{event_id}")
+@app.post("/events/bulk", response_model=BulkImportResponse)
+@round_trip_budget(5)
+async def bulk_create_events(request: Request):
+    """
+    Creates many events at once from a JSON array of events or a CSV file
+    (Content-Type: text/csv, food_items as ";"-separated names).
+    Every row is validated first; if any row fails, nothing is created and the
+    422 response lists each failing row (1-based). Otherwise the events, their
+    food items and each creator's created_events count are written in one
+    statement apiece.
+    """
+    try:
+        raw_rows = parse_import(await request.body(), request.headers.get("content-type", ""))
+    except InvalidImport as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    # 1. Validate every row before writing anything
+    errors = []
+    events = []
+    for row_number, raw in enumerate(raw_rows, start=1):
+        try:
+            event_data = EventCreate.model_validate(raw)
+        except ValidationError as e:
+            errors.append({
+                "row": row_number,
+                "error": "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+                    for err in e.errors()
+                ),
+            })
+            continue
+        time_error = event_time_error(event_data.start_time, event_data.end_time)
+        if time_error:
+            errors.append({"row": row_number, "error": time_error})
+            continue
+        events.append((row_number, event_data))
+
+    # 2. Look up every creator in one query
+    creator_ids = sorted({event_data.creator_id for _, event_data in events})
+    creators = {}
+    if creator_ids:
+        users_resp = await execute(
+            supabase.table("users").select("id").in_("id", creator_ids)
+        )
+        creators = {u["id"]: u for u in (users_resp.data or [])}
+    for row_number, event_data in events:
+        if event_data.creator_id not in creators:
+            errors.append({"row": row_number, "error": "User not found"})
+
+    if errors:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": "No events were created",
+                "errors": sorted(errors, key=lambda e: e["row"]),
+            }
+        )
+
+    try:
+        # 3. One insert for all events; PostgREST returns them in input order
+        insert_resp = await execute(
+            supabase.table("events").insert([new_event_row(event_data) for _, event_data in events])
+        )
+        created = insert_resp.data or []
+        if len(created) != len(events):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create events"
+            )
+        created_ids = [e["id"] for e in created]
+
+        def invalidate_created():
+            invalidate_event_lists()
+            for event_id in created_ids:
+                invalidate_event(event_id)
+
+        async def rollback():
+            await execute(supabase.table("events").delete().in_("id", created_ids))
+            invalidate_created()
+
+        invalidate_created()
+
+        # 4. One insert for all of their food items
+        food_rows = [
+            row
+            for (_, event_data), new_event in zip(events, created)
+            for row in new_food_rows(event_data.food_items, new_event["id"])
+        ]
+        created_food = {}
+        per_creator = {}
+        for _, event_data in events:
+            per_creator[event_data.creator_id] = per_creator.get(event_data.creator_id, 0) + 1
+
+        # A failed or raising (APIError) write below leaves no half-created events behind
+        try:
+            if food_rows:
+                food_insert_resp = await execute(supabase.table("food_items").insert(food_rows))
+                if not food_insert_resp.data:
+                    raise HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail="Failed to create food items"
+                    )
+                for item in food_insert_resp.data:
+                    created_food.setdefault(str(item.get("event_id")), []).append(item)
+
+            # 5. One atomic increment of every creator's counter (008)
+            try:
+                update_resp = await execute(supabase.rpc("add_created_events", {"p_counts": per_creator}))
+            finally:
+                invalidate_user(*per_creator)
+            if len(update_resp.data or []) != len(per_creator):
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to update user stats"
+                )
+        except Exception:
+            await rollback()
+            raise
+
+        outbox_worker.wake()
+        for new_event in created:
+            reminder_scheduler.event_changed(new_event)
+            search_index.event_changed(new_event, created_food.get(str(new_event["id"]), []))
+        return {
+            "message": f"{len(created)} events created successfully",
+            "events": created,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing events: {str(e)}"
+        )
+
+@app.put("/events/{event_id}", response_model=EventUpdateResponse)
+@round_trip_budget(5)
 async def update_event(event_id: str, event_data: EventUpdate, user_id: str):
     """
     Edit an event.
@@ -397,7 +878,7 @@ async def update_event(event_id: str, event_data: EventUpdate, user_id: str):
     """
     try:
         # 1. Check if the event exists
-        event_response = supabase.table("events").select("*").eq("id", event_id).execute()
+        event_response = await execute(supabase.table("events").select("*").eq("id", event_id))
         if not event_response.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -429,60 +910,49 @@ async def update_event(event_id: str, event_data: EventUpdate, user_id: str):
         new_start_str = update_data.get("start_time", event.get("start_time"))
         new_end_str = update_data.get("end_time", event.get("end_time"))
         if new_start_str and new_end_str:
-            try:
-                new_start_dt = parse_iso_datetime(str(new_start_str))
-                new_end_dt = parse_iso_datetime(str(new_end_str))
-            except Exception:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid date format for start_time or end_time"
-                )
-            now_dt = now_with_tz(new_start_dt.tzinfo)
-            if new_start_dt <= now_dt:
+            time_error = event_time_error(new_start_str, new_end_str)
+            if time_error:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Start time must be in the future"
+                    detail=time_error
                 )
-            if new_end_dt <= new_start_dt:
+
+        # 4. Call supabase to update (an edit of only the food leaves the row as it is;
+        # PostgREST answers an empty PATCH with no rows)
+        if update_data:
+            response = await execute(supabase.table("events").update(update_data).eq("id", event_id))
+            if not response.data:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="End time must be after start time"
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to update event"
                 )
+            updated_event = response.data[0]
+        else:
+            updated_event = event
 
-        # 4. Call supabase to update
-        response = supabase.table("events").update(update_data).eq("id", event_id).execute()
-        if not response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update event"
-            )
-
-        updated_event = response.data[0]
+        if update_data.get("quantity_left") is not None:
+            # Seats added to a full event go to its waitlist first
+            promoted = await execute(supabase.rpc("promote_waitlist", {"p_event_id": event_id}))
+            invalidate_user(*(row["user_id"] for row in promoted.data or []))
 
         # 5. Replace food items if provided
+        replaced_food = None
         if event_data.food_items is not None:
-            supabase.table("food_items").delete().eq("event_id", event_id).execute()
-            food_rows = []
-            for item in event_data.food_items:
-                if not item or not item.name:
-                    continue
-                food_rows.append({
-                    "name": item.name,
-                    "allergy_info": item.allergy_info,
-                    "is_kosher": item.is_kosher,
-                    "is_halal": item.is_halal,
-                    "event_id": event_id,
-                })
+            await execute(supabase.table("food_items").delete().eq("event_id", event_id))
+            food_rows = new_food_rows(event_data.food_items, event_id)
+            replaced_food = []
             if food_rows:
-                supabase.table("food_items").insert(food_rows).execute()
-
-        # 6. Maintain the same string processing as other interfaces.
-        updated_event["start_time"] = str(updated_event["start_time"])
-        updated_event["end_time"] = str(updated_event["end_time"])
-        updated_event["location_name"] = str(updated_event["location_name"])
-        updated_event["created_at"] = str(updated_event["created_at"])
-        updated_event["quantity_left"] = str(updated_event["quantity_left"])
-        updated_event["description"] = str(updated_event["description"])
+                food_insert_resp = await execute(supabase.table("food_items").insert(food_rows))
+                replaced_food = food_insert_resp.data or []
+
+        invalidate_event(event_id)
+        if event_data.food_items is not None or LIST_FILTER_FIELDS & update_data.keys():
+            # The event may have moved between pages or into/out of filtered lists
+            invalidate_event_lists()
+        outbox_worker.wake()
+        if "start_time" in update_data:
+            reminder_scheduler.event_changed(updated_event)
+        search_index.event_changed(updated_event, replaced_food)
 
         return {
             "message": "Event updated successfully",
@@ -498,22 +968,17 @@ async def update_event(event_id: str, event_data: EventUpdate, user_id: str):
         )
     
 # Update the get user created events endpoint
-@app.get("/users/{user_id}/created-events")
-async def get_user_created_events(user_id: str):
+@app.get("/users/{user_id}/created-events", response_model=List[EventOut])
+@round_trip_budget(1)
+async def get_user_created_events(user_id: str, request: Request, response: Response):
+    unchanged = not_modified(request, response, catalog_version.etag())
+    if unchanged:
+        return unchanged
+
     try:
         # Get events created by this user using creator_id
-        response = supabase.table("events").select("*").eq("creator_id", user_id).execute()
-        
-        events = response.data
-        for e in events:
-            e["start_time"] = str(e["start_time"])
-            e["end_time"] = str(e["end_time"])
-            e["location_name"] = str(e["location_name"])
-            e["created_at"] = str(e["created_at"])
-            e["quantity_left"] = str(e["quantity_left"])
-            e["description"] = str(e["description"])
-
-        return events
+        events_resp = await execute(supabase.table("events").select("*").eq("creator_id", user_id))
+        return events_resp.data
             
     except Exception as e:
         raise HTTPException(
@@ -522,106 +987,271 @@ async def get_user_created_events(user_id: str):
         )
     
 @app.post("/events/{event_id}/register")
+@round_trip_budget(1)
 async def register_event(event_id: str, payload: RegisterPayload):
+    """
+    Reserves a seat in one round trip. reserve_seat (db/migrations/002_registrations.sql)
+    decrements quantity_left only while it is positive and records the registration
+    in the same transaction, so concurrent requests cannot oversell the event.
+    """
     user_id = payload.user_id
 
-    # 1. Fetch the event
-    event_resp = supabase.table("events").select("*").eq("id", event_id).execute()
-    if not event_resp.data:
-        raise HTTPException(status_code=404, detail="Event not found")
+    result = await execute(supabase.rpc("reserve_seat", {
+        "p_event_id": event_id,
+        "p_user_id": user_id,
+    }))
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to register for event")
 
-    event = event_resp.data[0]
+    outcome = result.data[0]
+    if outcome["status"] in RESERVATION_ERRORS:
+        status_code, detail = RESERVATION_ERRORS[outcome["status"]]
+        raise HTTPException(status_code=status_code, detail=detail)
 
-    # 2. Check spots
-    if int(event.get("quantity_left", 0)) <= 0:
-        raise HTTPException(status_code=400, detail="No spots left")
+    invalidate_event(event_id)
+    invalidate_user(user_id)
+    outbox_worker.wake()
 
-    # 3. Fetch user
-    user_resp = supabase.table("users").select("*").eq("id", user_id).execute()
-    if not user_resp.data:
-        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "Registered Successfully", "quantity_left": outcome["quantity_left"]}
 
-    user = user_resp.data[0]
-    registered = user.get("registered_events", [])
 
-    if event_id in registered:
-        raise HTTPException(status_code=400, detail="Already registered")
+@app.post("/events/{event_id}/register/group")
+@round_trip_budget(1)
+async def register_group(event_id: str, payload: GroupRegisterPayload):
+    """
+    Registers several users for one event in one round trip. reserve_seats
+    (db/migrations/003_reserve_seats.sql) seats either every eligible user or
+    none of them, so a group never takes the last seats only partly.
+    Each user's outcome is reserved, already_registered or user_not_found.
+    """
+    # Duplicates would only come back as already_registered
+    user_ids = list(dict.fromkeys(payload.user_ids))
 
-    # 4. Register user
-    registered.append(event_id)
-    supabase.table("users").update({"registered_events": registered}).eq("id", user_id).execute()
-    supabase.table("events").update({"quantity_left": int(event["quantity_left"]) - 1}).eq("id", event_id).execute()
+    result = await execute(supabase.rpc("reserve_seats", {
+        "p_event_id": event_id,
+        "p_user_ids": user_ids,
+    }))
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to register group for event")
 
-    return {"message": "Registered Successfully"}
+    outcomes = [{"user_id": row["user_id"], "status": row["status"]} for row in result.data]
+    quantity_left = result.data[0]["quantity_left"]
+    statuses = {o["status"] for o in outcomes}
+
+    if "event_not_found" in statuses:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if "sold_out" in statuses:
+        raise HTTPException(status_code=400, detail={
+            "message": "Not enough spots left for the whole group",
+            "quantity_left": quantity_left,
+            "results": outcomes,
+        })
+
+    reserved = [o["user_id"] for o in outcomes if o["status"] == "reserved"]
+    if reserved:
+        invalidate_event(event_id)
+        invalidate_user(*reserved)
+        outbox_worker.wake()
+
+    return {
+        "message": f"Registered {len(reserved)} of {len(outcomes)} users",
+        "quantity_left": quantity_left,
+        "results": outcomes,
+    }
 
 
-@app.get("/users/{user_id}/interested-events")
-async def get_user_interested_events(user_id: str):
+@app.get("/users/{user_id}/interested-events", response_model=List[EventOut])
+@round_trip_budget(2)
+async def get_user_interested_events(user_id: str, request: Request, response: Response):
     """
     Returns all events that the user has registered for.
     """
+    unchanged = not_modified(request, response, catalog_version.etag())
+    if unchanged:
+        return unchanged
+
     try:
-        # 1. Fetch user
-        user_resp = supabase.table("users").select("registered_events").eq("id", user_id).execute()
-        if not user_resp.data:
-            raise HTTPException(status_code=404, detail="User not found")
+        # 1. Fetch the user's registrations with their events embedded (one round trip)
+        registrations_resp = await execute(
+            supabase.table("registrations").select("events(*)").eq("user_id", user_id)
+        )
+        events = [r["events"] for r in (registrations_resp.data or []) if r.get("events")]
 
-        user = user_resp.data[0]
-        registered_ids = user.get("registered_events", [])
-        
-        if not registered_ids:
+        if not events:
+            # 2. Tell "no registrations" apart from "no such user"
+            if not await load_user(supabase, user_id):
+                raise HTTPException(status_code=404, detail="User not found")
             return []  # no registered events
 
-        # 2. Fetch events the user is registered for
-        events_resp = supabase.table("events").select("*").in_("id", registered_ids).execute()
-        events = events_resp.data
-
-        # 3. Format fields for frontend
-        for e in events:
-            e["start_time"] = str(e.get("start_time"))
-            e["end_time"] = str(e.get("end_time"))
-            e["location_name"] = str(e.get("location_name"))
-            e["created_at"] = str(e.get("created_at"))
-            e["quantity_left"] = str(e.get("quantity_left"))
-            e["description"] = str(e.get("description"))
-
         return events
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error fetching interested events: {str(e)}"
         )
+@app.get("/users/{user_id}/dashboard", response_model=DashboardResponse)
+@round_trip_budget(1)
+async def get_user_dashboard(user_id: str, request: Request, response: Response):
+    """
+    Everything the dashboard page shows, in one request: profile, stats, and the
+    events the user created and registered for, each sorted by start_time.
+    The three Supabase queries run concurrently.
+    """
+    # The profile part changes with user writes (signup, sign-in), which bump user_version
+    unchanged = not_modified(request, response, catalog_version.etag(f"u{user_version.generation}"))
+    if unchanged:
+        return unchanged
+
+    try:
+        raw_user, created_resp, registrations_resp = await asyncio.gather(
+            load_user(supabase, user_id),
+            execute(supabase.table("events").select("*").eq("creator_id", user_id)),
+            execute(supabase.table("registrations").select("events(*)").eq("user_id", user_id)),
+        )
+
+        if not raw_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+        created_events = sorted(created_resp.data or [], key=start_time_key)
+        registered_events = sorted(
+            (r["events"] for r in (registrations_resp.data or []) if r.get("events")),
+            key=start_time_key,
+        )
+
+        now_dt = now_with_tz(timezone.utc)
+        upcoming_registered = sum(1 for e in registered_events if start_time_key(e) > now_dt)
+
+        try:
+            created_count = int(raw_user.get("created_events") or 0)
+        except (TypeError, ValueError):
+            created_count = len(created_events)
+
+        return {
+            "user": UserResponse(
+                email=raw_user.get("email") or "",
+                name=raw_user.get("full_name") or "",
+                role=raw_user.get("role") or "student",
+                registered_events=[str(e.get("id")) for e in registered_events],
+                created_events=created_count,
+            ),
+            "stats": {
+                "created_events": created_count,
+                "registered_events": len(registered_events),
+                "upcoming_registered_events": upcoming_registered,
+            },
+            "created_events": created_events,
+            "registered_events": registered_events,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching dashboard: {str(e)}"
+        )
+
 @app.post("/events/{event_id}/unregister")
+@round_trip_budget(1)
 async def unregister_event(event_id: str, payload: RegisterPayload):
     """
-    Removes the user from the event's registered list and increments quantity_left.
+    Removes the user's registration in one atomic call to release_and_promote
+    (db/migrations/004_waitlist.sql). The freed seat goes to the head of the
+    event's waitlist if anyone is waiting, otherwise back to quantity_left.
     """
     user_id = payload.user_id
 
-    # 1. Fetch user
-    user_resp = supabase.table("users").select("*").eq("id", user_id).execute()
-    if not user_resp.data:
-        raise HTTPException(status_code=404, detail="User not found")
-    user = user_resp.data[0]
-    registered = user.get("registered_events", [])
+    result = await execute(supabase.rpc("release_and_promote", {
+        "p_event_id": event_id,
+        "p_user_id": user_id,
+    }))
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to unregister from event")
 
-    if event_id not in registered:
+    outcome = result.data[0]
+    if outcome["status"] == "not_registered":
         raise HTTPException(status_code=400, detail="User is not registered for this event")
 
-    # 2. Remove event from user's registered events
-    registered.remove(event_id)
-    supabase.table("users").update({"registered_events": registered}).eq("id", user_id).execute()
+    invalidate_event(event_id)
+    invalidate_user(user_id, *(outcome.get("promoted_user_ids") or []))
+    outbox_worker.wake()
 
-    # 3. Increment event quantity_left
-    event_resp = supabase.table("events").select("*").eq("id", event_id).execute()
-    if event_resp.data:
-        event = event_resp.data[0]
-        supabase.table("events").update({"quantity_left": int(event["quantity_left"]) + 1}).eq("id", event_id).execute()
+    return {
+        "message": "Successfully unregistered from event",
+        "promoted_user_ids": outcome.get("promoted_user_ids") or [],
+    }
 
-    return {"message": "Successfully unregistered from event"}
+@app.post("/events/{event_id}/waitlist")
+@round_trip_budget(1)
+async def join_waitlist(event_id: str, payload: RegisterPayload):
+    """
+    One call instead of retrying /register until a seat frees up: registers the
+    user if a seat is free, otherwise puts them at the back of the event's FIFO
+    waitlist (db/migrations/004_waitlist.sql). Joining again keeps the old place.
+    """
+    result = await execute(supabase.rpc("join_waitlist", {
+        "p_event_id": event_id,
+        "p_user_id": payload.user_id,
+    }))
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to join waitlist")
+
+    outcome = result.data[0]
+    if outcome["status"] in RESERVATION_ERRORS:
+        status_code, detail = RESERVATION_ERRORS[outcome["status"]]
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    if outcome["status"] == "reserved":
+        invalidate_event(event_id)
+        invalidate_user(payload.user_id)
+        outbox_worker.wake()
+        return {"message": "Registered Successfully", "status": "reserved", "quantity_left": outcome["quantity_left"]}
+
+    return {"message": "Added to waitlist", "status": "waitlisted", "position": outcome["position"]}
+
+@app.get("/events/{event_id}/waitlist/{user_id}")
+@round_trip_budget(1)
+async def get_waitlist_position(event_id: str, user_id: str):
+    """
+    The user's place in the event's waitlist (1 = next to get a seat),
+    read by primary key in one round trip.
+    """
+    result = await execute(
+        supabase.table("waitlist")
+        .select("ticket, waitlist_queues(head_ticket)")
+        .eq("event_id", event_id)
+        .eq("user_id", user_id)
+    )
+    if not result.data:
+        raise HTTPException(status_code=404, detail="User is not on the waitlist")
+
+    entry = result.data[0]
+    return {"position": entry["ticket"] - entry["waitlist_queues"]["head_ticket"] + 1}
+
+@app.delete("/events/{event_id}/waitlist/{user_id}")
+@round_trip_budget(1)
+async def leave_waitlist(event_id: str, user_id: str):
+    """Removes the user from the event's waitlist; everyone behind moves up one place."""
+    result = await execute(supabase.rpc("leave_waitlist", {
+        "p_event_id": event_id,
+        "p_user_id": user_id,
+    }))
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to leave waitlist")
+
+    if result.data[0]["status"] == "not_waitlisted":
+        raise HTTPException(status_code=404, detail="User is not on the waitlist")
+
+    return {"message": "Removed from waitlist"}
 
 @app.delete("/events/{event_id}")
+@round_trip_budget(3)
 async def delete_event(event_id: str, user_id: str):
     """
     Delete an event.
@@ -629,7 +1259,7 @@ async def delete_event(event_id: str, user_id: str):
     """
     try:
         # 1. find the event
-        event_response = supabase.table("events").select("*").eq("id", event_id).execute()
+        event_response = await execute(supabase.table("events").select("*").eq("id", event_id))
         if not event_response.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -638,16 +1268,15 @@ async def delete_event(event_id: str, user_id: str):
 
         event = event_response.data[0]
 
-        # 2. find the user
-        user_response = supabase.table("users").select("id, role").eq("id", user_id).execute()
+        # 2. find the user; read the role fresh, since a cached row may predate a demotion
+        user_response = await execute(supabase.table("users").select("id, role").eq("id", user_id))
         if not user_response.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
-        user = user_response.data[0]
-        user_role = user.get("role")
+        user_role = user_response.data[0].get("role")
 
         # 3. permission check
         is_creator = (event.get("creator_id") == user_id)
@@ -660,7 +1289,12 @@ async def delete_event(event_id: str, user_id: str):
             )
 
         # 4. delete the event
-        supabase.table("events").delete().eq("id", event_id).execute()
+        await execute(supabase.table("events").delete().eq("id", event_id))
+        invalidate_event(event_id)
+        # Their registrations went with the event
+        invalidate_event_registrants(event_id)
+        reminder_scheduler.event_removed(event_id)
+        search_index.event_removed(event_id)
 
         return {"message": "Event deleted successfully"}
 
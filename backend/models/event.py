@@ -1,5 +1,9 @@
-from typing import Optional, List
-from pydantic import BaseModel
+from typing import Annotated, Any, Dict, Optional, List
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+
+# Columns the API has always sent as strings, whatever their database type
+# (missing ones come out as "None", like str(row.get(...)) did).
+WireStr = Annotated[str, BeforeValidator(str)]
 
 class FoodItem(BaseModel):
     name: str
@@ -37,3 +41,75 @@ class EventResponse(BaseModel):
     end_time: str
     capacity: int
     creator_name: str
+
+
+# Response models. Handlers return database rows as they are; these models
+# convert and encode each row in one pass when FastAPI writes the response.
+
+class FoodItemOut(BaseModel):
+    id: Any = None
+    name: Optional[str] = None
+    allergy_info: Optional[str] = None
+    is_kosher: Optional[bool] = None
+    is_halal: Optional[bool] = None
+    category: Optional[str] = None
+
+class EventRowOut(BaseModel):
+    # Columns not listed here (name, creator_id, ...) pass through unchanged
+    model_config = ConfigDict(extra="allow")
+
+    # Bookkeeping of the reminder scheduler, not part of the API
+    reminder_sent_at: Any = Field(None, exclude=True)
+
+class EventOut(EventRowOut):
+    # The database id as it is; only the catalog list sends it as a string (EventListItemOut)
+    id: Any = None
+    description: WireStr = Field(None, validate_default=True)
+    location_name: WireStr = Field(None, validate_default=True)
+    start_time: WireStr = Field(None, validate_default=True)
+    end_time: WireStr = Field(None, validate_default=True)
+    created_at: WireStr = Field(None, validate_default=True)
+    quantity_left: WireStr = Field(None, validate_default=True)
+
+class EventWithFoodOut(EventOut):
+    food_items: List[FoodItemOut] = []
+    # Only sent when the request named a user
+    is_registered: Optional[bool] = Field(None, exclude_if=lambda v: v is None)
+
+class EventListItemOut(EventWithFoodOut):
+    # GET /events and its export have always sent the id as a string
+    id: WireStr = Field(None, validate_default=True)
+
+class EventSearchHit(BaseModel):
+    # Seat counts are left out: the search index does not follow registrations
+    id: WireStr
+    name: Optional[str] = None
+    description: Optional[str] = None
+    location_name: Optional[str] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    food_items: List[FoodItemOut] = []
+    score: float
+
+class EventFacets(BaseModel):
+    total: int
+    # Events offering at least one kosher / halal item
+    dietary: Dict[str, int]
+    locations: Dict[str, int]
+    # Allergen token -> events with food mentioning it
+    allergens: Dict[str, int]
+    # now, next_hour, next_24_hours, next_7_days, upcoming, ended
+    time: Dict[str, int]
+
+class EventCreateResponse(BaseModel):
+    message: str
+    # The inserted row as the database returned it
+    event: EventRowOut
+
+class EventUpdateResponse(BaseModel):
+    message: str
+    event: EventOut
+
+class BulkImportResponse(BaseModel):
+    message: str
+    events: List[EventOut]
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
+
+from models.event import EventOut
 
 class User(BaseModel):
     name: str
@@ -7,9 +9,26 @@ class User(BaseModel):
     image: Optional[str] = None
     id: str
 
+class UserProfile(BaseModel):
+    """What the identity provider tells us about a user at sign-in."""
+    name: str
+    email: EmailStr
+    image: Optional[str] = None
+
 class UserResponse(BaseModel):
     email: str
     name: str
     role: str
     registered_events: list
-    created_events: int
\ No newline at end of file
+    created_events: int
+
+class DashboardStats(BaseModel):
+    created_events: int
+    registered_events: int
+    upcoming_registered_events: int
+
+class DashboardResponse(BaseModel):
+    user: UserResponse
+    stats: DashboardStats
+    created_events: List[EventOut]
+    registered_events: List[EventOut]
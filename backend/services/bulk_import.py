@@ -0,0 +1,56 @@
+"""Parsing of POST /events/bulk bodies.
+
+A body is either a JSON array of events shaped like ``EventCreate`` or CSV
+with one event per row and a header naming the same fields. CSV has no
+nesting, so its ``food_items`` column lists item names separated by ``;``.
+"""
+import csv
+import io
+import json
+
+# Most events one import may create; each import is a single insert statement
+MAX_BULK_EVENTS = 500
+
+CSV_FOOD_SEPARATOR = ";"
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def parse_csv_rows(text: str) -> list:
+    """Turn CSV text into EventCreate-shaped dicts; empty cells count as missing."""
+    rows = []
+    for record in csv.DictReader(io.StringIO(text)):
+        row = {
+            key.strip(): value.strip()
+            for key, value in record.items()
+            if key and isinstance(value, str) and value.strip()
+        }
+        food_names = row.pop("food_items", "")
+        row["food_items"] = [
+            {"name": name.strip()}
+            for name in food_names.split(CSV_FOOD_SEPARATOR)
+            if name.strip()
+        ]
+        rows.append(row)
+    return rows
+
+
+def parse_import(body: bytes, content_type: str) -> list:
+    """Return the raw event rows of an import body, JSON or CSV by content type."""
+    try:
+        text = body.decode("utf-8-sig")
+        if content_type.split(";")[0].strip().lower() == "text/csv":
+            rows = parse_csv_rows(text)
+        else:
+            rows = json.loads(text)
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        raise InvalidImport("Body must be a JSON array of events or CSV")
+    if not isinstance(rows, list):
+        raise InvalidImport("Body must be a JSON array of events or CSV")
+    if not rows:
+        raise InvalidImport("No events to import")
+    if len(rows) > MAX_BULK_EVENTS:
+        raise InvalidImport(f"At most {MAX_BULK_EVENTS} events can be imported at once")
+    return rows
@@ -0,0 +1,131 @@
+"""Server-side filtering for the events catalog.
+
+Filters on event columns (time window, location) are pushed down into the
+Supabase query so non-matching rows never leave the database. So are the
+dietary flags: each is an extra embed of the event's food items under its
+own alias, filtered on the flag, inner-joined to keep only events with such
+an item (``!inner``) or required to be empty to keep those without one.
+Allergen exclusion matches substrings of free text, which PostgREST cannot
+express over an embed, so it is answered from a ``FoodIndex`` built once per
+batch of fetched food rows, checking each event with set lookups instead of
+rescanning its food list.
+"""
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+TIME_WINDOWS = ("upcoming", "now", "active")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_LIKE_SPECIALS_RE = re.compile(r"[%_*,()\"\\]")
+
+# Food item flag -> alias of the embed that filters on it
+DIETARY_EMBEDS = {"is_kosher": "kosher_food", "is_halal": "halal_food"}
+
+
+def tokenize(text) -> list:
+    """Lower-case alphanumeric tokens of ``text`` (empty for None)."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+@dataclass(frozen=True)
+class EventFilters:
+    """
+    window: "upcoming" (not started yet), "now" (currently happening) or
+        "active" (not ended yet); None means no time restriction.
+    location: case-insensitive substring of location_name.
+    is_kosher / is_halal: whether the event offers at least one such item.
+    exclude_allergens: drop events with any food item mentioning one of these.
+    """
+    window: Optional[str] = None
+    location: Optional[str] = None
+    is_kosher: Optional[bool] = None
+    is_halal: Optional[bool] = None
+    exclude_allergens: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_params(cls, window=None, location=None, is_kosher=None, is_halal=None,
+                    exclude_allergens: Iterable[str] = ()):
+        if window is not None and window not in TIME_WINDOWS:
+            raise ValueError(f"window must be one of {', '.join(TIME_WINDOWS)}")
+        allergens = []
+        for value in exclude_allergens or ():
+            # Accept both ?exclude_allergens=a&exclude_allergens=b and a,b
+            allergens.extend(tokenize(value))
+        location = _LIKE_SPECIALS_RE.sub("", location).strip() if location else None
+        return cls(
+            window=window,
+            location=location or None,
+            is_kosher=is_kosher,
+            is_halal=is_halal,
+            exclude_allergens=tuple(sorted(set(allergens))),
+        )
+
+    def columns(self, columns: str) -> str:
+        """``columns`` plus the food embeds the dietary filters need (see ``push_down``)."""
+        for flag, alias in DIETARY_EMBEDS.items():
+            wanted = getattr(self, flag)
+            if wanted is not None:
+                columns += f", {alias}:food_items{'!inner' if wanted else ''}(id)"
+        return columns
+
+    def strip(self, rows: list) -> list:
+        """Drop the embeds added by ``columns`` from fetched rows."""
+        aliases = [alias for flag, alias in DIETARY_EMBEDS.items() if getattr(self, flag) is not None]
+        if aliases:
+            for row in rows:
+                for alias in aliases:
+                    row.pop(alias, None)
+        return rows
+
+    def push_down(self, query, now: datetime):
+        """Apply the event-column and dietary filters to a Supabase select query.
+
+        The query must select ``columns(...)``.
+        """
+        now_iso = now.isoformat()
+        if self.window == "upcoming":
+            query = query.gt("start_time", now_iso)
+        elif self.window == "now":
+            query = query.lte("start_time", now_iso).gt("end_time", now_iso)
+        elif self.window == "active":
+            query = query.gt("end_time", now_iso)
+        if self.location:
+            query = query.ilike("location_name", f"%{self.location}%")
+        for flag, alias in DIETARY_EMBEDS.items():
+            wanted = getattr(self, flag)
+            if wanted is not None:
+                query = query.eq(f"{alias}.{flag}", True)
+                if not wanted:
+                    # Anti-join: no item has the flag
+                    query = query.is_(alias, "null")
+        return query
+
+
+class FoodIndex:
+    """Allergen lookups for the events in one batch of food rows."""
+
+    def __init__(self, food_rows):
+        # allergen token -> ids of events with an item mentioning it
+        self.allergens = defaultdict(set)
+        for item in food_rows:
+            event_id = str(item.get("event_id"))
+            for token in tokenize(item.get("allergy_info")):
+                self.allergens[token].add(event_id)
+
+    def excluded_by_allergens(self, allergens) -> set:
+        """Ids of events whose food mentions any of ``allergens``.
+
+        Matches by substring of each recorded token ("nut" also excludes
+        "peanuts"), erring on the side of hiding an event.
+        """
+        excluded = set()
+        for allergen in allergens:
+            for token, event_ids in self.allergens.items():
+                if allergen in token:
+                    excluded |= event_ids
+        return excluded
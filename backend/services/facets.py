@@ -0,0 +1,107 @@
+"""Facet counts over the event catalog, kept up to date as events change.
+
+``FacetCounts`` holds, for the events it has been given, how many offer a
+kosher or halal item, how many are at each location, how many have food
+mentioning each allergen token, and their start and end times in sorted
+lists. Adding or removing an event adjusts the counters, so reading them
+never rescans the catalog or its food items. Time buckets ("starting in the
+next hour", "happening now") depend on the clock, so they are counted at
+read time by bisecting the sorted times: O(log n) per bucket.
+
+The search index (services/search.py) owns the instance and feeds it every
+event it indexes, which keeps the counts current with the same loads and
+write hooks.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import datetime, timedelta
+
+from services.event_filters import tokenize
+from services.reminders import parse_start_time
+
+# Buckets of events starting within a time span from now; they nest
+TIME_BUCKETS = (
+    ("next_hour", timedelta(hours=1)),
+    ("next_24_hours", timedelta(hours=24)),
+    ("next_7_days", timedelta(days=7)),
+)
+
+
+def _decrement(counter: Counter, key):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+def _ranked(counter: Counter) -> dict:
+    """Most common first, ties by name."""
+    return dict(sorted(counter.items(), key=lambda item: (-item[1], item[0])))
+
+
+def facet_values(doc: dict):
+    """(dietary flags, location, allergen tokens, start, end) of one event document."""
+    food_items = doc.get("food_items") or []
+    dietary = set()
+    if any(item.get("is_kosher") is True for item in food_items):
+        dietary.add("kosher")
+    if any(item.get("is_halal") is True for item in food_items):
+        dietary.add("halal")
+    location = (doc.get("location_name") or "").strip() or None
+    allergens = {token for item in food_items for token in tokenize(item.get("allergy_info"))}
+    return dietary, location, allergens, parse_start_time(doc.get("start_time")), parse_start_time(doc.get("end_time"))
+
+
+class FacetCounts:
+    def __init__(self):
+        self.total = 0
+        self.dietary = Counter()
+        self.locations = Counter()
+        self.allergens = Counter()
+        self._starts = []  # sorted start times
+        self._ends = []    # sorted end times
+
+    def add(self, doc: dict):
+        dietary, location, allergens, start, end = facet_values(doc)
+        self.total += 1
+        self.dietary.update(dietary)
+        self.allergens.update(allergens)
+        if location:
+            self.locations[location] += 1
+        if start is not None and end is not None:
+            insort(self._starts, start)
+            insort(self._ends, end)
+
+    def remove(self, doc: dict):
+        """Undo ``add(doc)``; ``doc`` must be the document that was added."""
+        dietary, location, allergens, start, end = facet_values(doc)
+        self.total -= 1
+        for flag in dietary:
+            _decrement(self.dietary, flag)
+        for allergen in allergens:
+            _decrement(self.allergens, allergen)
+        if location:
+            _decrement(self.locations, location)
+        if start is not None and end is not None:
+            # Equal times are interchangeable, so any matching entry will do
+            del self._starts[bisect_left(self._starts, start)]
+            del self._ends[bisect_left(self._ends, end)]
+
+    def time_counts(self, now: datetime) -> dict:
+        """Events happening at ``now``, starting within each TIME_BUCKETS span, upcoming and ended."""
+        started = bisect_right(self._starts, now)
+        ended = bisect_right(self._ends, now)
+        counts = {"now": started - ended}
+        for name, span in TIME_BUCKETS:
+            counts[name] = bisect_right(self._starts, now + span) - started
+        counts["upcoming"] = len(self._starts) - started
+        counts["ended"] = ended
+        return counts
+
+    def counts(self, now: datetime) -> dict:
+        return {
+            "total": self.total,
+            "dietary": {flag: self.dietary[flag] for flag in ("kosher", "halal")},
+            "locations": _ranked(self.locations),
+            "allergens": _ranked(self.allergens),
+            "time": self.time_counts(now),
+        }
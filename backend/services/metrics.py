@@ -0,0 +1,241 @@
+"""Request and Supabase metrics in Prometheus text format.
+
+``MetricsMiddleware`` records, per route template (``/events/{event_id}``,
+not the raw path), a latency histogram and a request counter by status
+code, plus the number of requests in flight. ``db.asyncdb.execute`` times
+every Supabase round trip by table and operation through
+``observe_query``. ``GET /metrics`` serves all of it via ``render()``.
+
+Recording is a dict lookup and a bisect per sample, a few microseconds per
+request; ``benchmarks/bench_metrics.py`` measures it.
+"""
+import time
+from bisect import bisect_left
+from urllib.parse import urlsplit
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds; the Prometheus client defaults, plus finer steps
+# below 5 ms where cached reads land
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1,
+                   0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Route label of requests that matched no route, so stray paths cannot
+# grow the label set
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra="") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def clear(self):
+        self._values.clear()
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def clear(self):
+        self._series.clear()
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket", _labels(self.labelnames, labels, le), cumulative
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests_total = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests handled, by route and status code.",
+    ("method", "route", "status"),
+))
+http_request_duration_seconds = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route"),
+))
+http_requests_in_flight = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.",
+    ("method",),
+))
+supabase_query_duration_seconds = REGISTRY.register(Histogram(
+    "supabase_query_duration_seconds", "Supabase round trip time, including the wait for a free connection.",
+    ("table", "operation"),
+))
+supabase_query_errors_total = REGISTRY.register(Counter(
+    "supabase_query_errors_total", "Supabase round trips that raised.",
+    ("table", "operation"),
+))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ===== Supabase queries =====
+
+_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+# (path, method, prefer) -> (table, operation); there are only a few dozen
+_query_labels = {}
+
+
+def query_labels(query):
+    """``(table, operation)`` of a postgrest query builder, e.g. ``("events", "select")``.
+
+    RPCs are reported as ``("rpc/<function>", "rpc")``; anything that is not
+    a postgrest builder as ``("unknown", "unknown")``.
+    """
+    request = getattr(query, "request", None)
+    method = getattr(request, "http_method", None)
+    if not isinstance(method, str):
+        return "unknown", "unknown"
+    # Only an upsert's Prefer header tells it apart from an insert
+    prefer = (request.headers.get("prefer") or "") if method == "POST" else ""
+    key = (str(request.path), method, prefer)
+    labels = _query_labels.get(key)
+    if labels is None:
+        path, method, prefer = key
+        resource = urlsplit(path).path.rsplit("/rest/v1/", 1)[-1].strip("/") or "unknown"
+        if resource.startswith("rpc/"):
+            operation = "rpc"
+        elif method == "POST" and "resolution=" in prefer:
+            operation = "upsert"
+        else:
+            operation = _OPERATIONS.get(method, str(method).lower())
+        labels = _query_labels[key] = (resource, operation)
+    return labels
+
+
+def observe_query(query, seconds: float, failed: bool = False):
+    labels = query_labels(query)
+    supabase_query_duration_seconds.observe(seconds, *labels)
+    if failed:
+        supabase_query_errors_total.inc(*labels)
+
+
+# ===== HTTP requests =====
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request until its response is fully sent.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, which would add a task and
+    a memory stream per request and buffer streamed responses.
+    """
+
+    def __init__(self, app, clock=time.perf_counter):
+        self.app = app
+        self.clock = clock
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        start = self.clock()
+        http_requests_in_flight.inc(method)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = self.clock() - start
+            http_requests_in_flight.dec(method)
+            # Set by the router once it matched, so labels stay templated
+            route = scope.get("route")
+            route = getattr(route, "path", None) or UNMATCHED_ROUTE
+            http_request_duration_seconds.observe(elapsed, method, route)
+            http_requests_total.inc(method, route, str(status))
@@ -0,0 +1,205 @@
+"""Notification emails sent from the outbox.
+
+Database triggers (db/migrations/005_notification_outbox.sql) queue one
+``notification_outbox`` row per recipient in the same transaction as the
+registration or event write that caused it. ``OutboxWorker`` runs inside
+the API process: it claims due rows in batches, looks up their users and
+events with one query each, sends the batch, then marks it sent or
+reschedules failures with exponential backoff in one call each.
+"""
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+from db.asyncdb import execute
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_TABLE = "notification_outbox"
+
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF_SECONDS = int(os.environ.get("OUTBOX_BACKOFF_SECONDS", "30"))
+# A claimed batch is not handed to another worker for this long
+OUTBOX_LEASE_SECONDS = 60
+
+FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:3000")
+
+# kind -> (subject, intro); both are formatted with the event's name
+TEMPLATES = {
+    "registered": ("Registered: {name}", 'You have successfully registered for the event "{name}".'),
+    "waitlist_promoted": ("You're in: {name}", 'A spot opened up and you have been moved off the waitlist for "{name}".'),
+    "unregistered": ("Unregistered: {name}", 'You are no longer registered for the event "{name}".'),
+    "event_created": ("Event created: {name}", 'Your event "{name}" is now live on Spark! Bytes.'),
+    "event_updated": ("Event updated: {name}", 'The details of "{name}", which you registered for, have changed.'),
+    "reminder": ("Starting soon: {name}", 'The event "{name}" you registered for starts soon.'),
+}
+
+
+@dataclass(frozen=True)
+class EmailMessage:
+    to: str
+    name: str
+    subject: str
+    intro: str
+    content: str
+    link: str
+
+
+def render(kind: str, user: dict, event: dict) -> EmailMessage:
+    """The email for one outbox row, with the event as it is now."""
+    subject, intro = TEMPLATES[kind]
+    return EmailMessage(
+        to=user["email"],
+        name=user.get("full_name") or user["email"],
+        subject=subject.format(name=event.get("name")),
+        intro=intro.format(name=event.get("name")),
+        content=f"Event details:\nDate: {event.get('start_time') or 'TBD'}\nLocation: {event.get('location_name')}",
+        link=f"{FRONTEND_URL}/events/{event['id']}",
+    )
+
+
+class MailgunSender:
+    """Sends messages through the Mailgun HTTP API with the "spark-bytes notification" template."""
+
+    def __init__(self, api_key: str, domain: str, api_base: str = "https://api.mailgun.net/v3",
+                 concurrency: int = 8, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = f"{api_base.rstrip('/')}/{domain}/messages"
+        self._auth = ("api", api_key)
+        self._concurrency = concurrency
+        self._transport = transport
+
+    @classmethod
+    def from_env(cls) -> Optional["MailgunSender"]:
+        """A sender configured from API_KEY_MAILGUN and SANDBOX_DOMAIN, or None if they are unset."""
+        api_key = os.environ.get("API_KEY_MAILGUN")
+        domain = os.environ.get("SANDBOX_DOMAIN")
+        if not (api_key and domain):
+            return None
+        return cls(api_key, domain, os.environ.get("MAILGUN_API_BASE", "https://api.mailgun.net/v3"))
+
+    async def send_batch(self, messages: list) -> list:
+        """Send every message over one connection pool; returns an error string or None per message."""
+        semaphore = asyncio.Semaphore(self._concurrency)
+        async with httpx.AsyncClient(auth=self._auth, transport=self._transport, timeout=10) as client:
+            async def send(message: EmailMessage) -> Optional[str]:
+                async with semaphore:
+                    try:
+                        resp = await client.post(self.url, data=self._form(message))
+                    except httpx.HTTPError as e:
+                        return f"{type(e).__name__}: {e}"
+                if resp.status_code >= 400:
+                    return f"Mailgun {resp.status_code}: {resp.text[:200]}"
+                return None
+
+            return await asyncio.gather(*(send(m) for m in messages))
+
+    @staticmethod
+    def _form(message: EmailMessage) -> dict:
+        return {
+            "from": "Spark! Bytes <no-reply@bu.edu>",
+            "to": message.to,
+            "subject": message.subject,
+            "template": "spark-bytes notification",
+            "h:X-Mailgun-Variables": json.dumps({
+                "intro": message.intro,
+                "recipient_name": message.name,
+                "main_message": message.content,
+                "action_url": message.link,
+                "action_label": "View Details",
+                "outro": "Thank you for using Spark! Bytes!",
+            }),
+        }
+
+
+class OutboxWorker:
+    def __init__(self, client, sender, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 backoff_seconds: int = OUTBOX_BACKOFF_SECONDS):
+        self.client = client
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Check the outbox now instead of at the next poll, e.g. right after a write queued mail."""
+        self._wake.set()
+
+    async def run_once(self) -> int:
+        """Claim, send and settle one batch; returns how many rows were claimed."""
+        claimed = (await execute(self.client.rpc("claim_outbox", {
+            "p_limit": self.batch_size,
+            "p_lease_seconds": OUTBOX_LEASE_SECONDS,
+        }))).data or []
+        if not claimed:
+            return 0
+
+        user_ids = sorted({str(row["user_id"]) for row in claimed})
+        event_ids = sorted({str(row["event_id"]) for row in claimed})
+        users_resp, events_resp = await asyncio.gather(
+            execute(self.client.table("users").select("id, email, full_name").in_("id", user_ids)),
+            execute(self.client.table("events").select("id, name, start_time, location_name").in_("id", event_ids)),
+        )
+        users = {str(u["id"]): u for u in (users_resp.data or [])}
+        events = {str(e["id"]): e for e in (events_resp.data or [])}
+
+        outgoing = []
+        skipped = []
+        for row in claimed:
+            user = users.get(str(row["user_id"]))
+            event = events.get(str(row["event_id"]))
+            if not user or not user.get("email") or not event or row["kind"] not in TEMPLATES:
+                skipped.append(row["id"])
+                continue
+            outgoing.append((row["id"], render(row["kind"], user, event)))
+
+        errors = await self.sender.send_batch([message for _, message in outgoing]) if outgoing else []
+        sent = [row_id for (row_id, _), error in zip(outgoing, errors) if error is None]
+        failed = [(row_id, error) for (row_id, _), error in zip(outgoing, errors) if error is not None]
+
+        now = datetime.now(timezone.utc).isoformat()
+        writes = []
+        if sent:
+            writes.append(execute(self.client.table(OUTBOX_TABLE).update({
+                "status": "sent", "sent_at": now, "last_error": None,
+            }).in_("id", sent)))
+        if skipped:
+            writes.append(execute(self.client.table(OUTBOX_TABLE).update({
+                "status": "skipped", "last_error": "Recipient or event no longer exists",
+            }).in_("id", skipped)))
+        if failed:
+            logger.warning("%d of %d notifications failed; retrying later", len(failed), len(outgoing))
+            writes.append(execute(self.client.rpc("retry_outbox", {
+                "p_ids": [row_id for row_id, _ in failed],
+                "p_errors": [error for _, error in failed],
+                "p_max_attempts": self.max_attempts,
+                "p_backoff_seconds": self.backoff_seconds,
+            })))
+        await asyncio.gather(*writes)
+        return len(claimed)
+
+    async def run_forever(self):
+        """Drain the outbox, then sleep until woken or until the next poll."""
+        while True:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,224 @@
+"""Pre-event reminders, scheduled in memory on a min-heap.
+
+Every upcoming event gets one reminder, due ``REMINDER_LEAD_MINUTES`` before
+its start_time. Instead of scanning the events table on every tick, the
+scheduler holds only reminders due within the next ``REMINDER_HORIZON_HOURS``
+in a heap ordered by due time. It loads the next slice of events (keyset-paged
+by start_time) as the horizon advances, and write handlers keep it current
+through ``event_changed`` and ``event_removed``. Waking up costs a peek at the
+heap's head, not a scan.
+
+Due reminders are handed to the database in one ``enqueue_event_reminders``
+call per batch (db/migrations/006_event_reminders.sql). That call queues an
+outbox email per registrant, which the outbox worker sends, and stamps
+``reminder_sent_at`` so that no event is reminded twice. After a restart the
+first load picks up reminders that fell due while the process was down, as
+long as their events have not started.
+"""
+import asyncio
+import heapq
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from db.asyncdb import execute
+from db.pagination import keyset_page, split_page
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LEAD = timedelta(minutes=float(os.environ.get("REMINDER_LEAD_MINUTES", "60")))
+REMINDER_HORIZON = timedelta(hours=float(os.environ.get("REMINDER_HORIZON_HOURS", "24")))
+# Events read per round trip while loading the horizon
+REMINDER_LOAD_PAGE_SIZE = 1000
+# Events reminded per enqueue_event_reminders call
+REMINDER_BATCH_SIZE = 500
+# Longest the scheduler sleeps without checking the clock
+MAX_SLEEP_SECONDS = 300
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def parse_start_time(value) -> Optional[datetime]:
+    """Aware start time of an event row; naive times are taken as UTC."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class ReminderHeap:
+    """Min-heap of (due_at, event_id) with lazy removal.
+
+    Rescheduling pushes a new entry and cancelling forgets the live one;
+    outdated entries are dropped when they reach the top, and the heap is
+    rebuilt once they outnumber the live ones.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}  # event_id -> due_at of its live entry
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, event_id):
+        return event_id in self._due
+
+    def schedule(self, event_id: str, due_at: datetime):
+        if self._due.get(event_id) == due_at:
+            return
+        self._due[event_id] = due_at
+        heapq.heappush(self._heap, (due_at, event_id))
+        self._compact()
+
+    def cancel(self, event_id: str):
+        if self._due.pop(event_id, None) is not None:
+            self._compact()
+
+    def next_due(self) -> Optional[datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime, limit: Optional[int] = None) -> list:
+        """Remove and return the ids of reminders due at ``now``, earliest first."""
+        due = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            due_at, event_id = heapq.heappop(self._heap)
+            if self._due.get(event_id) == due_at:
+                del self._due[event_id]
+                due.append(event_id)
+        return due
+
+    def _drop_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due_at, event_id) for event_id, due_at in self._due.items()]
+            heapq.heapify(self._heap)
+
+
+class ReminderScheduler:
+    def __init__(self, client, lead: timedelta = REMINDER_LEAD, horizon: timedelta = REMINDER_HORIZON,
+                 batch_size: int = REMINDER_BATCH_SIZE, on_enqueued: Optional[Callable[[], None]] = None,
+                 clock: Callable[[], datetime] = utcnow):
+        self.client = client
+        self.lead = lead
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.on_enqueued = on_enqueued
+        self.clock = clock
+        self.heap = ReminderHeap()
+        # Every reminder due up to this time is in the heap (None before the first load)
+        self.loaded_until: Optional[datetime] = None
+        self._wake = asyncio.Event()
+
+    def event_changed(self, event: dict):
+        """(Re)schedule an event's reminder after it was created or edited."""
+        event_id = str(event["id"])
+        start = parse_start_time(event.get("start_time"))
+        if start is None or start <= self.clock():
+            self.heap.cancel(event_id)
+            return
+        due_at = start - self.lead
+        if self.loaded_until is None or due_at > self.loaded_until:
+            # Beyond the horizon: a later load picks it up
+            self.heap.cancel(event_id)
+            return
+        self.heap.schedule(event_id, due_at)
+        self._wake.set()
+
+    def event_removed(self, event_id):
+        self.heap.cancel(str(event_id))
+
+    async def load(self, now: datetime) -> int:
+        """Extend the horizon to ``now + horizon``; returns how many reminders were added."""
+        until = now + self.horizon
+        # Events starting after ``lower`` have reminders not loaded yet
+        lower = now if self.loaded_until is None else max(now, self.loaded_until + self.lead)
+        upper = until + self.lead
+        added = 0
+        cursor = None
+        while True:
+            query = (
+                self.client.table("events")
+                .select("id, start_time")
+                .gt("start_time", lower.isoformat())
+                .lte("start_time", upper.isoformat())
+                .is_("reminder_sent_at", "null")
+            )
+            resp = await execute(keyset_page(query, cursor, REMINDER_LOAD_PAGE_SIZE))
+            rows, cursor = split_page(resp.data or [], REMINDER_LOAD_PAGE_SIZE)
+            for row in rows:
+                start = parse_start_time(row.get("start_time"))
+                if start is not None:
+                    self.heap.schedule(str(row["id"]), start - self.lead)
+                    added += 1
+            if cursor is None:
+                break
+        self.loaded_until = until
+        return added
+
+    async def fire_due(self, now: datetime) -> int:
+        """Enqueue one batch of due reminders; returns how many events were in it."""
+        due_ids = self.heap.pop_due(now, self.batch_size)
+        if not due_ids:
+            return 0
+        try:
+            await execute(self.client.rpc("enqueue_event_reminders", {
+                "p_event_ids": due_ids,
+                "p_lead_seconds": int(self.lead.total_seconds()),
+            }))
+        except Exception:
+            # Keep them for the next attempt
+            for event_id in due_ids:
+                self.heap.schedule(event_id, now)
+            raise
+        if self.on_enqueued:
+            self.on_enqueued()
+        return len(due_ids)
+
+    async def run_once(self) -> int:
+        now = self.clock()
+        if self.loaded_until is None or self.loaded_until - now < self.horizon / 2:
+            await self.load(now)
+        fired = 0
+        while True:
+            batch = await self.fire_due(now)
+            fired += batch
+            if batch < self.batch_size:
+                return fired
+
+    def seconds_until_next(self) -> float:
+        now = self.clock()
+        wake_at = [now + timedelta(seconds=MAX_SLEEP_SECONDS)]
+        next_due = self.heap.next_due()
+        if next_due is not None:
+            wake_at.append(next_due)
+        if self.loaded_until is not None:
+            wake_at.append(self.loaded_until - self.horizon / 2)
+        return max((min(wake_at) - now).total_seconds(), 0)
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+                timeout = self.seconds_until_next()
+            except Exception:
+                logger.exception("Reminder scheduling failed")
+                timeout = MAX_SLEEP_SECONDS / 10
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,281 @@
+"""Full-text event search from an in-memory inverted index.
+
+Each event's name, description and location_name, and the name and category
+of its food items, are tokenized (``event_filters.tokenize``) into postings
+``token -> {event_id: weight}``. A token's weight sums the weights of the
+fields it appears in, so "pizza" in an event's name outranks "pizza" in its
+description. A query matches the events containing every one of its terms;
+terms of ``MIN_PREFIX_LENGTH`` or more characters also match as prefixes
+("veg" finds "vegan" and "vegetarian", at ``PREFIX_WEIGHT`` of an exact hit),
+looked up by bisecting a sorted vocabulary. Terms are scored by weight times
+inverse document frequency, so rare words count more than common ones.
+
+The index holds only the searched columns and the event's times, not seat
+counts, which change with every registration; clients fetch those from
+``GET /events/{event_id}``. It is loaded from Supabase once per process
+(a keyset-paged scan) and then kept current by the event write handlers
+through ``event_changed`` and ``event_removed``. ``run_forever`` reloads it
+every ``SEARCH_INDEX_REFRESH_SECONDS`` so changes made by other workers show
+up; searches keep using the old postings until the new ones are swapped in.
+
+It also keeps the catalog's facet counts (services/facets.py) for
+``GET /events/facets``, fed by the same loads and writes.
+
+Loads are serialized, so a refresh never overlaps the first load; writes
+reported while a load awaits its pages win over the rows it read.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import os
+import time
+from bisect import bisect_left, insort
+from typing import Optional
+
+from db.asyncdb import execute
+from db.pagination import keyset_page, split_page
+from services.event_filters import tokenize
+from services.facets import FacetCounts
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_REFRESH_SECONDS = float(os.environ.get("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+# Events read per round trip while loading the index
+SEARCH_LOAD_PAGE_SIZE = 1000
+# Shorter terms only match whole tokens; "p" would expand to most of the vocabulary
+MIN_PREFIX_LENGTH = 2
+# Score of a prefix hit relative to an exact one
+PREFIX_WEIGHT = 0.5
+
+FIELD_WEIGHTS = {
+    "name": 4.0,
+    "food_name": 3.0,
+    "location_name": 2.0,
+    "food_category": 2.0,
+    "description": 1.0,
+}
+
+FOOD_COLUMNS = ("id", "name", "category", "allergy_info", "is_kosher", "is_halal")
+EVENT_COLUMNS = ("id", "name", "description", "location_name", "start_time", "end_time")
+# What a load selects: the searched fields plus what a result shows
+SEARCH_COLUMNS = f"{', '.join(EVENT_COLUMNS)}, food_items({', '.join(FOOD_COLUMNS)})"
+
+
+def document(event: dict, food_items) -> dict:
+    """The part of an event row (and its food rows) the index keeps."""
+    doc = {column: event.get(column) for column in EVENT_COLUMNS}
+    doc["food_items"] = [{column: item.get(column) for column in FOOD_COLUMNS} for item in food_items or []]
+    return doc
+
+
+def weighted_tokens(doc: dict) -> dict:
+    """token -> summed weight of the fields of ``doc`` containing it."""
+    fields = [
+        ("name", doc.get("name")),
+        ("description", doc.get("description")),
+        ("location_name", doc.get("location_name")),
+    ]
+    for item in doc["food_items"]:
+        fields.append(("food_name", item.get("name")))
+        fields.append(("food_category", item.get("category")))
+    weights = {}
+    seen = set()
+    for field, text in fields:
+        for token in tokenize(text):
+            if (field, token) not in seen:
+                seen.add((field, token))
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+    return weights
+
+
+class SearchIndex:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._postings = {}     # token -> {event_id: weight}
+        self._vocabulary = []   # every token in _postings, sorted
+        self._documents = {}    # event_id -> document()
+        self._tokens = {}       # event_id -> weighted_tokens() of its document
+        self.facets = FacetCounts()
+        self.loaded_at: Optional[float] = None
+        # Ids written while a load is running -> whether their food rows were
+        # given (None when no load is running)
+        self._touched: Optional[dict] = None
+        # Created per event loop: the process-wide index outlives loops in tests and benchmarks
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._load_lock_loop = None
+
+    def __len__(self):
+        return len(self._documents)
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def event_changed(self, event: dict, food_items=None):
+        """(Re)index an event after it was created or edited.
+
+        ``food_items`` are its food rows; None keeps the ones already indexed.
+        Before the first load starts this is a no-op, since the load reads
+        every event anyway.
+        """
+        if not self.loaded and self._touched is None:
+            return
+        event_id = str(event["id"])
+        food_known = food_items is not None or event_id in self._documents
+        if food_items is None:
+            food_items = self._documents.get(event_id, {}).get("food_items", [])
+        self._put(event_id, document(event, food_items))
+        if self._touched is not None:
+            self._touched[event_id] = self._touched.get(event_id, False) or food_known
+
+    def event_removed(self, event_id):
+        if not self.loaded and self._touched is None:
+            return
+        self._drop(str(event_id))
+        if self._touched is not None:
+            self._touched[str(event_id)] = True
+
+    def search(self, query: str, limit: int) -> list:
+        """The ``limit`` best matches for ``query``, each a document with its ``score``."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        scores = None
+        for term in terms:
+            term_scores = self._term_scores(term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {event_id: score + term_scores[event_id]
+                          for event_id, score in scores.items() if event_id in term_scores}
+            if not scores:
+                return []
+        documents = self._documents
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (
+            -item[1], str(documents[item[0]]["start_time"]), item[0],
+        ))
+        return [dict(documents[event_id], score=round(score, 4)) for event_id, score in best]
+
+    def clear(self):
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._documents.clear()
+        self._tokens.clear()
+        self.facets = FacetCounts()
+        self.loaded_at = None
+        self._touched = None
+
+    def stats(self):
+        return {
+            "events": len(self._documents),
+            "tokens": len(self._vocabulary),
+            "age_seconds": round(self._clock() - self.loaded_at, 1) if self.loaded else None,
+        }
+
+    async def ensure_loaded(self, client):
+        if not self.loaded:
+            async with self._lock():
+                if not self.loaded:
+                    await self._load(client)
+
+    async def reload(self, client) -> int:
+        """Rebuild the index from the events table; returns how many events it holds."""
+        async with self._lock():
+            await self._load(client)
+        return len(self)
+
+    async def run_forever(self, client, interval: float = SEARCH_INDEX_REFRESH_SECONDS):
+        while True:
+            try:
+                await self.reload(client)
+            except Exception:
+                logger.exception("Search index reload failed")
+            await asyncio.sleep(interval)
+
+    def _lock(self) -> asyncio.Lock:
+        """The lock serializing loads on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._load_lock_loop is not loop:
+            self._load_lock = asyncio.Lock()
+            self._load_lock_loop = loop
+        return self._load_lock
+
+    async def _load(self, client):
+        self._touched = {}
+        try:
+            rows = []
+            cursor = None
+            while True:
+                query = keyset_page(client.table("events").select(SEARCH_COLUMNS), cursor, SEARCH_LOAD_PAGE_SIZE)
+                resp = await execute(query)
+                batch, cursor = split_page(resp.data or [], SEARCH_LOAD_PAGE_SIZE)
+                rows.extend(batch)
+                if cursor is None:
+                    break
+        except BaseException:
+            self._touched = None
+            raise
+
+        # Writes made while the pages were in flight are newer than the pages
+        touched, self._touched = self._touched, None
+        fresh = SearchIndex(self._clock)
+        for row in rows:
+            event_id = str(row["id"])
+            if event_id not in touched:
+                fresh._put(event_id, document(row, row.get("food_items")))
+            elif event_id in self._documents and not touched[event_id]:
+                # Edited without its food rows before they were indexed: take those from the load
+                fresh._put(event_id, document(self._documents[event_id], row.get("food_items")))
+        for event_id, food_known in touched.items():
+            if event_id in self._documents and (food_known or event_id not in fresh._documents):
+                fresh._put(event_id, self._documents[event_id])
+        self._postings, self._vocabulary = fresh._postings, fresh._vocabulary
+        self._documents, self._tokens = fresh._documents, fresh._tokens
+        self.facets = fresh.facets
+        self.loaded_at = self._clock()
+
+    def _term_scores(self, term: str) -> dict:
+        """event_id -> score of ``term`` in that event (its best exact or prefix hit)."""
+        hits = {}
+        postings = self._postings.get(term)
+        if postings:
+            hits.update(postings)
+        if len(term) >= MIN_PREFIX_LENGTH:
+            vocabulary = self._vocabulary
+            i = bisect_left(vocabulary, term)
+            while i < len(vocabulary) and vocabulary[i].startswith(term):
+                if vocabulary[i] != term:
+                    for event_id, weight in self._postings[vocabulary[i]].items():
+                        weight *= PREFIX_WEIGHT
+                        if weight > hits.get(event_id, 0.0):
+                            hits[event_id] = weight
+                i += 1
+        if not hits:
+            return hits
+        idf = math.log(1 + len(self._documents) / len(hits))
+        return {event_id: weight * idf for event_id, weight in hits.items()}
+
+    def _put(self, event_id: str, doc: dict):
+        self._drop(event_id)
+        tokens = weighted_tokens(doc)
+        self._documents[event_id] = doc
+        self._tokens[event_id] = tokens
+        self.facets.add(doc)
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocabulary, token)
+            postings[event_id] = weight
+
+    def _drop(self, event_id: str):
+        doc = self._documents.pop(event_id, None)
+        if doc is not None:
+            self.facets.remove(doc)
+        for token in self._tokens.pop(event_id, ()):
+            postings = self._postings[token]
+            del postings[event_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
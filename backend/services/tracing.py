@@ -0,0 +1,178 @@
+"""Per-request Supabase round-trip tracing and budgets.
+
+``TracingMiddleware`` gives every HTTP request a ``RoundTripTrace`` in a
+context variable; ``db.asyncdb.execute`` adds each round trip to it. A trip
+that starts while none of the request's other trips is in flight is
+*sequential*: it adds its full latency to the response time, whereas trips
+started together with ``asyncio.gather`` overlap and count once.
+
+Each response carries the totals in a ``Server-Timing`` header (shown in
+the browser's network panel), e.g.::
+
+    Server-Timing: supabase;dur=41.7;desc="4 round trips, 4 sequential"
+
+and one debug log line lists the trips. Handlers declare how many sequential
+trips they may make with ``@round_trip_budget(n)``; going over it, or
+issuing the same kind of query sequentially more than
+``N_PLUS_ONE_THRESHOLD`` times (an N+1 loop), logs a warning. The test
+suite turns budget overruns into failures (see conftest.py).
+"""
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from services.metrics import query_labels
+
+logger = logging.getLogger(__name__)
+
+# Same (table, operation) issued sequentially more often than this in one request is reported
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "5"))
+
+_current_trace: ContextVar[Optional["RoundTripTrace"]] = ContextVar("round_trip_trace", default=None)
+
+# Called with every finished trace; the test suite checks budgets through this
+_listeners = []
+
+
+class RoundTripBudgetExceeded(AssertionError):
+    pass
+
+
+def round_trip_budget(sequential: int):
+    """Declare the most sequential Supabase round trips a handler may make.
+
+    Goes below the route decorator::
+
+        @app.get("/users/{user_id}")
+        @round_trip_budget(1)
+        async def get_user(user_id: str): ...
+    """
+    def decorate(endpoint):
+        endpoint.round_trip_budget = sequential
+        return endpoint
+    return decorate
+
+
+class RoundTripTrace:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route = None
+        self.budget = None
+        # (table, operation, seconds, sequential) per finished round trip
+        self.trips = []
+        self.sequential = 0
+        self._in_flight = 0
+
+    @property
+    def total(self) -> int:
+        return len(self.trips)
+
+    @property
+    def seconds(self) -> float:
+        return sum(seconds for _, _, seconds, _ in self.trips)
+
+    def start(self) -> bool:
+        """Note a round trip starting; returns whether it is sequential."""
+        sequential = self._in_flight == 0
+        if sequential:
+            self.sequential += 1
+        self._in_flight += 1
+        return sequential
+
+    def finish(self, query, seconds: float, sequential: bool):
+        self._in_flight -= 1
+        table, operation = query_labels(query)
+        self.trips.append((table, operation, seconds, sequential))
+
+    def repeated(self) -> dict:
+        """Query kinds issued sequentially more than N_PLUS_ONE_THRESHOLD times."""
+        if self.sequential <= N_PLUS_ONE_THRESHOLD:
+            return {}
+        counts = Counter((table, op) for table, op, _, sequential in self.trips if sequential)
+        return {kind: n for kind, n in counts.items() if n > N_PLUS_ONE_THRESHOLD}
+
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.sequential > self.budget
+
+    def server_timing(self) -> str:
+        return (f'supabase;dur={self.seconds * 1000:.1f};'
+                f'desc="{self.total} round trips, {self.sequential} sequential"')
+
+    def describe(self) -> str:
+        trips = ", ".join(
+            f"{table} {op} {seconds * 1000:.1f}ms{'' if sequential else ' (concurrent)'}"
+            for table, op, seconds, sequential in self.trips
+        )
+        return (f"{self.method} {self.route or self.path}: {self.total} Supabase round trips, "
+                f"{self.sequential} sequential, {self.seconds * 1000:.1f} ms" + (f" [{trips}]" if trips else ""))
+
+    def check_budget(self):
+        if self.over_budget():
+            raise RoundTripBudgetExceeded(
+                f"{self.sequential} sequential round trips, budget is {self.budget}: {self.describe()}"
+            )
+
+
+def current_trace() -> Optional[RoundTripTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def listen(listener: Callable[[RoundTripTrace], None]):
+    """Call ``listener`` with the trace of every request finished inside the block."""
+    _listeners.append(listener)
+    try:
+        yield
+    finally:
+        _listeners.remove(listener)
+
+
+class TracingMiddleware:
+    """ASGI middleware tracing the Supabase round trips of each HTTP request.
+
+    Trips made after the response has started (streamed bodies) are logged
+    but miss the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RoundTripTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", trace.server_timing().encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            route = scope.get("route")
+            trace.route = getattr(route, "path", None)
+            trace.budget = getattr(getattr(route, "endpoint", None), "round_trip_budget", None)
+            self._report(trace)
+
+    @staticmethod
+    def _report(trace: RoundTripTrace):
+        if trace.over_budget():
+            logger.warning("Round-trip budget of %d exceeded: %s", trace.budget, trace.describe())
+        for (table, op), n in trace.repeated().items():
+            logger.warning("Possible N+1: %s %s issued %d times in a row by %s %s",
+                           table, op, n, trace.method, trace.route or trace.path)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(trace.describe())
+        for listener in list(_listeners):
+            listener(trace)
@@ -0,0 +1,83 @@
+from db.cache import CatalogVersion, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    def test_get_set_counts_hits_and_misses(self):
+        """Test that lookups are counted as hits or misses"""
+        cache = TTLCache(maxsize=4, ttl=10)
+        assert cache.get("a") is None
+        cache.set("a", [])
+        assert cache.get("a") == []
+        assert cache.get("a", "default") == []
+        assert (cache.hits, cache.misses) == (2, 1)
+        assert cache.stats()["hit_ratio"] == round(2 / 3, 4)
+
+    def test_entries_expire_after_ttl(self):
+        """Test that an entry is dropped once its TTL has passed"""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=4, ttl=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test LRU eviction once maxsize is exceeded"""
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_invalidate_tag_drops_only_tagged_entries(self):
+        """Test that invalidating a tag leaves unrelated entries cached"""
+        cache = TTLCache(maxsize=10, ttl=10)
+        cache.set("page1", [1, 2], tags=["list", "event:1", "event:2"])
+        cache.set("page2", [3], tags=["list", "event:3"])
+        cache.set("detail1", {"id": 1}, tags=["event:1"])
+        cache.invalidate_tag("event:1")
+        assert cache.get("page1") is None
+        assert cache.get("detail1") is None
+        assert cache.get("page2") == [3]
+        cache.invalidate_tag("list")
+        assert len(cache) == 0
+
+    def test_overwrite_replaces_tags(self):
+        """Test that re-setting a key forgets its old tags"""
+        cache = TTLCache(maxsize=10, ttl=10)
+        cache.set("k", 1, tags=["old"])
+        cache.set("k", 2, tags=["new"])
+        cache.invalidate_tag("old")
+        assert cache.get("k") == 2
+
+
+class TestCatalogVersion:
+    def test_tokens_expire_after_max_age_without_a_bump(self):
+        """Test that a token from before another worker's write stops matching within max_age"""
+        clock = FakeClock()
+        version = CatalogVersion(max_age=30, clock=clock)
+        token = version.etag()
+        clock.now = 29.9
+        assert version.etag() == token
+        clock.now = 30
+        assert version.etag() != token
+
+    def test_bump_changes_tokens(self):
+        version = CatalogVersion()
+        token = version.etag("x")
+        version.bump()
+        assert version.etag("x") != token
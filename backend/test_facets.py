@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+from services.facets import FacetCounts
+from services.search import SearchIndex, document
+
+T0 = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def doc(event_id, location="GSU", starts_in=timedelta(hours=2), hours=1, food=()):
+    start = T0 + starts_in
+    event = {
+        "id": event_id, "name": f"Event {event_id}", "location_name": location,
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=hours)).isoformat(),
+    }
+    food_items = [
+        {"name": "Item", "allergy_info": allergens, "is_kosher": kosher, "is_halal": halal}
+        for allergens, kosher, halal in food
+    ]
+    return document(event, food_items)
+
+
+class TestFacetCounts:
+    def test_counts_each_event_once_per_facet(self):
+        facets = FacetCounts()
+        facets.add(doc(1, food=[("gluten, dairy", True, None), ("gluten", True, True)]))
+        facets.add(doc(2, location="CAS", food=[("peanuts", False, False)]))
+        facets.add(doc(3, location=" GSU ", food=[]))
+
+        counts = facets.counts(T0)
+        assert counts["total"] == 3
+        assert counts["dietary"] == {"kosher": 1, "halal": 1}
+        assert counts["locations"] == {"GSU": 2, "CAS": 1}
+        assert counts["allergens"] == {"dairy": 1, "gluten": 1, "peanuts": 1}
+
+    def test_time_buckets_follow_the_clock(self):
+        facets = FacetCounts()
+        facets.add(doc(1, starts_in=-timedelta(minutes=30)))        # happening now
+        facets.add(doc(2, starts_in=timedelta(minutes=20)))
+        facets.add(doc(3, starts_in=timedelta(hours=5)))
+        facets.add(doc(4, starts_in=timedelta(days=3)))
+        facets.add(doc(5, starts_in=-timedelta(days=1)))             # ended
+
+        assert facets.time_counts(T0) == {
+            "now": 1, "next_hour": 1, "next_24_hours": 2, "next_7_days": 3, "upcoming": 3, "ended": 1,
+        }
+        assert facets.time_counts(T0 + timedelta(minutes=30)) == {
+            "now": 1, "next_hour": 0, "next_24_hours": 1, "next_7_days": 2, "upcoming": 2, "ended": 2,
+        }
+
+    def test_incremental_writes_match_a_recount(self):
+        index = SearchIndex()
+        index.loaded_at = 0.0
+        for i in range(20):
+            index._put(str(i), doc(i, location=("GSU", "CAS", "CDS")[i % 3], starts_in=timedelta(hours=i - 5),
+                                   food=[("gluten" if i % 2 else "soy", i % 4 == 0, i % 5 == 0)]))
+        for i in range(0, 20, 3):
+            index.event_removed(i)
+        for i in range(1, 20, 4):
+            # Moved, keeping its food
+            index.event_changed(doc(i, location="Questrom", starts_in=timedelta(days=2)))
+
+        recount = FacetCounts()
+        for remaining in index._documents.values():
+            recount.add(remaining)
+        assert index.facets.counts(T0) == recount.counts(T0)
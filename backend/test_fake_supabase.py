@@ -0,0 +1,153 @@
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_supabase import FakeSupabase
+from main import app
+
+client = TestClient(app)
+
+NOW = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def db():
+    fake = FakeSupabase()
+    fake.seed("users", [
+        {"id": f"u{i}", "email": f"u{i}@bu.edu", "full_name": f"User {i}", "role": "student", "created_events": 0}
+        for i in range(5)
+    ])
+    events = fake.seed("events", [
+        {"name": f"Event {n}", "description": "Snacks", "location_name": "GSU" if n % 2 else "CAS",
+         "start_time": (NOW + timedelta(hours=n)).isoformat(), "end_time": (NOW + timedelta(hours=n + 1)).isoformat(),
+         "quantity_left": 1, "creator_id": "u0", "creator_name": "User 0"}
+        for n in range(1, 8)
+    ])
+    fake.seed("food_items", [
+        {"event_id": e["id"], "name": "Falafel", "allergy_info": "sesame", "is_kosher": False, "is_halal": e["id"] % 3 == 0}
+        for e in events
+    ])
+    with patch("main.supabase", fake):
+        yield fake
+    fake.close()
+
+
+class TestFakeSupabaseThroughTheApi:
+    def test_keyset_pages_cover_the_filtered_catalog(self, db):
+        """Test that cursors, push-down filters and embedded food work together"""
+        seen = []
+        url = "/events?limit=2&location=gsu"
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            seen.extend(e["name"] for e in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/events?limit=2&location=gsu&cursor={cursor}" if cursor else None
+
+        assert seen == ["Event 1", "Event 3", "Event 5", "Event 7"]
+
+        halal = client.get("/events?is_halal=true").json()
+        assert [e["name"] for e in halal] == ["Event 3", "Event 6"]
+        assert halal[0]["food_items"][0]["name"] == "Falafel"
+
+    def test_sold_out_waitlist_and_promotion(self, db):
+        """Test that the reservation RPCs keep seats and the queue consistent"""
+        assert client.post("/events/1/register", json={"user_id": "u1"}).status_code == 200
+        assert client.post("/events/1/register", json={"user_id": "u2"}).json()["detail"] == "No spots left"
+
+        joined = client.post("/events/1/waitlist", json={"user_id": "u2"}).json()
+        assert (joined["status"], joined["position"]) == ("waitlisted", 1)
+
+        released = client.post("/events/1/unregister", json={"user_id": "u1"}).json()
+        assert released["promoted_user_ids"] == ["u2"]
+        assert db.lookup("events", 1)["quantity_left"] == 0
+        assert client.get("/events/1?user_id=u2").json()["is_registered"] is True
+
+    def test_registration_insert_casts_ids_and_enforces_keys(self, db):
+        """Test that path ids match integer event ids and key violations map to errors"""
+        assert client.post("/events/2/registrations/u1").status_code == 200
+        assert client.post("/events/2/registrations/u1").status_code == 400
+        assert client.post("/events/2/registrations/nobody").json()["detail"] == "User not found"
+        assert client.post("/events/999/registrations/u1").json()["detail"] == "Event not found"
+
+    def test_created_event_round_trip_and_cascading_delete(self, db):
+        start = NOW + timedelta(days=2)
+        created = client.post("/events", json={
+            "name": "Bagels", "description": "Morning", "location_name": "CDS",
+            "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+            "capacity": 10, "creator_id": "u3", "creator_name": "User 3",
+            "food_items": [{"name": "Bagel", "allergy_info": "gluten", "is_kosher": True}],
+        }).json()["event"]
+
+        event = client.get(f"/events/{created['id']}").json()
+        assert [f["name"] for f in event["food_items"]] == ["Bagel"]
+        assert db.lookup("users", "u3")["created_events"] == 1
+
+        assert client.delete(f"/events/{created['id']}?user_id=u3").status_code == 200
+        assert db.lookup_by("food_items", "event_id", created["id"]) == []
+
+    def test_repeated_sign_in_upserts_keep_role_and_counts(self, db):
+        db.table("users").update({"role": "admin", "created_events": 4}).eq("id", "u1").execute()
+        for name in ("Renamed", "Renamed"):
+            response = client.put("/users/u1", json={"name": name, "email": "u1@bu.edu"})
+            assert response.status_code == 200
+        assert response.json()["user"] == {
+            "id": "u1", "email": "u1@bu.edu", "full_name": "Renamed", "role": "admin", "created_events": 4,
+        }
+
+        assert client.put("/users/new", json={"name": "New", "email": "new@bu.edu"}).status_code == 200
+        assert client.get("/users/new").json()["name"] == "New"
+
+    def test_search_follows_event_writes_without_round_trips(self, db, round_trips):
+        assert [e["name"] for e in client.get("/events/search?q=falaf").json()][:2] == ["Event 1", "Event 2"]
+
+        start = NOW + timedelta(days=2)
+        created = client.post("/events", json={
+            "name": "Pizza Social", "description": "Slices", "location_name": "CDS",
+            "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+            "capacity": 10, "creator_id": "u3", "creator_name": "User 3",
+            "food_items": [{"name": "Margherita"}],
+        }).json()["event"]
+        client.put("/events/2?user_id=u0", json={"food_items": [{"name": "Vegan pizza"}]})
+
+        hits = client.get("/events/search?q=pizza").json()
+        assert [h["id"] for h in hits] == [str(created["id"]), "2"]
+        assert hits[1]["food_items"][0]["name"] == "Vegan pizza"
+        assert round_trips[-1].total == 0
+
+        client.delete(f"/events/{created['id']}?user_id=u3")
+        assert [h["id"] for h in client.get("/events/search?q=pizza").json()] == ["2"]
+        assert client.get("/events/search?q=").status_code == 422
+
+    def test_facets_follow_event_writes(self, db):
+        before = client.get("/events/facets").json()
+        assert before["total"] == 7
+        assert before["dietary"] == {"kosher": 0, "halal": 2}
+        assert before["locations"] == {"GSU": 4, "CAS": 3}
+        assert before["time"]["next_hour"] == 1 and before["time"]["upcoming"] == 7
+
+        client.put("/events/3?user_id=u0", json={"location_name": "CAS", "food_items": [
+            {"name": "Bagel", "allergy_info": "gluten", "is_kosher": True},
+        ]})
+        client.delete("/events/6?user_id=u0")
+
+        after = client.get("/events/facets").json()
+        assert after["total"] == 6
+        assert after["dietary"] == {"kosher": 1, "halal": 0}
+        assert after["locations"] == {"CAS": 3, "GSU": 3}
+        assert after["allergens"] == {"sesame": 5, "gluten": 1}
+
+
+class TestLatencyInjection:
+    def test_each_execute_sleeps_and_is_counted(self):
+        fake = FakeSupabase(latency=0.02)
+        fake.seed("users", [{"id": "u1"}])
+
+        start = time.perf_counter()
+        assert fake.table("users").select("id").eq("id", "u1").execute().data == [{"id": "u1"}]
+        assert time.perf_counter() - start >= 0.02
+        assert fake.round_trips == 1
+        fake.close()
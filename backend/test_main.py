@@ -1,10 +1,17 @@
+import json
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
 from main import app, get_bu_email_id
+from db.pagination import InvalidCursor, decode_cursor, encode_cursor
+from services.event_filters import EventFilters, FoodIndex
+from db.cache import EVENT_LIST_TAG, catalog_cache, catalog_version, event_tag, invalidate_event, user_cache
 from models.user import User
 from models.event import EventCreate, EventUpdate
+from postgrest.exceptions import APIError
 
 client = TestClient(app)
 
@@ -140,7 +147,7 @@ class TestGetUser:
             "email": "test@bu.edu",
             "full_name": "Test User",
             "role": "student",
-            "registered_events": ["event1", "event2"],
+            "registrations": [{"event_id": 1}, {"event_id": 2}],
             "created_events": 3,
             "id": "user123"
         }]
@@ -162,6 +169,7 @@ class TestGetUser:
         assert response.status_code == 200
         assert response.json()["email"] == "test@bu.edu"
         assert response.json()["role"] == "student"
+        assert response.json()["registered_events"] == ["1", "2"]
 
     @patch('main.supabase')
     def test_get_user_not_found(self, mock_supabase):
@@ -176,6 +184,40 @@ class TestGetUser:
         assert "not found" in response.json()["detail"].lower()
 
 
+class TestUpsertUser:
+    @patch('main.supabase')
+    def test_upsert_user_single_round_trip(self, mock_supabase):
+        """Test that sign-in saves the user with one upsert on the primary key"""
+        mock_supabase.table.return_value.upsert.return_value.execute.return_value.data = [{
+            "id": "user123", "email": "test@bu.edu", "full_name": "Test User",
+            "role": "admin", "created_events": 2,
+        }]
+        user_cache.set("user123", {"id": "user123", "full_name": "Old Name"})
+
+        response = client.put("/users/user123", json={"name": "Test User", "email": "test@bu.edu"})
+        assert response.status_code == 200
+        assert response.json()["user"]["role"] == "admin"
+        mock_supabase.table.return_value.upsert.assert_called_once_with(
+            {"id": "user123", "email": "test@bu.edu", "full_name": "Test User"}, on_conflict="id"
+        )
+        assert mock_supabase.table.call_count == 1
+        assert user_cache.get("user123") is None
+
+    @patch('main.supabase')
+    def test_upsert_user_no_data(self, mock_supabase):
+        """Test upsert failure when Supabase returns no row"""
+        mock_supabase.table.return_value.upsert.return_value.execute.return_value.data = []
+
+        response = client.put("/users/user123", json={"name": "Test User", "email": "test@bu.edu"})
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Failed to save user"
+
+    def test_upsert_user_invalid_email(self):
+        """Test that a malformed email is rejected before touching storage"""
+        response = client.put("/users/user123", json={"name": "Test User", "email": "not-an-email"})
+        assert response.status_code == 422
+
+
 # ===== Get Events Tests =====
 
 class TestGetEvents:
@@ -191,15 +233,90 @@ class TestGetEvents:
             "start_time": "2025-01-01 10:00:00",
             "end_time": "2025-01-01 12:00:00",
             "created_at": "2025-01-01 00:00:00",
-            "quantity_left": 10
+            "quantity_left": 10,
+            "food_items": [{"id": 7, "event_id": 1, "name": "Pizza", "is_kosher": False, "is_halal": True}]
         }]
         
-        mock_supabase.table.return_value.select.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.select.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
         
         response = client.get("/events")
         assert response.status_code == 200
         assert len(response.json()) == 1
         assert response.json()[0]["name"] == "Event 1"
+        assert response.json()[0]["food_items"][0]["name"] == "Pizza"
+        assert "X-Next-Cursor" not in response.headers
+        # Events and their food items in a single round trip
+        mock_supabase.table.assert_called_once_with("events")
+        mock_supabase.table.return_value.select.assert_called_once_with("*, food_items(*)")
+
+    @patch('main.supabase')
+    def test_get_events_falls_back_to_chunked_food_lookup(self, mock_supabase):
+        """Test that events returned without embedded food items get them in chunks"""
+        mock_events_response = MagicMock()
+        mock_events_response.data = [
+            {
+                "id": i,
+                "name": f"Event {i}",
+                "description": "Description",
+                "location_name": "Boston",
+                "start_time": "2030-01-01 10:00:00",
+                "end_time": "2030-01-01 12:00:00",
+                "created_at": "2025-01-01 00:00:00",
+                "quantity_left": 10
+            }
+            for i in range(1, 6)
+        ]
+        
+        chunks = []
+        
+        def food_in(column, ids):
+            chunks.append(list(ids))
+            return MagicMock(execute=MagicMock(return_value=MagicMock(
+                data=[{"id": 100 + i, "event_id": i, "name": f"Food {i}"} for i in ids]
+            )))
+        
+        def table_side_effect(table_name):
+            mock_table = MagicMock()
+            if table_name == "events":
+                mock_table.select.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_events_response
+            else:  # food_items
+                mock_table.select.return_value.in_.side_effect = food_in
+            return mock_table
+        
+        mock_supabase.table.side_effect = table_side_effect
+        
+        with patch('db.loaders.FOOD_ITEMS_CHUNK_SIZE', 2):
+            response = client.get("/events")
+        
+        assert response.status_code == 200
+        assert [e["food_items"][0]["name"] for e in response.json()] == [f"Food {i}" for i in range(1, 6)]
+        assert chunks == [[1, 2], [3, 4], [5]]
+
+    @patch('main.supabase')
+    def test_get_events_food_item_fields(self, mock_supabase):
+        """Test that food items carry the public fields only"""
+        mock_response = MagicMock()
+        mock_response.data = [{
+            "id": 1,
+            "name": "Event 1",
+            "start_time": "2030-01-01 10:00:00",
+            "quantity_left": 3,
+            "food_items": [{"id": 7, "event_id": 1, "name": "Pizza", "is_halal": True}]
+        }]
+        
+        mock_supabase.table.return_value.select.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+        
+        response = client.get("/events")
+        assert response.status_code == 200
+        assert response.json()[0]["quantity_left"] == "3"
+        assert response.json()[0]["food_items"] == [{
+            "id": 7,
+            "name": "Pizza",
+            "allergy_info": None,
+            "is_kosher": None,
+            "is_halal": True,
+            "category": None,
+        }]
 
     @patch('main.supabase')
     def test_get_events_empty(self, mock_supabase):
@@ -207,19 +324,247 @@ class TestGetEvents:
         mock_response = MagicMock()
         mock_response.data = []
         
-        mock_supabase.table.return_value.select.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.select.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
         
         response = client.get("/events")
         assert response.status_code == 200
         assert response.json() == []
 
+    @patch('main.supabase')
+    def test_get_events_returns_next_cursor(self, mock_supabase):
+        """Test that a full page returns a cursor for the next page"""
+        mock_response = MagicMock()
+        mock_response.data = [
+            {
+                "id": i,
+                "name": f"Event {i}",
+                "description": "Description",
+                "location_name": "Boston",
+                "start_time": f"2025-01-0{i} 10:00:00",
+                "end_time": f"2025-01-0{i} 12:00:00",
+                "created_at": "2025-01-01 00:00:00",
+                "quantity_left": 10
+            }
+            for i in (1, 2, 3)
+        ]
+        
+        mock_limit = mock_supabase.table.return_value.select.return_value.order.return_value.order.return_value.limit
+        mock_limit.return_value.execute.return_value = mock_response
+        
+        response = client.get("/events?limit=2")
+        assert response.status_code == 200
+        assert [e["name"] for e in response.json()] == ["Event 1", "Event 2"]
+        mock_limit.assert_called_with(3)
+        assert decode_cursor(response.headers["X-Next-Cursor"]) == ("2025-01-02 10:00:00", 2)
+
+    @patch('main.supabase')
+    def test_get_events_with_cursor(self, mock_supabase):
+        """Test that a cursor resumes strictly after the last (start_time, id)"""
+        mock_response = MagicMock()
+        mock_response.data = []
+        
+        mock_select = mock_supabase.table.return_value.select.return_value
+        mock_select.or_.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+        
+        cursor = encode_cursor({"start_time": "2025-01-02 10:00:00", "id": 2})
+        response = client.get(f"/events?cursor={cursor}")
+        assert response.status_code == 200
+        assert response.json() == []
+        mock_select.or_.assert_called_once_with(
+            'start_time.gt."2025-01-02 10:00:00",'
+            'and(start_time.eq."2025-01-02 10:00:00",id.gt."2")'
+        )
+
+    def test_get_events_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = client.get("/events?cursor=not-a-cursor")
+        assert response.status_code == 400
+        assert "cursor" in response.json()["detail"].lower()
+
+    def test_get_events_rejects_cursor_with_unsafe_fields(self):
+        """Test that cursor values which would be spliced into the filter are validated"""
+        injected = encode_cursor({"start_time": '2025-01-01",id.gt.0,start_time.gt."', "id": 1})
+        response = client.get(f"/events?cursor={injected}")
+        assert response.status_code == 400
+        for row in ({"start_time": "2025-01-02 10:00:00", "id": "2),or(id.gt.0"},
+                    {"start_time": "not a date", "id": 2},
+                    {"start_time": "2025-01-02 10:00:00", "id": True}):
+            with pytest.raises(InvalidCursor):
+                decode_cursor(encode_cursor(row))
+        event_id = "3f2b8c1e-4d5a-4b6c-9e7f-0a1b2c3d4e5f"
+        assert decode_cursor(encode_cursor({"start_time": "2025-01-02T10:00:00Z", "id": event_id})) == (
+            "2025-01-02T10:00:00Z", event_id)
+
+    def test_get_events_limit_out_of_range(self):
+        """Test that page size is bounded"""
+        response = client.get("/events?limit=0")
+        assert response.status_code == 422
+        response = client.get("/events?limit=10000")
+        assert response.status_code == 422
+
+
+# ===== Event Filter Tests =====
+
+class TestEventFilters:
+    def test_food_index_excludes_events_by_allergen(self):
+        """Test that allergen exclusion matches substrings of each event's allergy info"""
+        index = FoodIndex([
+            {"event_id": 1, "allergy_info": "Peanuts, dairy"},
+            {"event_id": 2, "allergy_info": "gluten"},
+            {"event_id": 3, "allergy_info": None},
+        ])
+        filters = EventFilters.from_params(exclude_allergens=["nut,Gluten"])
+        assert index.excluded_by_allergens(filters.exclude_allergens) == {"1", "2"}
+        assert index.excluded_by_allergens(["dairy"]) == {"1"}
+        assert index.excluded_by_allergens(["shellfish"]) == set()
+
+    def test_from_params_rejects_unknown_window(self):
+        """Test that only known time windows are accepted"""
+        with pytest.raises(ValueError):
+            EventFilters.from_params(window="yesterday")
+
+    def test_get_events_invalid_window(self):
+        """Test that an unknown window is a client error"""
+        response = client.get("/events?window=yesterday")
+        assert response.status_code == 400
+
+    @patch('main.supabase')
+    def test_get_events_pushes_down_time_and_location(self, mock_supabase):
+        """Test that time window and location filters go into the events query"""
+        mock_response = MagicMock()
+        mock_response.data = []
+        
+        mock_select = mock_supabase.table.return_value.select.return_value
+        mock_filtered = mock_select.gt.return_value.ilike.return_value
+        mock_filtered.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+        
+        response = client.get("/events?window=upcoming&location=GSU")
+        assert response.status_code == 200
+        assert response.json() == []
+        assert mock_select.gt.call_args[0][0] == "start_time"
+        mock_select.gt.return_value.ilike.assert_called_once_with("location_name", "%GSU%")
+
+    @patch('main.supabase')
+    def test_get_events_filters_by_food_items(self, mock_supabase):
+        """Test that dietary filters go into the query and allergen filters drop non-matching events"""
+        food_items = {
+            1: [{"id": 10, "event_id": 1, "name": "Pizza", "is_halal": True, "allergy_info": "dairy"}],
+            2: [{"id": 20, "event_id": 2, "name": "Pad Thai", "is_halal": True, "allergy_info": "peanuts"}],
+        }
+        mock_events_response = MagicMock()
+        mock_events_response.data = [
+            {
+                "id": i,
+                "name": f"Event {i}",
+                "description": "Description",
+                "location_name": "Boston",
+                "start_time": f"2030-01-0{i} 10:00:00",
+                "end_time": f"2030-01-0{i} 12:00:00",
+                "created_at": "2025-01-01 00:00:00",
+                "quantity_left": 10,
+                "food_items": food_items[i]
+            }
+            for i in (1, 2)
+        ]
+        
+        mock_select = mock_supabase.table.return_value.select
+        mock_select.return_value.eq.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_events_response
+        
+        response = client.get("/events?is_halal=true&exclude_allergens=peanut")
+        assert response.status_code == 200
+        assert [e["id"] for e in response.json()] == ["1"]
+        assert response.json()[0]["food_items"][0]["name"] == "Pizza"
+        # The dietary flag is joined in the database; only allergens are checked here
+        assert mock_select.call_args.args == ("*, food_items(*), halal_food:food_items!inner(id)",)
+        mock_select.return_value.eq.assert_called_once_with("halal_food.is_halal", True)
+
+
+# ===== Event Export Tests =====
+
+def export_row(i):
+    return {
+        "id": i,
+        "name": f"Event {i}",
+        "description": "Description",
+        "location_name": "Boston",
+        "start_time": f"2030-01-0{i} 10:00:00",
+        "end_time": f"2030-01-0{i} 12:00:00",
+        "created_at": "2025-01-01 00:00:00",
+        "quantity_left": 10,
+        "food_items": [{"id": 100 + i, "event_id": i, "name": "Pizza", "is_halal": i % 2 == 0}],
+    }
+
+class TestExportEvents:
+    @patch('main.EXPORT_PAGE_SIZE', 2)
+    @patch('main.supabase')
+    def test_export_streams_every_page(self, mock_supabase):
+        """Test that the export pages through the catalog and writes one JSON line per event"""
+        rows = [export_row(i) for i in range(1, 6)]
+        mock_select = mock_supabase.table.return_value.select
+        # First page has no cursor; later pages resume with an or_() keyset filter
+        mock_select.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = MagicMock(data=rows[0:3])
+        mock_select.return_value.or_.return_value.order.return_value.order.return_value.limit.return_value.execute.side_effect = [
+            MagicMock(data=rows[2:5]),
+            MagicMock(data=rows[4:5]),
+        ]
+        
+        response = client.get("/events/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [e["id"] for e in lines] == ["1", "2", "3", "4", "5"]
+        assert lines[0]["quantity_left"] == "10"
+        assert lines[0]["food_items"][0]["name"] == "Pizza"
+        # Three round trips of two events (plus look-ahead) each
+        assert mock_select.return_value.order.return_value.order.return_value.limit.call_args.args == (3,)
+        assert mock_select.return_value.or_.call_count == 2
+
+    @patch('main.supabase')
+    def test_export_applies_food_filters(self, mock_supabase):
+        """Test that dietary filters go into the query and allergen filters drop events while streaming"""
+        rows = [dict(export_row(i), kosher_food=[]) for i in (2, 4)]
+        rows[1]["food_items"][0]["allergy_info"] = "Peanuts"
+        mock_select = mock_supabase.table.return_value.select
+        mock_select.return_value.eq.return_value.is_.return_value.order.return_value.order.return_value.limit \
+            .return_value.execute.return_value = MagicMock(data=rows)
+        
+        response = client.get("/events/export?is_kosher=false&exclude_allergens=nut")
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [e["id"] for e in lines] == ["2"]
+        assert "kosher_food" not in lines[0]
+        assert mock_select.call_args.args == ("*, food_items(*), kosher_food:food_items(id)",)
+        mock_select.return_value.eq.assert_called_once_with("kosher_food.is_kosher", True)
+        mock_select.return_value.eq.return_value.is_.assert_called_once_with("kosher_food", "null")
+
+    @patch('main.supabase')
+    def test_export_empty_catalog(self, mock_supabase):
+        """Test that an empty catalog streams an empty body"""
+        mock_select = mock_supabase.table.return_value.select
+        mock_select.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = MagicMock(data=[])
+        
+        response = client.get("/events/export")
+        assert response.status_code == 200
+        assert response.text == ""
+
+    def test_export_invalid_cursor(self):
+        """Test that a malformed cursor is rejected before streaming starts"""
+        response = client.get("/events/export?cursor=not-a-cursor")
+        assert response.status_code == 400
+        assert "cursor" in response.json()["detail"].lower()
+
+    def test_export_invalid_window(self):
+        """Test that an unknown window is rejected before streaming starts"""
+        response = client.get("/events/export?window=someday")
+        assert response.status_code == 400
+
 
 # ===== Get Single Event Tests =====
 
 class TestGetSingleEvent:
     @patch('main.supabase')
     def test_get_event_success(self, mock_supabase):
-        """Test getting a single event"""
+        """Test getting a single event with embedded food items in one query"""
         mock_response = MagicMock()
         mock_response.data = [{
             "id": 1,
@@ -229,14 +574,51 @@ class TestGetSingleEvent:
             "start_time": "2025-01-01 10:00:00",
             "end_time": "2025-01-01 12:00:00",
             "created_at": "2025-01-01 00:00:00",
-            "quantity_left": 10
+            "quantity_left": 10,
+            "food_items": [{"id": 7, "event_id": 1, "name": "Pizza", "is_kosher": False, "is_halal": True}]
         }]
         
         mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
         
         response = client.get("/events/1")
         assert response.status_code == 200
-        assert response.json()[0]["name"] == "Event 1"
+        assert response.json()["name"] == "Event 1"
+        assert response.json()["id"] == 1
+        assert response.json()["food_items"][0]["name"] == "Pizza"
+        assert "is_registered" not in response.json()
+        mock_supabase.table.assert_called_once_with("events")
+        mock_supabase.table.return_value.select.assert_called_once_with("*, food_items(*)")
+
+    @patch('main.supabase')
+    def test_get_event_with_registration_status(self, mock_supabase):
+        """Test that user_id adds the caller's registration status from the same query"""
+        mock_response = MagicMock()
+        mock_response.data = [{
+            "id": 1,
+            "name": "Event 1",
+            "description": "Description 1",
+            "location_name": "Boston",
+            "start_time": "2025-01-01 10:00:00",
+            "end_time": "2025-01-01 12:00:00",
+            "created_at": "2025-01-01 00:00:00",
+            "quantity_left": 10,
+            "food_items": [],
+            "registrations": [{"user_id": "user123"}]
+        }]
+        
+        mock_select = mock_supabase.table.return_value.select
+        mock_select.return_value.eq.return_value.eq.return_value.execute.return_value = mock_response
+        
+        response = client.get("/events/1?user_id=user123")
+        assert response.status_code == 200
+        assert response.json()["is_registered"] is True
+        assert "registrations" not in response.json()
+        mock_select.assert_called_once_with("*, food_items(*), registrations(user_id)")
+        mock_select.return_value.eq.return_value.eq.assert_called_once_with("registrations.user_id", "user123")
+        
+        mock_response.data[0]["registrations"] = []
+        response = client.get("/events/1?user_id=other")
+        assert response.json()["is_registered"] is False
 
     @patch('main.supabase')
     def test_get_event_not_found(self, mock_supabase):
@@ -247,8 +629,221 @@ class TestGetSingleEvent:
         mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
         
         response = client.get("/events/999")
+        assert response.status_code == 404
+        assert "not found" in response.json()["detail"].lower()
+        
+        # The miss is cached too
+        response = client.get("/events/999")
+        assert response.status_code == 404
+        assert mock_supabase.table.call_count == 1
+
+
+# ===== Catalog Cache Tests =====
+
+class TestCatalogCache:
+    @patch('main.supabase')
+    def test_get_event_served_from_cache(self, mock_supabase):
+        """Test that repeated reads of an event skip Supabase"""
+        mock_response = MagicMock()
+        mock_response.data = [{
+            "id": 1,
+            "name": "Event 1",
+            "description": "Description 1",
+            "location_name": "Boston",
+            "start_time": "2025-01-01 10:00:00",
+            "end_time": "2025-01-01 12:00:00",
+            "created_at": "2025-01-01 00:00:00",
+            "quantity_left": 10
+        }]
+        
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        
+        first = client.get("/events/1")
+        calls_after_first = mock_supabase.table.call_count
+        second = client.get("/events/1")
+        assert second.json() == first.json()
+        assert mock_supabase.table.call_count == calls_after_first
+
+    @patch('main.supabase')
+    def test_register_invalidates_cached_event(self, mock_supabase):
+        """Test that registering drops the cached event and list pages containing it"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "reserved",
+            "quantity_left": 4
+        }]
+        events_query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        events_query.execute.return_value = MagicMock(data=[{"id": "event1", "quantity_left": 5}])
+        
+        # Fill the detail entry the way GET /events/{event_id} does
+        client.get("/events/event1")
+        client.get("/events/event1")
+        assert events_query.execute.call_count == 1
+        catalog_cache.set(("events", None, 50, EventFilters()), ([{"id": "event1"}], None), tags=[EVENT_LIST_TAG, event_tag("event1")])
+        catalog_cache.set(("events", "next", 50, EventFilters()), ([{"id": "event2"}], None), tags=[EVENT_LIST_TAG, event_tag("event2")])
+        
+        response = client.post("/events/event1/register", json={"user_id": "user123"})
         assert response.status_code == 200
-        assert response.json() == []
+        events_query.execute.return_value = MagicMock(data=[{"id": "event1", "quantity_left": 4}])
+        assert client.get("/events/event1").json()["quantity_left"] == "4"
+        assert events_query.execute.call_count == 2
+        assert catalog_cache.get(("events", None, 50, EventFilters())) is None
+        assert catalog_cache.get(("events", "next", 50, EventFilters())) is not None
+
+    def test_cache_stats_endpoint(self):
+        """Test that cache counters are exposed"""
+        response = client.get("/cache/stats")
+        assert response.status_code == 200
+        assert {"hits", "misses", "size"} <= response.json().keys()
+
+
+# ===== User Cache Tests =====
+
+class TestUserCache:
+    USER = {
+        "id": "user123",
+        "email": "test@bu.edu",
+        "full_name": "Test User",
+        "role": "student",
+        "created_events": 0,
+        "registrations": [{"event_id": 1}],
+    }
+
+    @patch('main.supabase')
+    def test_get_user_served_from_cache(self, mock_supabase):
+        """Test that repeated sign-in lookups of a user skip Supabase"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [self.USER]
+
+        first = client.get("/users/user123")
+        second = client.get("/users/user123")
+        assert second.json() == first.json()
+        assert mock_supabase.table.call_count == 1
+
+    @patch('main.supabase')
+    def test_unknown_users_are_not_cached(self, mock_supabase):
+        """Test that a user who signs up after a 404 is found on the next lookup"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+        assert client.get("/users/user123").status_code == 404
+        assert user_cache.get("user123") is None
+
+    @patch('main.supabase')
+    def test_register_and_unregister_invalidate_cached_users(self, mock_supabase):
+        """Test that seat changes drop the registrant and any promoted users"""
+        for user_id in ("user123", "user456", "user789"):
+            user_cache.set(user_id, dict(self.USER, id=user_id))
+
+        mock_supabase.rpc.return_value.execute.return_value.data = [{"status": "reserved", "quantity_left": 4}]
+        assert client.post("/events/event1/register", json={"user_id": "user123"}).status_code == 200
+        assert user_cache.get("user123") is None
+        assert user_cache.get("user456") is not None
+
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "released", "quantity_left": 0, "promoted_user_ids": ["user789"]
+        }]
+        assert client.post("/events/event1/unregister", json={"user_id": "user456"}).status_code == 200
+        assert user_cache.get("user456") is None
+        assert user_cache.get("user789") is None
+
+    @patch('main.supabase')
+    def test_delete_event_drops_its_registrants(self, mock_supabase):
+        """Test that deleting an event drops every cached user registered for it"""
+        mock_response = MagicMock()
+        mock_response.data = [{"id": "event1", "creator_id": "user123"}]
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        user_cache.set("user123", self.USER)
+        user_cache.set("user456", dict(self.USER, id="user456"), tags=[event_tag("event1")])
+        user_cache.set("user789", dict(self.USER, id="user789"), tags=[event_tag("event2")])
+
+        response = client.delete("/events/event1?user_id=user123")
+        assert response.status_code == 200
+        assert user_cache.get("user456") is None
+        assert user_cache.get("user789") is not None
+
+    def test_cache_stats_include_users(self):
+        """Test that user cache counters are exposed next to the catalog ones"""
+        assert {"hits", "misses", "size"} <= client.get("/cache/stats").json()["users"].keys()
+
+
+# ===== Conditional Request Tests =====
+
+class TestConditionalRequests:
+    @patch('main.supabase')
+    def test_matching_etag_returns_304_without_queries(self, mock_supabase):
+        """Test that If-None-Match with the current tag skips Supabase entirely"""
+        mock_response = MagicMock()
+        mock_response.data = []
+        
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        
+        first = client.get("/users/user123/created-events")
+        etag = first.headers["ETag"]
+        mock_supabase.table.reset_mock()
+        
+        for path in ("/users/user123/created-events", "/events/1", "/events", "/users/user123/interested-events"):
+            response = client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
+            assert response.content == b""
+        mock_supabase.table.assert_not_called()
+
+    @patch('main.supabase')
+    def test_write_changes_etag(self, mock_supabase):
+        """Test that a catalog write makes old tags stale"""
+        mock_response = MagicMock()
+        mock_response.data = [{
+            "id": 1,
+            "name": "Event 1",
+            "description": "Description 1",
+            "location_name": "Boston",
+            "start_time": "2025-01-01 10:00:00",
+            "end_time": "2025-01-01 12:00:00",
+            "created_at": "2025-01-01 00:00:00",
+            "quantity_left": 10
+        }]
+        
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        
+        etag = client.get("/events/1").headers["ETag"]
+        invalidate_event("1")
+        response = client.get("/events/1", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_weak_comparison_and_tag_lists(self):
+        """Test If-None-Match lists and strong/weak forms both match"""
+        etag = catalog_version.etag()
+        strong = etag.removeprefix("W/")
+        response = client.get("/events/1", headers={"If-None-Match": f'"other", {strong}'})
+        assert response.status_code == 304
+
+    @patch('main.supabase')
+    def test_time_window_tags_differ_from_plain_list(self, mock_supabase):
+        """Test that time-window lists get their own clock-based tag"""
+        mock_response = MagicMock()
+        mock_response.data = []
+        
+        mock_supabase.table.return_value.select.return_value.gt.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = mock_response
+        
+        response = client.get("/events?window=upcoming", headers={"If-None-Match": catalog_version.etag()})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != catalog_version.etag()
+
+
+    @patch('main.supabase')
+    def test_profile_write_changes_dashboard_etag(self, mock_supabase):
+        """Test that signing in with a new name makes the dashboard's old tag stale"""
+        rows = mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value
+        rows.data = [{"id": "user123", "email": "test@bu.edu", "full_name": "Old Name", "role": "student"}]
+        first = client.get("/users/user123/dashboard")
+        assert first.json()["user"]["name"] == "Old Name"
+        etag = first.headers["ETag"]
+
+        mock_supabase.table.return_value.upsert.return_value.execute.return_value.data = [{"id": "user123"}]
+        assert client.put("/users/user123", json={"name": "New Name", "email": "test@bu.edu"}).status_code == 200
+
+        rows.data = [{"id": "user123", "email": "test@bu.edu", "full_name": "New Name", "role": "student"}]
+        response = client.get("/users/user123/dashboard", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["user"]["name"] == "New Name"
 
 
 # ===== Create Event Tests =====
@@ -278,9 +873,10 @@ class TestCreateEvent:
             "quantity_left": 50
         }]
         
-        # Mock user update
+        # Mock the created_events increment
         mock_update_response = MagicMock()
-        mock_update_response.data = [{"created_events": 1}]
+        mock_update_response.data = [{"user_id": "user123", "created_events": 1}]
+        mock_supabase.rpc.return_value.execute.return_value = mock_update_response
         
         # Setup mock to handle different table calls
         def table_side_effect(table_name):
@@ -290,11 +886,6 @@ class TestCreateEvent:
                         eq=MagicMock(return_value=MagicMock(
                             execute=MagicMock(return_value=mock_user_response)
                         ))
-                    )),
-                    update=MagicMock(return_value=MagicMock(
-                        eq=MagicMock(return_value=MagicMock(
-                            execute=MagicMock(return_value=mock_update_response)
-                        ))
                     ))
                 )
             else:  # events
@@ -345,81 +936,224 @@ class TestCreateEvent:
         assert "not found" in response.json()["detail"].lower()
 
 
-# ===== Register for Event Tests =====
+# ===== Bulk Event Import Tests =====
 
-class TestRegisterForEvent:
+def bulk_event(i, creator_id="user123", **overrides):
+    event = {
+        "name": f"Event {i}",
+        "description": "Description",
+        "location_name": "GSU",
+        "start_time": f"2030-02-0{i}T18:00:00+00:00",
+        "end_time": f"2030-02-0{i}T20:00:00+00:00",
+        "capacity": 20,
+        "creator_id": creator_id,
+        "creator_name": "Test User",
+        "food_items": [{"name": "Pizza", "is_halal": True}],
+    }
+    event.update(overrides)
+    return event
+
+class FakeBulkTables:
+    """Per-table mocks for the bulk import's batched statements."""
+
+    def __init__(self, users, food_ok=True):
+        self.users = MagicMock()
+        self.users.select.return_value.in_.return_value.execute.return_value = MagicMock(data=users)
+        # add_created_events returns a row per counted user
+        self.rpc = MagicMock(side_effect=lambda fn, params: MagicMock(execute=MagicMock(return_value=MagicMock(
+            data=[{"user_id": u, "created_events": n} for u, n in params["p_counts"].items()]
+        ))))
+        self.events = MagicMock()
+        self.events.insert.side_effect = lambda rows: MagicMock(execute=MagicMock(return_value=MagicMock(
+            data=[dict(row, id=100 + n) for n, row in enumerate(rows)]
+        )))
+        self.food_items = MagicMock()
+        self.food_items.insert.return_value.execute.return_value = MagicMock(data=[{"id": 1}] if food_ok else [])
+
+    def table(self, name):
+        return getattr(self, name)
+
+    def attach(self, mock_supabase):
+        mock_supabase.table.side_effect = self.table
+        mock_supabase.rpc = self.rpc
+
+class TestBulkCreateEvents:
     @patch('main.supabase')
-    def test_register_for_event_success(self, mock_supabase):
-        """Test successful event registration"""
-        # Mock user fetch
-        mock_user_response = MagicMock()
-        mock_user_response.data = [{
-            "id": "user123",
-            "registered_events": []
-        }]
+    def test_bulk_json_batches_every_write(self, mock_supabase):
+        """Test that N events cost one insert each for events and food, and one counter increment"""
+        tables = FakeBulkTables([
+            {"id": "user123", "created_events": 2},
+            {"id": "user456", "created_events": None},
+        ])
+        tables.attach(mock_supabase)
         
-        # Mock user update
-        mock_update_response = MagicMock()
-        mock_update_response.data = [{"registered_events": ["event1"]}]
+        payload = [bulk_event(1), bulk_event(2), bulk_event(3, creator_id="user456")]
+        response = client.post("/events/bulk", json=payload)
         
-        # Mock event fetch
-        mock_event_response = MagicMock()
-        mock_event_response.data = [{
-            "id": "event1",
-            "name": "Event 1",
-            "quantity_left": 10
-        }]
+        assert response.status_code == 200
+        assert [e["id"] for e in response.json()["events"]] == [100, 101, 102]
+        assert response.json()["events"][0]["quantity_left"] == "20"
+        tables.users.select.return_value.in_.assert_called_once_with("id", ["user123", "user456"])
+        tables.events.insert.assert_called_once()
+        assert [row["name"] for row in tables.events.insert.call_args.args[0]] == ["Event 1", "Event 2", "Event 3"]
+        food_rows = tables.food_items.insert.call_args.args[0]
+        assert [row["event_id"] for row in food_rows] == [100, 101, 102]
+        tables.rpc.assert_called_once_with("add_created_events", {"p_counts": {"user123": 2, "user456": 1}})
+
+    @patch('main.supabase')
+    def test_bulk_csv(self, mock_supabase):
+        """Test CSV import with ';'-separated food item names"""
+        tables = FakeBulkTables([{"id": "user123", "created_events": 0}])
+        tables.attach(mock_supabase)
+        
+        body = (
+            "name,description,location_name,start_time,end_time,capacity,creator_id,creator_name,food_items\n"
+            "Pizza Night,Free pizza,GSU,2030-02-01T18:00:00+00:00,2030-02-01T20:00:00+00:00,30,user123,Test User,Pizza; Salad\n"
+            "Bagels,,CDS,2030-02-02T09:00:00+00:00,2030-02-02T10:00:00+00:00,15,user123,Test User,\n"
+        )
+        response = client.post("/events/bulk", content=body, headers={"Content-Type": "text/csv"})
+        
+        # description is required, so the empty cell fails the second row
+        assert response.status_code == 422
+        assert [e["row"] for e in response.json()["detail"]["errors"]] == [2]
+        assert "description" in response.json()["detail"]["errors"][0]["error"]
+        tables.events.insert.assert_not_called()
+        
+        response = client.post(
+            "/events/bulk",
+            content=body.replace("Bagels,,", "Bagels,Fresh bagels,"),
+            headers={"Content-Type": "text/csv"},
+        )
+        assert response.status_code == 200
+        assert len(response.json()["events"]) == 2
+        food_rows = tables.food_items.insert.call_args.args[0]
+        assert [(row["name"], row["event_id"]) for row in food_rows] == [("Pizza", 100), ("Salad", 100)]
+        tables.rpc.assert_called_once_with("add_created_events", {"p_counts": {"user123": 2}})
+
+    @patch('main.supabase')
+    def test_bulk_reports_every_bad_row_and_writes_nothing(self, mock_supabase):
+        """Test that validation runs over all rows before any write"""
+        tables = FakeBulkTables([{"id": "user123", "created_events": 0}])
+        tables.attach(mock_supabase)
+        
+        payload = [
+            bulk_event(1),
+            bulk_event(2, start_time="2020-01-01T10:00:00+00:00"),
+            bulk_event(3, end_time="2030-02-03T17:00:00+00:00"),
+            bulk_event(4, creator_id="ghost"),
+            {"name": "No details"},
+        ]
+        response = client.post("/events/bulk", json=payload)
+        
+        assert response.status_code == 422
+        errors = response.json()["detail"]["errors"]
+        assert [e["row"] for e in errors] == [2, 3, 4, 5]
+        assert errors[0]["error"] == "Start time must be in the future"
+        assert errors[1]["error"] == "End time must be after start time"
+        assert errors[2]["error"] == "User not found"
+        tables.events.insert.assert_not_called()
+        tables.rpc.assert_not_called()
+
+    @patch('main.supabase')
+    def test_bulk_rolls_back_events_when_food_insert_fails(self, mock_supabase):
+        """Test that the inserted events are deleted if their food items cannot be"""
+        tables = FakeBulkTables([{"id": "user123", "created_events": 0}], food_ok=False)
+        tables.attach(mock_supabase)
         
-        def table_side_effect(table_name):
-            if table_name == "users":
-                return MagicMock(
-                    select=MagicMock(return_value=MagicMock(
-                        eq=MagicMock(return_value=MagicMock(
-                            execute=MagicMock(return_value=mock_user_response)
-                        ))
-                    )),
-                    update=MagicMock(return_value=MagicMock(
-                        eq=MagicMock(return_value=MagicMock(
-                            execute=MagicMock(return_value=mock_update_response)
-                        ))
-                    ))
-                )
-            else:
-                return MagicMock(
-                    select=MagicMock(return_value=MagicMock(
-                        eq=MagicMock(return_value=MagicMock(
-                            execute=MagicMock(return_value=mock_event_response)
-                        ))
-                    ))
-                )
+        response = client.post("/events/bulk", json=[bulk_event(1), bulk_event(2)])
         
-        mock_supabase.table.side_effect = table_side_effect
+        assert response.status_code == 500
+        tables.events.delete.return_value.in_.assert_called_once_with("id", [100, 101])
+        tables.rpc.assert_not_called()
+
+    @patch('main.supabase')
+    def test_bulk_rolls_back_events_when_food_insert_raises(self, mock_supabase):
+        """Test that an APIError from the food insert also deletes the inserted events"""
+        tables = FakeBulkTables([{"id": "user123", "created_events": 0}])
+        tables.food_items.insert.return_value.execute.side_effect = APIError(
+            {"message": "violates check constraint", "code": "23514"}
+        )
+        tables.attach(mock_supabase)
+
+        response = client.post("/events/bulk", json=[bulk_event(1), bulk_event(2)])
+
+        assert response.status_code == 500
+        tables.events.delete.return_value.in_.assert_called_once_with("id", [100, 101])
+        tables.rpc.assert_not_called()
+
+    @patch('main.supabase')
+    def test_bulk_rolls_back_events_when_counter_update_raises(self, mock_supabase):
+        """Test that an APIError from the created_events increment deletes the inserted events"""
+        tables = FakeBulkTables([{"id": "user123", "created_events": 0}])
+        tables.rpc.side_effect = lambda fn, params: MagicMock(execute=MagicMock(side_effect=APIError(
+            {"message": "connection reset", "code": "08006"}
+        )))
+        tables.attach(mock_supabase)
+
+        response = client.post("/events/bulk", json=[bulk_event(1)])
+
+        assert response.status_code == 500
+        tables.events.delete.return_value.in_.assert_called_once_with("id", [100])
+
+    @pytest.mark.parametrize("body, content_type", [
+        ("[]", "application/json"),
+        ("{\"name\": \"x\"}", "application/json"),
+        ("not json", "application/json"),
+        ("name,description\n", "text/csv"),
+    ])
+    def test_bulk_rejects_unusable_bodies(self, body, content_type):
+        """Test that empty, non-array or unparseable bodies are rejected"""
+        response = client.post("/events/bulk", content=body, headers={"Content-Type": content_type})
+        assert response.status_code == 400
+
+    def test_bulk_rejects_oversized_imports(self):
+        """Test the per-import row limit"""
+        with patch('services.bulk_import.MAX_BULK_EVENTS', 2):
+            response = client.post("/events/bulk", json=[bulk_event(1)] * 3)
+        assert response.status_code == 400
+        assert "At most 2" in response.json()["detail"]
+
+
+# ===== Register for Event Tests =====
+
+class TestRegisterForEvent:
+    @patch('main.supabase')
+    def test_register_for_event_success(self, mock_supabase):
+        """Test successful event registration"""
+        mock_insert_response = MagicMock()
+        mock_insert_response.data = [{"user_id": "user123", "event_id": "event1"}]
+        
+        mock_registrations = MagicMock()
+        mock_registrations.insert.return_value.execute.return_value = mock_insert_response
+        mock_supabase.table.side_effect = lambda table_name: mock_registrations
         
         response = client.post("/events/event1/registrations/user123")
         assert response.status_code == 200
         assert "Successfully registered" in response.json()["message"]
+        mock_supabase.table.assert_called_once_with("registrations")
+        mock_registrations.insert.assert_called_once_with({"user_id": "user123", "event_id": "event1"})
 
     @patch('main.supabase')
     def test_register_for_event_user_not_found(self, mock_supabase):
         """Test registration fails when user doesn't exist"""
-        mock_response = MagicMock()
-        mock_response.data = []
-        
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.insert.return_value.execute.side_effect = APIError({
+            "code": "23503",
+            "message": "insert or update on table \"registrations\" violates foreign key constraint",
+            "details": "Key (user_id)=(nonexistent) is not present in table \"users\"."
+        })
         
         response = client.post("/events/event1/registrations/nonexistent")
         assert response.status_code == 404
+        assert response.json()["detail"] == "User not found"
 
     @patch('main.supabase')
     def test_register_for_event_already_registered(self, mock_supabase):
         """Test registration fails if user is already registered"""
-        mock_response = MagicMock()
-        mock_response.data = [{
-            "id": "user123",
-            "registered_events": ["event1"]
-        }]
-        
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.insert.return_value.execute.side_effect = APIError({
+            "code": "23505",
+            "message": "duplicate key value violates unique constraint \"registrations_pkey\"",
+            "details": "Key (user_id, event_id)=(user123, event1) already exists."
+        })
         
         response = client.post("/events/event1/registrations/user123")
         assert response.status_code == 400
@@ -484,6 +1218,29 @@ class TestUpdateEvent:
         assert response.status_code == 200
         assert "updated successfully" in response.json()["message"].lower()
 
+    @patch('main.supabase')
+    def test_update_event_capacity_promotes_waitlist(self, mock_supabase):
+        """Test that raising capacity offers the new seats to the waitlist first"""
+        event_row = {
+            "id": "event1",
+            "creator_id": "user123",
+            "start_time": "2030-01-01 10:00:00",
+            "end_time": "2030-01-01 12:00:00",
+            "quantity_left": 0
+        }
+        mock_events = mock_supabase.table.return_value
+        mock_events.select.return_value.eq.return_value.execute.return_value = MagicMock(data=[event_row])
+        mock_events.update.return_value.eq.return_value.execute.return_value = MagicMock(data=[dict(event_row, quantity_left=5)])
+        
+        response = client.put("/events/event1?user_id=user123", json={"capacity": 5})
+        assert response.status_code == 200
+        mock_supabase.rpc.assert_called_once_with("promote_waitlist", {"p_event_id": "event1"})
+        
+        mock_supabase.rpc.reset_mock()
+        response = client.put("/events/event1?user_id=user123", json={"name": "Renamed"})
+        assert response.status_code == 200
+        mock_supabase.rpc.assert_not_called()
+
     @patch('main.supabase')
     def test_update_event_not_found(self, mock_supabase):
         """Test update fails when event doesn't exist"""
@@ -541,6 +1298,34 @@ class TestGetUserCreatedEvents:
         assert len(response.json()) == 1
         assert response.json()[0]["creator_id"] == "user123"
 
+    @patch('main.supabase')
+    def test_get_user_created_events_wire_format(self, mock_supabase):
+        """Test that the response model sends numeric columns as strings, once, and the id as it is"""
+        mock_response = MagicMock()
+        mock_response.data = [{
+            "id": 1,
+            "name": "My Event",
+            "creator_id": "user123",
+            "start_time": "2025-01-01 10:00:00",
+            "end_time": "2025-01-01 12:00:00",
+            "location_name": "Boston",
+            "created_at": "2025-01-01 00:00:00",
+            "quantity_left": 10,
+            "description": None
+        }]
+        
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        
+        response = client.get("/users/user123/created-events")
+        assert response.status_code == 200
+        event = response.json()[0]
+        assert event["id"] == 1
+        assert event["quantity_left"] == "10"
+        assert event["description"] == "None"
+        assert event["name"] == "My Event"
+        # Rows are left as the database returned them
+        assert mock_response.data[0]["quantity_left"] == 10
+
     @patch('main.supabase')
     def test_get_user_created_events_empty(self, mock_supabase):
         """Test getting created events when user has none"""
@@ -560,60 +1345,105 @@ class TestRegisterEvent:
     @patch('main.supabase')
     def test_register_event_success(self, mock_supabase):
         """Test successful event registration via new endpoint"""
-        # Mock event fetch
-        mock_event_response = MagicMock()
-        mock_event_response.data = [{
-            "id": "event1",
-            "quantity_left": 5
-        }]
-        
-        # Mock user fetch
-        mock_user_response = MagicMock()
-        mock_user_response.data = [{
-            "id": "user123",
-            "registered_events": []
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "reserved",
+            "quantity_left": 4
         }]
         
-        # Mock updates
-        mock_user_update = MagicMock()
-        mock_user_update.execute.return_value.data = [{"registered_events": ["event1"]}]
-        
-        mock_event_update = MagicMock()
-        mock_event_update.execute.return_value.data = [{"quantity_left": 4}]
-        
-        def table_side_effect(table_name):
-            if table_name == "events":
-                mock_events = MagicMock()
-                mock_events.select.return_value.eq.return_value.execute.return_value = mock_event_response
-                mock_events.update.return_value.eq.return_value.execute.return_value = mock_event_update
-                return mock_events
-            else:  # users
-                mock_users = MagicMock()
-                mock_users.select.return_value.eq.return_value.execute.return_value = mock_user_response
-                mock_users.update.return_value.eq.return_value.execute.return_value = mock_user_update
-                return mock_users
-        
-        mock_supabase.table.side_effect = table_side_effect
-        
         response = client.post("/events/event1/register", json={"user_id": "user123"})
         assert response.status_code == 200
         assert "Successfully" in response.json()["message"]
+        assert response.json()["quantity_left"] == 4
+        mock_supabase.rpc.assert_called_once_with("reserve_seat", {
+            "p_event_id": "event1",
+            "p_user_id": "user123"
+        })
+        mock_supabase.table.assert_not_called()
 
     @patch('main.supabase')
     def test_register_event_no_spots(self, mock_supabase):
         """Test registration fails when event is full"""
-        mock_response = MagicMock()
-        mock_response.data = [{
-            "id": "event1",
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "sold_out",
             "quantity_left": 0
         }]
         
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
-        
         response = client.post("/events/event1/register", json={"user_id": "user123"})
         assert response.status_code == 400
         assert "No spots" in response.json()["detail"]
 
+    @patch('main.supabase')
+    def test_register_event_rejections(self, mock_supabase):
+        """Test that each reservation outcome maps to the right error"""
+        for outcome, status_code, detail in [
+            ("event_not_found", 404, "Event not found"),
+            ("user_not_found", 404, "User not found"),
+            ("already_registered", 400, "Already registered"),
+        ]:
+            mock_supabase.rpc.return_value.execute.return_value.data = [{
+                "status": outcome,
+                "quantity_left": None
+            }]
+            response = client.post("/events/event1/register", json={"user_id": "user123"})
+            assert response.status_code == status_code
+            assert response.json()["detail"] == detail
+
+
+class TestRegisterGroup:
+    @patch('main.supabase')
+    def test_register_group_one_round_trip(self, mock_supabase):
+        """Test that a whole group is registered with a single reserve_seats call"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [
+            {"user_id": "user1", "status": "reserved", "quantity_left": 8},
+            {"user_id": "user2", "status": "already_registered", "quantity_left": 8},
+            {"user_id": "user3", "status": "user_not_found", "quantity_left": 8},
+        ]
+        
+        response = client.post("/events/event1/register/group", json={"user_ids": ["user1", "user2", "user1", "user3"]})
+        assert response.status_code == 200
+        assert response.json()["quantity_left"] == 8
+        assert response.json()["results"] == [
+            {"user_id": "user1", "status": "reserved"},
+            {"user_id": "user2", "status": "already_registered"},
+            {"user_id": "user3", "status": "user_not_found"},
+        ]
+        # Duplicates are dropped before the call
+        mock_supabase.rpc.assert_called_once_with("reserve_seats", {
+            "p_event_id": "event1",
+            "p_user_ids": ["user1", "user2", "user3"]
+        })
+        mock_supabase.table.assert_not_called()
+
+    @patch('main.supabase')
+    def test_register_group_not_enough_seats(self, mock_supabase):
+        """Test that a group that does not fit is rejected with every outcome"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [
+            {"user_id": "user1", "status": "sold_out", "quantity_left": 1},
+            {"user_id": "user2", "status": "sold_out", "quantity_left": 1},
+        ]
+        
+        response = client.post("/events/event1/register/group", json={"user_ids": ["user1", "user2"]})
+        assert response.status_code == 400
+        detail = response.json()["detail"]
+        assert detail["quantity_left"] == 1
+        assert [r["status"] for r in detail["results"]] == ["sold_out", "sold_out"]
+
+    @patch('main.supabase')
+    def test_register_group_event_not_found(self, mock_supabase):
+        """Test that an unknown event is a 404"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [
+            {"user_id": "user1", "status": "event_not_found", "quantity_left": None},
+        ]
+        
+        response = client.post("/events/event1/register/group", json={"user_ids": ["user1"]})
+        assert response.status_code == 404
+
+    def test_register_group_size_limits(self):
+        """Test that empty and oversized groups are rejected before any call"""
+        assert client.post("/events/event1/register/group", json={"user_ids": []}).status_code == 422
+        too_many = [f"user{i}" for i in range(101)]
+        assert client.post("/events/event1/register/group", json={"user_ids": too_many}).status_code == 422
+
 
 # ===== Get User Interested Events Tests =====
 
@@ -621,16 +1451,10 @@ class TestGetUserInterestedEvents:
     @patch('main.supabase')
     def test_get_interested_events_success(self, mock_supabase):
         """Test getting events user is interested in"""
-        # Mock user fetch
-        mock_user_response = MagicMock()
-        mock_user_response.data = [{
-            "registered_events": ["event1", "event2"]
-        }]
-        
-        # Mock events fetch
-        mock_events_response = MagicMock()
-        mock_events_response.data = [
-            {
+        # Mock registrations fetch with embedded events
+        mock_registrations_response = MagicMock()
+        mock_registrations_response.data = [
+            {"events": {
                 "id": "event1",
                 "name": "Event 1",
                 "start_time": "2025-01-01 10:00:00",
@@ -639,8 +1463,8 @@ class TestGetUserInterestedEvents:
                 "created_at": "2025-01-01 00:00:00",
                 "quantity_left": 10,
                 "description": "Event 1 Description"
-            },
-            {
+            }},
+            {"events": {
                 "id": "event2",
                 "name": "Event 2",
                 "start_time": "2025-01-02 10:00:00",
@@ -649,109 +1473,280 @@ class TestGetUserInterestedEvents:
                 "created_at": "2025-01-02 00:00:00",
                 "quantity_left": 5,
                 "description": "Event 2 Description"
-            }
+            }}
         ]
         
         def table_side_effect(table_name):
-            if table_name == "users":
-                return MagicMock(
-                    select=MagicMock(return_value=MagicMock(
-                        eq=MagicMock(return_value=MagicMock(
-                            execute=MagicMock(return_value=mock_user_response)
-                        ))
-                    ))
-                )
-            else:  # events
-                return MagicMock(
-                    select=MagicMock(return_value=MagicMock(
-                        in_=MagicMock(return_value=MagicMock(
-                            execute=MagicMock(return_value=mock_events_response)
-                        ))
+            assert table_name == "registrations"
+            return MagicMock(
+                select=MagicMock(return_value=MagicMock(
+                    eq=MagicMock(return_value=MagicMock(
+                        execute=MagicMock(return_value=mock_registrations_response)
                     ))
-                )
+                ))
+            )
         
         mock_supabase.table.side_effect = table_side_effect
         
         response = client.get("/users/user123/interested-events")
         assert response.status_code == 200
         assert len(response.json()) == 2
+        assert response.json()[1]["quantity_left"] == "5"
 
     @patch('main.supabase')
     def test_get_interested_events_none(self, mock_supabase):
         """Test getting interested events when user has none"""
-        mock_response = MagicMock()
-        mock_response.data = [{
-            "registered_events": []
-        }]
+        mock_registrations_response = MagicMock()
+        mock_registrations_response.data = []
         
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        mock_user_response = MagicMock()
+        mock_user_response.data = [{"id": "user123"}]
+        
+        def table_side_effect(table_name):
+            mock_table = MagicMock()
+            if table_name == "registrations":
+                mock_table.select.return_value.eq.return_value.execute.return_value = mock_registrations_response
+            else:  # users
+                mock_table.select.return_value.eq.return_value.execute.return_value = mock_user_response
+            return mock_table
+        
+        mock_supabase.table.side_effect = table_side_effect
         
         response = client.get("/users/user123/interested-events")
         assert response.status_code == 200
         assert response.json() == []
 
+    @patch('main.supabase')
+    def test_get_interested_events_user_not_found(self, mock_supabase):
+        """Test that an unknown user is a 404, not an empty list"""
+        mock_response = MagicMock()
+        mock_response.data = []
+        
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        
+        response = client.get("/users/nonexistent/interested-events")
+        assert response.status_code == 404
+
 
-# ===== Unregister Event Tests =====
+# ===== User Dashboard Tests =====
 
-class TestUnregisterEvent:
+class TestUserDashboard:
     @patch('main.supabase')
-    def test_unregister_event_success(self, mock_supabase):
-        """Test successful event unregistration"""
-        # Mock user fetch
+    def test_dashboard_success(self, mock_supabase):
+        """Test the aggregated dashboard returns profile, stats and sorted events"""
         mock_user_response = MagicMock()
         mock_user_response.data = [{
-            "id": "user123",
-            "registered_events": ["event1", "event2"]
-        }]
-        
-        # Mock event fetch
-        mock_event_response = MagicMock()
-        mock_event_response.data = [{
-            "id": "event1",
-            "quantity_left": 5
+            "email": "test@bu.edu",
+            "full_name": "Test User",
+            "role": "student",
+            "created_events": 2
         }]
         
-        # Mock updates
-        mock_user_update = MagicMock()
-        mock_user_update.execute.return_value.data = [{"registered_events": ["event2"]}]
+        mock_created_response = MagicMock()
+        mock_created_response.data = [
+            {"id": 2, "name": "Later", "start_time": "2031-01-02T10:00:00+00:00", "creator_id": "user123"},
+            {"id": 1, "name": "Sooner", "start_time": "2031-01-01T10:00:00+00:00", "creator_id": "user123"},
+        ]
         
-        mock_event_update = MagicMock()
-        mock_event_update.execute.return_value.data = [{"quantity_left": 6}]
+        mock_registrations_response = MagicMock()
+        mock_registrations_response.data = [
+            {"events": {"id": 4, "name": "Upcoming", "start_time": "2031-01-01T10:00:00+00:00"}},
+            {"events": {"id": 3, "name": "Past", "start_time": "2020-01-01 10:00:00"}},
+        ]
         
         def table_side_effect(table_name):
-            if table_name == "events":
-                mock_events = MagicMock()
-                mock_events.select.return_value.eq.return_value.execute.return_value = mock_event_response
-                mock_events.update.return_value.eq.return_value.execute.return_value = mock_event_update
-                return mock_events
-            else:  # users
-                mock_users = MagicMock()
-                mock_users.select.return_value.eq.return_value.execute.return_value = mock_user_response
-                mock_users.update.return_value.eq.return_value.execute.return_value = mock_user_update
-                return mock_users
+            mock_table = MagicMock()
+            if table_name == "users":
+                mock_table.select.return_value.eq.return_value.execute.return_value = mock_user_response
+            elif table_name == "events":
+                mock_table.select.return_value.eq.return_value.execute.return_value = mock_created_response
+            else:  # registrations
+                mock_table.select.return_value.eq.return_value.execute.return_value = mock_registrations_response
+            return mock_table
         
         mock_supabase.table.side_effect = table_side_effect
         
+        response = client.get("/users/user123/dashboard")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["user"]["email"] == "test@bu.edu"
+        assert data["user"]["registered_events"] == ["3", "4"]
+        assert [e["name"] for e in data["created_events"]] == ["Sooner", "Later"]
+        assert [e["name"] for e in data["registered_events"]] == ["Past", "Upcoming"]
+        assert data["stats"] == {
+            "created_events": 2,
+            "registered_events": 2,
+            "upcoming_registered_events": 1
+        }
+        assert mock_supabase.table.call_count == 3
+
+    @patch('main.supabase')
+    def test_dashboard_user_not_found(self, mock_supabase):
+        """Test the dashboard 404s for an unknown user"""
+        mock_response = MagicMock()
+        mock_response.data = []
+        
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        
+        response = client.get("/users/nonexistent/dashboard")
+        assert response.status_code == 404
+
+    def test_dashboard_queries_run_concurrently(self):
+        """Test that the three queries overlap instead of running back to back"""
+        latency = 0.1
+        
+        def slow_execute():
+            time.sleep(latency)
+            return MagicMock(data=[{"email": "test@bu.edu"}])
+        
+        mock_supabase = MagicMock()
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.side_effect = slow_execute
+        
+        with patch('main.supabase', mock_supabase):
+            start = time.perf_counter()
+            response = client.get("/users/user123/dashboard")
+            elapsed = time.perf_counter() - start
+        
+        assert response.status_code == 200
+        assert elapsed < 2.5 * latency
+
+
+# ===== Unregister Event Tests =====
+
+class TestUnregisterEvent:
+    @patch('main.supabase')
+    def test_unregister_event_success(self, mock_supabase):
+        """Test successful event unregistration"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "released",
+            "quantity_left": 6,
+            "promoted_user_ids": []
+        }]
+        
         response = client.post("/events/event1/unregister", json={"user_id": "user123"})
         assert response.status_code == 200
         assert "Successfully unregistered" in response.json()["message"]
+        assert response.json()["promoted_user_ids"] == []
+        mock_supabase.rpc.assert_called_once_with("release_and_promote", {
+            "p_event_id": "event1",
+            "p_user_id": "user123"
+        })
+        mock_supabase.table.assert_not_called()
+
+    @patch('main.supabase')
+    def test_unregister_event_promotes_waitlist_head(self, mock_supabase):
+        """Test that a freed seat is reported as handed to the head of the waitlist"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "released",
+            "quantity_left": 0,
+            "promoted_user_ids": ["user456"]
+        }]
+        
+        response = client.post("/events/event1/unregister", json={"user_id": "user123"})
+        assert response.status_code == 200
+        assert response.json()["promoted_user_ids"] == ["user456"]
 
     @patch('main.supabase')
     def test_unregister_event_not_registered(self, mock_supabase):
         """Test unregister fails if user not registered"""
-        mock_response = MagicMock()
-        mock_response.data = [{
-            "id": "user123",
-            "registered_events": []
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "not_registered",
+            "quantity_left": None
         }]
         
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
-        
         response = client.post("/events/event1/unregister", json={"user_id": "user123"})
         assert response.status_code == 400
         assert "not registered" in response.json()["detail"].lower()
 
 
+# ===== Waitlist Tests =====
+
+class TestWaitlist:
+    @patch('main.supabase')
+    def test_join_waitlist_when_full(self, mock_supabase):
+        """Test that a full event queues the user and reports their place"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "waitlisted",
+            "position": 3,
+            "quantity_left": 0
+        }]
+        
+        response = client.post("/events/event1/waitlist", json={"user_id": "user123"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "waitlisted"
+        assert response.json()["position"] == 3
+        mock_supabase.rpc.assert_called_once_with("join_waitlist", {
+            "p_event_id": "event1",
+            "p_user_id": "user123"
+        })
+
+    @patch('main.supabase')
+    def test_join_waitlist_with_free_seat_registers(self, mock_supabase):
+        """Test that joining while seats are free registers straight away"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{
+            "status": "reserved",
+            "position": None,
+            "quantity_left": 4
+        }]
+        
+        response = client.post("/events/event1/waitlist", json={"user_id": "user123"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "reserved"
+        assert response.json()["quantity_left"] == 4
+
+    @patch('main.supabase')
+    def test_join_waitlist_rejections(self, mock_supabase):
+        """Test that join outcomes map to the same errors as /register"""
+        for outcome, status_code in [
+            ("event_not_found", 404),
+            ("user_not_found", 404),
+            ("already_registered", 400),
+        ]:
+            mock_supabase.rpc.return_value.execute.return_value.data = [{
+                "status": outcome,
+                "position": None,
+                "quantity_left": None
+            }]
+            response = client.post("/events/event1/waitlist", json={"user_id": "user123"})
+            assert response.status_code == status_code
+
+    @patch('main.supabase')
+    def test_waitlist_position_is_one_lookup(self, mock_supabase):
+        """Test that the position comes from the user's ticket and the queue head"""
+        mock_query = mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+        mock_query.execute.return_value.data = [{"ticket": 17, "waitlist_queues": {"head_ticket": 15}}]
+        
+        response = client.get("/events/event1/waitlist/user123")
+        assert response.status_code == 200
+        assert response.json()["position"] == 3
+        mock_supabase.table.assert_called_once_with("waitlist")
+        mock_supabase.table.return_value.select.assert_called_once_with("ticket, waitlist_queues(head_ticket)")
+
+    @patch('main.supabase')
+    def test_waitlist_position_not_waiting(self, mock_supabase):
+        """Test the position of a user who is not waiting"""
+        mock_query = mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+        mock_query.execute.return_value.data = []
+        
+        response = client.get("/events/event1/waitlist/user123")
+        assert response.status_code == 404
+
+    @patch('main.supabase')
+    def test_leave_waitlist(self, mock_supabase):
+        """Test leaving the waitlist, and leaving it when not on it"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{"status": "left"}]
+        response = client.delete("/events/event1/waitlist/user123")
+        assert response.status_code == 200
+        mock_supabase.rpc.assert_called_once_with("leave_waitlist", {
+            "p_event_id": "event1",
+            "p_user_id": "user123"
+        })
+        
+        mock_supabase.rpc.return_value.execute.return_value.data = [{"status": "not_waitlisted"}]
+        response = client.delete("/events/event1/waitlist/user123")
+        assert response.status_code == 404
+
+
 # ===== Delete Event Tests =====
 
 class TestDeleteEvent:
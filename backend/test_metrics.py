@@ -0,0 +1,105 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db.asyncdb import execute
+from db.supabaseclient import supabase as real_client
+from main import app
+from services.metrics import (
+    REGISTRY,
+    Histogram,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+    query_labels,
+    supabase_query_duration_seconds,
+    supabase_query_errors_total,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative_and_inclusive(self):
+        """Test that a sample equal to a bound lands in that bound's bucket"""
+        h = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            h.observe(value, "/x")
+
+        lines = [f"{name}{labels} {value}" for name, labels, value in h.samples()]
+        assert lines == [
+            'latency_seconds_bucket{route="/x",le="0.1"} 2',
+            'latency_seconds_bucket{route="/x",le="1.0"} 3',
+            'latency_seconds_bucket{route="/x",le="+Inf"} 4',
+            'latency_seconds_sum{route="/x"} 3.65',
+            'latency_seconds_count{route="/x"} 4',
+        ]
+
+
+class TestQueryLabels:
+    @pytest.mark.parametrize("query, labels", [
+        (lambda: real_client.table("events").select("*").eq("id", 1), ("events", "select")),
+        (lambda: real_client.table("food_items").insert({"name": "Pizza"}), ("food_items", "insert")),
+        (lambda: real_client.table("users").update({"x": 1}).eq("id", 1), ("users", "update")),
+        (lambda: real_client.table("events").delete().eq("id", 1), ("events", "delete")),
+        (lambda: real_client.table("users").upsert({"id": "u1"}), ("users", "upsert")),
+        (lambda: real_client.rpc("reserve_seat", {"p_event_id": 1}), ("rpc/reserve_seat", "rpc")),
+    ])
+    def test_table_and_operation(self, query, labels):
+        assert query_labels(query()) == labels
+
+    def test_non_postgrest_query(self):
+        assert query_labels(MagicMock()) == ("unknown", "unknown")
+
+
+class TestExecuteTiming:
+    def test_execute_records_duration_and_errors(self):
+        """Test that every round trip is timed and failures are counted"""
+        ok = real_client.table("events").select("*")
+        ok.execute = MagicMock(return_value="rows")
+        failing = real_client.table("users").select("*")
+        failing.execute = MagicMock(side_effect=RuntimeError("down"))
+
+        assert asyncio.run(execute(ok)) == "rows"
+        with pytest.raises(RuntimeError):
+            asyncio.run(execute(failing))
+
+        assert supabase_query_duration_seconds.count("events", "select") == 1
+        assert supabase_query_duration_seconds.count("users", "select") == 1
+        assert supabase_query_errors_total.value("users", "select") == 1
+        assert supabase_query_errors_total.value("events", "select") == 0
+
+
+class TestMetricsMiddleware:
+    @patch('main.supabase')
+    def test_requests_are_labelled_by_route_template(self, mock_supabase):
+        """Test that paths collapse to their route and status codes are counted"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+
+        client.get("/users/alice")
+        client.get("/users/bob")
+        client.get("/no/such/path")
+
+        assert http_requests_total.value("GET", "/users/{user_id}", "404") == 2
+        assert http_request_duration_seconds.count("GET", "/users/{user_id}") == 2
+        assert http_requests_total.value("GET", "<unmatched>", "404") == 1
+        assert http_requests_in_flight.value("GET") == 0
+
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        client.get("/")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert 'http_requests_total{method="GET",route="/",status="200"} 1' in response.text
+        assert "# TYPE supabase_query_duration_seconds histogram" in response.text
@@ -0,0 +1,216 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import httpx
+from fastapi.testclient import TestClient
+
+from main import app
+from services.notifications import MailgunSender, OutboxWorker
+
+client = TestClient(app)
+
+
+class FakeQuery:
+    def __init__(self, run):
+        self._run = run
+        self._filter = None
+
+    def select(self, columns):
+        return self
+
+    def update(self, values):
+        self._values = values
+        return self
+
+    def in_(self, column, values):
+        self._filter = (column, list(values))
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self._run(self))
+
+
+class FakeOutboxClient:
+    """In-memory users, events and notification_outbox behind the supabase-py surface."""
+
+    def __init__(self, outbox, users, events):
+        self.outbox = {row["id"]: dict(row, status="pending", attempts=0) for row in outbox}
+        self.users = {u["id"]: u for u in users}
+        self.events = {e["id"]: e for e in events}
+        self.retries = []
+        self.calls = []
+
+    def table(self, name):
+        def run(query):
+            self.calls.append(name)
+            column, values = query._filter
+            if name == "notification_outbox":
+                for row_id in values:
+                    self.outbox[row_id].update(query._values)
+                return [self.outbox[i] for i in values]
+            rows = self.users if name == "users" else self.events
+            return [rows[v] for v in values if v in rows]
+        return FakeQuery(run)
+
+    def rpc(self, fn, params):
+        def run(query):
+            self.calls.append(fn)
+            if fn == "claim_outbox":
+                due = [r for r in self.outbox.values() if r["status"] == "pending" and not r.get("leased")]
+                for r in due[:params["p_limit"]]:
+                    r["attempts"] += 1
+                    r["leased"] = True
+                return [dict(r) for r in due[:params["p_limit"]]]
+            assert fn == "retry_outbox"
+            self.retries.append(params)
+            for row_id in params["p_ids"]:
+                self.outbox[row_id]["leased"] = False
+            return []
+        return FakeQuery(run)
+
+
+class MailgunStub:
+    """Local HTTP stand-in for the Mailgun messages API."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.messages = []
+
+    def handler(self, request):
+        form = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+        if form["to"] in self.failing:
+            return httpx.Response(500, text="upstream unavailable")
+        self.messages.append((request.url.path, form))
+        return httpx.Response(200, json={"id": f"<{len(self.messages)}@mailgun>", "message": "Queued"})
+
+    def sender(self):
+        return MailgunSender("key-test", "sandbox.example.org", transport=httpx.MockTransport(self.handler))
+
+
+USERS = [
+    {"id": "u1", "email": "ada@bu.edu", "full_name": "Ada"},
+    {"id": "u2", "email": "bob@bu.edu", "full_name": "Bob"},
+]
+EVENTS = [{"id": "e1", "name": "Pizza Night", "start_time": "2030-01-01T18:00:00+00:00", "location_name": "GSU"}]
+
+
+class TestOutboxWorker:
+    def test_batch_is_sent_and_marked_in_one_update(self):
+        """Test that a claimed batch goes out and is settled with one write"""
+        fake = FakeOutboxClient(
+            outbox=[
+                {"id": 1, "kind": "registered", "user_id": "u1", "event_id": "e1"},
+                {"id": 2, "kind": "event_updated", "user_id": "u2", "event_id": "e1"},
+            ],
+            users=USERS,
+            events=EVENTS,
+        )
+        mailgun = MailgunStub()
+        worker = OutboxWorker(fake, mailgun.sender())
+
+        assert asyncio.run(worker.run_once()) == 2
+
+        assert [form["to"] for _, form in mailgun.messages] == ["ada@bu.edu", "bob@bu.edu"]
+        path, form = mailgun.messages[0]
+        assert path == "/v3/sandbox.example.org/messages"
+        assert form["subject"] == "Registered: Pizza Night"
+        assert form["template"] == "spark-bytes notification"
+        variables = json.loads(form["h:X-Mailgun-Variables"])
+        assert variables["recipient_name"] == "Ada"
+        assert variables["action_url"].endswith("/events/e1")
+        assert {r["status"] for r in fake.outbox.values()} == {"sent"}
+        # claim, two lookups, one update
+        assert sorted(fake.calls) == sorted(["claim_outbox", "users", "events", "notification_outbox"])
+
+    def test_failures_are_rescheduled_and_missing_recipients_skipped(self):
+        """Test that failed sends go to retry_outbox and orphaned rows are skipped"""
+        fake = FakeOutboxClient(
+            outbox=[
+                {"id": 1, "kind": "registered", "user_id": "u1", "event_id": "e1"},
+                {"id": 2, "kind": "registered", "user_id": "u2", "event_id": "e1"},
+                {"id": 3, "kind": "registered", "user_id": "gone", "event_id": "e1"},
+            ],
+            users=USERS,
+            events=EVENTS,
+        )
+        mailgun = MailgunStub(failing={"bob@bu.edu"})
+        worker = OutboxWorker(fake, mailgun.sender(), max_attempts=3, backoff_seconds=10)
+
+        asyncio.run(worker.run_once())
+
+        assert fake.outbox[1]["status"] == "sent"
+        assert fake.outbox[2]["status"] == "pending"
+        assert fake.outbox[3]["status"] == "skipped"
+        assert len(fake.retries) == 1
+        retry = fake.retries[0]
+        assert retry["p_ids"] == [2]
+        assert "500" in retry["p_errors"][0]
+        assert retry["p_max_attempts"] == 3
+        assert retry["p_backoff_seconds"] == 10
+
+        # The next batch retries only the failed row
+        mailgun.failing.clear()
+        assert asyncio.run(worker.run_once()) == 1
+        assert fake.outbox[2]["status"] == "sent"
+        assert fake.outbox[2]["attempts"] == 2
+
+    def test_empty_outbox_is_one_query(self):
+        """Test that an idle poll costs a single claim call"""
+        fake = FakeOutboxClient(outbox=[], users=USERS, events=EVENTS)
+        worker = OutboxWorker(fake, MailgunStub().sender())
+
+        assert asyncio.run(worker.run_once()) == 0
+        assert fake.calls == ["claim_outbox"]
+
+    def test_wake_sends_without_waiting_for_the_poll(self):
+        """Test that wake() cuts the poll sleep short"""
+        fake = FakeOutboxClient(outbox=[], users=USERS, events=EVENTS)
+        mailgun = MailgunStub()
+        worker = OutboxWorker(fake, mailgun.sender(), poll_interval=30)
+
+        async def scenario():
+            task = asyncio.create_task(worker.run_forever())
+            await asyncio.sleep(0.05)
+            fake.outbox[1] = {"id": 1, "kind": "registered", "user_id": "u1", "event_id": "e1",
+                              "status": "pending", "attempts": 0}
+            worker.wake()
+            for _ in range(100):
+                if mailgun.messages:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(scenario())
+        assert len(mailgun.messages) == 1
+
+
+class TestHandlersWakeWorker:
+    @patch('main.outbox_worker')
+    @patch('main.supabase')
+    def test_register_wakes_worker(self, mock_supabase, mock_worker):
+        """Test that a registration nudges the worker instead of sending mail itself"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{"status": "reserved", "quantity_left": 3}]
+
+        response = client.post("/events/event1/register", json={"user_id": "user123"})
+        assert response.status_code == 200
+        mock_worker.wake.assert_called_once()
+
+    @patch('main.outbox_worker')
+    @patch('main.supabase')
+    def test_rejected_register_does_not_wake_worker(self, mock_supabase, mock_worker):
+        """Test that failed writes queue nothing"""
+        mock_supabase.rpc.return_value.execute.return_value.data = [{"status": "sold_out", "quantity_left": 0}]
+
+        response = client.post("/events/event1/register", json={"user_id": "user123"})
+        assert response.status_code == 400
+        mock_worker.wake.assert_not_called()
+
+    def test_worker_needs_mailgun_settings(self):
+        """Test that the worker only has a sender when Mailgun is configured"""
+        with patch.dict('os.environ', {"API_KEY_MAILGUN": "", "SANDBOX_DOMAIN": ""}):
+            assert MailgunSender.from_env() is None
+        with patch.dict('os.environ', {"API_KEY_MAILGUN": "key", "SANDBOX_DOMAIN": "mg.example.org"}):
+            assert MailgunSender.from_env().url == "https://api.mailgun.net/v3/mg.example.org/messages"
@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.reminders import MAX_SLEEP_SECONDS, ReminderHeap, ReminderScheduler
+
+T0 = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    def __init__(self, now=T0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def fake_client(rows):
+    """Supabase mock whose events load returns ``rows`` and records enqueue calls."""
+    client = MagicMock()
+    load = client.table.return_value.select.return_value.gt.return_value.lte.return_value.is_.return_value
+    load.order.return_value.order.return_value.limit.return_value.execute.return_value = MagicMock(data=rows)
+    client.rpc.return_value.execute.return_value = MagicMock(data=[])
+    return client
+
+
+def enqueued_ids(client):
+    return [c.args[1]["p_event_ids"] for c in client.rpc.call_args_list]
+
+
+class TestReminderHeap:
+    def test_pops_in_due_order(self):
+        heap = ReminderHeap()
+        heap.schedule("b", T0 + timedelta(minutes=2))
+        heap.schedule("a", T0 + timedelta(minutes=1))
+        heap.schedule("c", T0 + timedelta(minutes=3))
+        assert heap.next_due() == T0 + timedelta(minutes=1)
+        assert heap.pop_due(T0 + timedelta(minutes=2)) == ["a", "b"]
+        assert len(heap) == 1
+
+    def test_reschedule_and_cancel_are_lazy(self):
+        heap = ReminderHeap()
+        heap.schedule("a", T0)
+        heap.schedule("b", T0 + timedelta(minutes=1))
+        heap.schedule("a", T0 + timedelta(minutes=5))
+        heap.cancel("b")
+        assert heap.next_due() == T0 + timedelta(minutes=5)
+        assert heap.pop_due(T0 + timedelta(minutes=4)) == []
+        assert heap.pop_due(T0 + timedelta(minutes=5)) == ["a"]
+        assert len(heap) == 0
+
+    def test_pop_limit(self):
+        heap = ReminderHeap()
+        for i in range(10):
+            heap.schedule(str(i), T0 + timedelta(seconds=i))
+        assert heap.pop_due(T0 + timedelta(hours=1), limit=4) == ["0", "1", "2", "3"]
+        assert len(heap) == 6
+
+    def test_compaction_bounds_stale_entries(self):
+        heap = ReminderHeap()
+        for i in range(1000):
+            heap.schedule("a", T0 + timedelta(seconds=i))
+        assert len(heap) == 1
+        assert len(heap._heap) <= 2 * len(heap) + 65
+
+
+class TestReminderScheduler:
+    def test_first_load_catches_up_on_missed_reminders(self):
+        """Test that reminders which fell due while the process was down fire at startup"""
+        rows = [
+            {"id": 1, "start_time": (T0 + timedelta(minutes=20)).isoformat()},  # due 40 min ago
+            {"id": 2, "start_time": (T0 + timedelta(hours=5)).isoformat()},
+        ]
+        client = fake_client(rows)
+        scheduler = ReminderScheduler(client, lead=timedelta(hours=1), clock=FakeClock())
+
+        assert asyncio.run(scheduler.run_once()) == 1
+        assert enqueued_ids(client) == [["1"]]
+        assert client.rpc.call_args.args == ("enqueue_event_reminders", {"p_event_ids": ["1"], "p_lead_seconds": 3600})
+        assert "2" in scheduler.heap
+
+        load = client.table.return_value.select.return_value
+        assert load.gt.call_args.args == ("start_time", T0.isoformat())
+        assert load.gt.return_value.lte.call_args.args == ("start_time", (T0 + timedelta(hours=25)).isoformat())
+        load.gt.return_value.lte.return_value.is_.assert_called_once_with("reminder_sent_at", "null")
+
+    def test_fires_when_due_and_notifies_outbox(self):
+        clock = FakeClock()
+        client = fake_client([{"id": 7, "start_time": (T0 + timedelta(hours=3)).isoformat()}])
+        woken = []
+        scheduler = ReminderScheduler(client, lead=timedelta(hours=1), clock=clock, on_enqueued=lambda: woken.append(1))
+
+        assert asyncio.run(scheduler.run_once()) == 0
+        # Due in two hours, but the sleep is capped
+        assert scheduler.seconds_until_next() == MAX_SLEEP_SECONDS
+        clock.now = T0 + timedelta(hours=2) - timedelta(seconds=30)
+        assert scheduler.seconds_until_next() == pytest.approx(30)
+
+        clock.now = T0 + timedelta(hours=2)
+        assert asyncio.run(scheduler.fire_due(clock.now)) == 1
+        assert enqueued_ids(client) == [["7"]]
+        assert woken == [1]
+
+    def test_later_loads_only_cover_the_new_slice(self):
+        clock = FakeClock()
+        client = fake_client([])
+        scheduler = ReminderScheduler(client, lead=timedelta(hours=1), horizon=timedelta(hours=24), clock=clock)
+        asyncio.run(scheduler.load(clock.now))
+
+        clock.now = T0 + timedelta(hours=13)
+        asyncio.run(scheduler.run_once())
+        load = client.table.return_value.select.return_value
+        # Starts after the old horizon (T0 + 24h) plus the lead
+        assert load.gt.call_args.args == ("start_time", (T0 + timedelta(hours=25)).isoformat())
+        assert scheduler.loaded_until == T0 + timedelta(hours=37)
+
+    def test_event_changes_update_the_schedule(self):
+        clock = FakeClock()
+        scheduler = ReminderScheduler(fake_client([]), lead=timedelta(hours=1), clock=clock)
+        asyncio.run(scheduler.load(clock.now))
+
+        scheduler.event_changed({"id": 1, "start_time": (T0 + timedelta(hours=4)).isoformat()})
+        assert scheduler.heap.next_due() == T0 + timedelta(hours=3)
+
+        # Moved later: rescheduled
+        scheduler.event_changed({"id": 1, "start_time": (T0 + timedelta(hours=6)).isoformat()})
+        assert scheduler.heap.next_due() == T0 + timedelta(hours=5)
+        assert len(scheduler.heap) == 1
+
+        # Moved past the horizon: dropped until a later load reaches it
+        scheduler.event_changed({"id": 1, "start_time": (T0 + timedelta(days=10)).isoformat()})
+        assert len(scheduler.heap) == 0
+
+        scheduler.event_changed({"id": 2, "start_time": (T0 + timedelta(hours=2)).isoformat()})
+        scheduler.event_removed(2)
+        assert scheduler.heap.next_due() is None
+
+    def test_failed_enqueue_keeps_reminders(self):
+        clock = FakeClock()
+        client = fake_client([{"id": 3, "start_time": (T0 + timedelta(minutes=30)).isoformat()}])
+        client.rpc.return_value.execute.side_effect = RuntimeError("database unavailable")
+        scheduler = ReminderScheduler(client, lead=timedelta(hours=1), clock=clock)
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(scheduler.run_once())
+        assert "3" in scheduler.heap
+
+        client.rpc.return_value.execute.side_effect = None
+        assert asyncio.run(scheduler.fire_due(clock.now)) == 1
+
+    def test_due_reminders_go_out_in_batches(self):
+        clock = FakeClock()
+        rows = [{"id": i, "start_time": (T0 + timedelta(minutes=10)).isoformat()} for i in range(5)]
+        client = fake_client(rows)
+        scheduler = ReminderScheduler(client, lead=timedelta(hours=1), batch_size=2, clock=clock)
+
+        assert asyncio.run(scheduler.run_once()) == 5
+        assert [len(ids) for ids in enqueued_ids(client)] == [2, 2, 1]
@@ -0,0 +1,119 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from services.search import SearchIndex
+
+
+def event(event_id, name, description="", location="GSU", start="2030-01-01T12:00:00+00:00", food=()):
+    row = {
+        "id": event_id, "name": name, "description": description, "location_name": location,
+        "start_time": start, "end_time": start, "quantity_left": 10,
+    }
+    food_items = [{"id": i, "event_id": event_id, "name": n, "category": c} for i, (n, c) in enumerate(food)]
+    return row, food_items
+
+
+def loaded_index(*events):
+    """An index loaded from a client whose events scan returns ``events``."""
+    client = MagicMock()
+    client.table.return_value.select.return_value.order.return_value.order.return_value.limit.return_value \
+        .execute.return_value = MagicMock(data=[dict(row, food_items=food) for row, food in events])
+    index = SearchIndex()
+    asyncio.run(index.ensure_loaded(client))
+    return index
+
+
+def ids(results):
+    return [r["id"] for r in results]
+
+
+class TestSearchIndex:
+    def test_every_term_must_match_and_name_hits_rank_first(self):
+        index = loaded_index(
+            event(1, "Pizza night", "Vegan options", food=[("Margherita", "pizza")]),
+            event(2, "Study break", "Leftover pizza and vegan cookies"),
+            event(3, "Vegan lunch", food=[("Salad", "vegan")]),
+        )
+        assert ids(index.search("pizza", 10)) == [1, 2]
+        assert ids(index.search("vegan pizza", 10)) == [1, 2]
+        assert ids(index.search("vegan", 10)) == [3, 1, 2]
+        assert index.search("sushi", 10) == []
+        assert index.search("  ", 10) == []
+
+    def test_prefixes_match_below_exact_hits(self):
+        index = loaded_index(
+            event(1, "Veg fest"),
+            event(2, "Vegetarian supper"),
+            event(3, "Bagels", location="Photonics Center"),
+        )
+        assert ids(index.search("veg", 10)) == [1, 2]
+        assert ids(index.search("phot", 10)) == [3]
+        # Single characters only match whole tokens
+        assert index.search("v", 10) == []
+
+    def test_ties_follow_start_time_and_limit_applies(self):
+        index = loaded_index(*(
+            event(i, "Donuts", start=f"2030-01-0{9 - i}T12:00:00+00:00") for i in range(1, 6)
+        ))
+        results = index.search("donuts", 2)
+        assert ids(results) == [5, 4]
+        assert results[0]["score"] == results[1]["score"]
+        assert "quantity_left" not in results[0]
+
+    def test_writes_update_postings_incrementally(self):
+        index = loaded_index(event(1, "Pizza night", food=[("Pizza", None)]))
+
+        row, food = event(2, "Taco Tuesday", food=[("Burrito", "mexican")])
+        index.event_changed(row, food)
+        assert ids(index.search("burr", 10)) == [2]
+
+        # An edit without food rows keeps the indexed ones
+        index.event_changed(dict(row, name="Taco Wednesday"))
+        assert ids(index.search("wednesday mexican", 10)) == [2]
+        assert index.search("tuesday", 10) == []
+
+        index.event_removed(1)
+        assert index.search("pizza", 10) == []
+        assert index.stats()["events"] == 1
+        assert "pizza" not in index._vocabulary
+
+    def test_writes_before_the_first_load_are_left_to_it(self):
+        index = SearchIndex()
+        row, food = event(1, "Pizza night")
+        index.event_changed(row, food)
+        assert len(index) == 0 and not index.loaded
+
+    def test_loads_on_successive_event_loops(self):
+        """Test that the shared index can be (re)loaded from a new loop after a contended load"""
+        row, food = event(1, "Pizza night")
+        index = loaded_index((row, food))
+        client = MagicMock()
+        client.table.return_value.select.return_value.order.return_value.order.return_value.limit.return_value \
+            .execute.return_value = MagicMock(data=[dict(row, food_items=food)])
+
+        async def contend():
+            index.clear()
+            await asyncio.gather(*(index.ensure_loaded(client) for _ in range(3)))
+
+        asyncio.run(contend())
+        asyncio.run(contend())
+        assert asyncio.run(index.reload(client)) == 1
+
+    def test_write_during_load_wins_over_the_loaded_page(self):
+        index = SearchIndex()
+        stale, food = event(1, "Pizza night", food=[("Pizza", None)])
+        client = MagicMock()
+        page = client.table.return_value.select.return_value.order.return_value.order.return_value.limit.return_value
+
+        def execute():
+            # A handler renames the event while the page is in flight
+            index.event_changed(dict(stale, name="Burger night"))
+            index.event_removed(2)
+            return MagicMock(data=[dict(stale, food_items=food), dict(event(2, "Pizza lunch")[0], food_items=[])])
+
+        page.execute.side_effect = execute
+        asyncio.run(index.ensure_loaded(client))
+
+        assert ids(index.search("burger", 10)) == [1]
+        # The food rows the edit did not carry come from the load
+        assert ids(index.search("pizza", 10)) == [1]
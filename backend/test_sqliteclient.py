@@ -0,0 +1,277 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+from db.sqliteclient import SQLiteClient, to_timestamp
+from main import app
+
+client = TestClient(app)
+
+NOW = datetime.now(timezone.utc)
+
+
+def insert(db, table, rows):
+    return db.table(table).insert(rows).execute().data
+
+
+@pytest.fixture
+def db(tmp_path):
+    storage = SQLiteClient(tmp_path / "spark_bytes.db")
+    insert(storage, "users", [
+        {"id": f"u{i}", "email": f"u{i}@bu.edu", "full_name": f"User {i}", "created_events": 0}
+        for i in range(5)
+    ])
+    events = insert(storage, "events", [
+        {"name": f"Event {n}", "description": "Snacks", "location_name": "GSU" if n % 2 else "CAS",
+         "start_time": (NOW + timedelta(hours=n)).isoformat(), "end_time": (NOW + timedelta(hours=n + 1)).isoformat(),
+         "quantity_left": 1, "creator_id": "u0", "creator_name": "User 0"}
+        for n in range(1, 8)
+    ])
+    insert(storage, "food_items", [
+        {"event_id": e["id"], "name": "Falafel", "allergy_info": "sesame", "is_kosher": False, "is_halal": e["id"] % 3 == 0}
+        for e in events
+    ])
+    storage.table("notification_outbox").delete().execute()
+    with patch("main.supabase", storage):
+        yield storage
+    storage.close()
+
+
+def outbox(db):
+    rows = db.table("notification_outbox").select("kind, user_id, event_id").order("id").execute().data
+    return [(r["kind"], r["user_id"], r["event_id"]) for r in rows]
+
+
+class TestSchema:
+    def test_wal_mode_and_indexes(self, db):
+        conn = db._connection()
+        assert conn.execute("pragma journal_mode").fetchone()[0] == "wal"
+
+        def plan(sql, *params):
+            return " ".join(r["detail"] for r in conn.execute("explain query plan " + sql, params))
+
+        assert "events_start_time_idx" in plan("select * from events where start_time > ? order by start_time, id", "x")
+        assert "events_creator_id_idx" in plan("select * from events where creator_id = ?", "u0")
+        assert "food_items_event_id_idx" in plan("select * from food_items where event_id in (?, ?)", 1, 2)
+
+    def test_timestamps_compare_as_times(self, db):
+        """Test that offsets and 'Z' are normalized so text comparison orders by time"""
+        assert to_timestamp("2025-01-31T13:00:00-05:00") == to_timestamp("2025-01-31T18:00:00Z")
+        rows = db.table("events").select("name").gt("start_time", (NOW + timedelta(hours=6, minutes=30)).isoformat()).execute().data
+        assert [r["name"] for r in rows] == ["Event 7"]
+
+    def test_constraint_violations_raise_postgres_codes(self, db):
+        with pytest.raises(APIError) as duplicate:
+            insert(db, "users", {"id": "u1"})
+        assert duplicate.value.code == "23505"
+
+        with pytest.raises(APIError) as missing:
+            insert(db, "registrations", {"user_id": "u1", "event_id": 999})
+        assert missing.value.code == "23503"
+        assert "event_id" in missing.value.details
+
+    def test_upsert_merges_only_the_given_columns(self, db):
+        db.table("users").update({"role": "admin"}).eq("id", "u1").execute()
+        saved = db.table("users").upsert({"id": "u1", "full_name": "Renamed"}, on_conflict="id").execute().data
+        assert (saved[0]["full_name"], saved[0]["role"], saved[0]["email"]) == ("Renamed", "admin", "u1@bu.edu")
+
+        assert db.table("users").upsert({"id": "u1", "full_name": "Again"}, ignore_duplicates=True).execute().data == []
+        created = db.table("users").upsert({"id": "u9", "email": "u9@bu.edu"}).execute().data
+        assert created[0]["role"] == "student"
+
+
+class TestSQLiteThroughTheApi:
+    def test_keyset_pages_filters_and_embedded_food(self, db):
+        seen = []
+        url = "/events?limit=2&location=gsu"
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            seen.extend(e["name"] for e in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/events?limit=2&location=gsu&cursor={cursor}" if cursor else None
+        assert seen == ["Event 1", "Event 3", "Event 5", "Event 7"]
+
+        halal = client.get("/events?is_halal=true").json()
+        assert [e["name"] for e in halal] == ["Event 3", "Event 6"]
+        assert halal[0]["food_items"][0]["is_halal"] is True
+
+    def test_dietary_filters_fill_each_page_in_the_database(self, db, round_trips):
+        """Test that dietary flags are joined in SQL, so a sparse match still fills the page in one query"""
+        response = client.get("/events?limit=1&is_halal=true")
+        assert [e["name"] for e in response.json()] == ["Event 3"]
+        assert "halal_food" not in response.json()[0]
+        assert round_trips[-1].total == 1
+
+        cursor = response.headers["X-Next-Cursor"]
+        assert [e["name"] for e in client.get(f"/events?limit=1&is_halal=true&cursor={cursor}").json()] == ["Event 6"]
+
+        # False keeps the events without any such item, including those without food
+        db.table("food_items").update({"is_kosher": True}).eq("event_id", 2).execute()
+        db.table("food_items").delete().eq("event_id", 5).execute()
+        not_halal = client.get("/events?is_halal=false&is_kosher=false&limit=10").json()
+        assert [e["name"] for e in not_halal] == ["Event 1", "Event 4", "Event 5", "Event 7"]
+        assert not_halal[2]["food_items"] == []
+
+    def test_waitlist_promotion_queues_the_right_notifications(self, db):
+        assert client.post("/events/1/register", json={"user_id": "u1"}).status_code == 200
+        assert client.post("/events/1/waitlist", json={"user_id": "u2"}).json()["position"] == 1
+        assert client.get("/events/1/waitlist/u2").json() == {"position": 1}
+
+        released = client.post("/events/1/unregister", json={"user_id": "u1"}).json()
+        assert released["promoted_user_ids"] == ["u2"]
+        assert client.get("/events/1?user_id=u2").json()["is_registered"] is True
+        assert outbox(db) == [("registered", "u1", 1), ("unregistered", "u1", 1), ("waitlist_promoted", "u2", 1)]
+
+    def test_registration_errors(self, db):
+        assert client.post("/events/2/registrations/u1").status_code == 200
+        assert client.post("/events/2/registrations/u1").status_code == 400
+        assert client.post("/events/2/registrations/nobody").json()["detail"] == "User not found"
+        assert client.post("/events/999/registrations/u1").json()["detail"] == "Event not found"
+
+    def test_delete_cascades_without_unregister_notices(self, db):
+        client.post("/events/3/register", json={"user_id": "u4"})
+        assert client.delete("/events/3?user_id=u0").status_code == 200
+        assert db.table("food_items").select("id").eq("event_id", 3).execute().data == []
+        assert [kind for kind, _, _ in outbox(db)] == ["registered"]
+
+    def test_moving_an_event_notifies_registrants_and_resets_its_reminder(self, db):
+        client.post("/events/4/register", json={"user_id": "u2"})
+        db.table("events").update({"reminder_sent_at": NOW.isoformat()}).eq("id", 4).execute()
+
+        start = NOW + timedelta(days=3)
+        response = client.put("/events/4?user_id=u0", json={
+            "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+        })
+        assert response.status_code == 200
+        assert "reminder_sent_at" not in response.json()["event"]
+        assert "reminder_sent_at" not in client.get("/events/4").json()
+        assert ("event_updated", "u2", 4) in outbox(db)
+        assert db.table("events").select("reminder_sent_at").eq("id", 4).execute().data == [{"reminder_sent_at": None}]
+
+    def test_writes_do_not_trust_the_cached_user_row(self, db):
+        """Test that the created_events count and the admin check read the database, not the user cache"""
+        db.table("users").update({"role": "admin"}).eq("id", "u1").execute()
+        assert client.get("/users/u1").status_code == 200  # now cached
+
+        # Another worker counts an event and demotes the admin
+        db.table("users").update({"created_events": 5, "role": "student"}).eq("id", "u1").execute()
+
+        start = NOW + timedelta(days=2)
+        response = client.post("/events", json={
+            "name": "Bagels", "description": "Morning", "location_name": "CDS",
+            "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+            "capacity": 10, "creator_id": "u1", "creator_name": "User 1",
+        })
+        assert response.status_code == 200
+        assert response.json()["event"]["quantity_left"] == 10
+        assert "reminder_sent_at" not in response.json()["event"]
+        assert db.table("users").select("created_events").eq("id", "u1").execute().data == [{"created_events": 6}]
+        assert client.delete("/events/2?user_id=u1").status_code == 403
+
+    def test_event_detail_is_cached_once_for_every_viewer(self, db, round_trips):
+        """Test that viewers share one cached event row and get their own is_registered"""
+        client.post("/events/1/register", json={"user_id": "u1"})
+
+        assert client.get("/events/1?user_id=u1").json()["is_registered"] is True
+        assert client.get("/events/1?user_id=u2").json()["is_registered"] is False
+        assert "is_registered" not in client.get("/events/1").json()
+        # Only the first view read the event; the second only needed u2's registrations
+        assert [[table for table, *_ in trace.trips] for trace in round_trips[-3:]] == [["events"], ["users"], []]
+
+        client.post("/events/1/unregister", json={"user_id": "u1"})
+        assert client.get("/events/1?user_id=u1").json()["is_registered"] is False
+
+    @pytest.mark.parametrize("url", ["/events/1", "/events?limit=1"])
+    def test_a_read_overlapping_a_write_is_not_cached(self, db, url):
+        """Test that a read made before a registration commits is not cached after it"""
+        read, release = threading.Event(), threading.Event()
+        transaction = db._transaction
+
+        def slow_first_read(run, write, table=None, payload=None):
+            result = transaction(run, write, table=table, payload=payload)
+            if table == "events" and not write and not read.is_set():
+                read.set()
+                release.wait(5)
+            return result
+
+        def seats(response):
+            body = response.json()
+            return (body[0] if isinstance(body, list) else body)["quantity_left"]
+
+        async def interleave():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+                stale = asyncio.create_task(async_client.get(url))
+                await asyncio.to_thread(read.wait, 5)
+                registered = await async_client.post("/events/1/register", json={"user_id": "u1"})
+                release.set()
+                return await stale, registered, await async_client.get(url)
+
+        with patch.object(db, "_transaction", slow_first_read):
+            stale, registered, fresh = asyncio.run(interleave())
+        assert registered.status_code == 200
+        assert seats(stale) == "1"
+        assert seats(fresh) == "0"
+
+
+class TestSQLiteRpcs:
+    def test_concurrent_reservations_never_oversell(self, db):
+        capacity, singles, groups = 120, 300, 50
+        insert(db, "users", [{"id": f"c{i}"} for i in range(singles)]
+               + [{"id": f"g{t}-{m}"} for t in range(groups) for m in range(4)])
+        db.table("events").update({"quantity_left": capacity}).eq("id", 5).execute()
+        seats_left, done = [], threading.Event()
+
+        def sample():
+            while not done.is_set():
+                seats_left.append(db.table("events").select("quantity_left").eq("id", 5).execute().data[0]["quantity_left"])
+
+        def reserve(i):
+            return [db.rpc("reserve_seat", {"p_event_id": 5, "p_user_id": f"c{i}"}).execute().data[0]["status"]]
+
+        def reserve_group(t):
+            rows = db.rpc("reserve_seats", {"p_event_id": 5, "p_user_ids": [f"g{t}-{m}" for m in range(4)]}).execute().data
+            return [r["status"] for r in rows]
+
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            futures = [pool.submit(reserve, i) for i in range(singles)]
+            futures += [pool.submit(reserve_group, t) for t in range(groups)]
+            results = [status for f in futures for status in f.result()]
+        done.set()
+        sampler.join()
+
+        # Singles outnumber the seats, so they always use up the last ones
+        assert results.count("reserved") == capacity
+        assert len(db.table("registrations").select("user_id").eq("event_id", 5).execute().data) == capacity
+        assert db.table("events").select("quantity_left").eq("id", 5).execute().data == [{"quantity_left": 0}]
+        assert seats_left and min(seats_left) >= 0
+
+    def test_outbox_claim_and_retry(self, db):
+        db.rpc("reserve_seat", {"p_event_id": 2, "p_user_id": "u1"}).execute()
+        claimed = db.rpc("claim_outbox", {"p_limit": 10, "p_lease_seconds": 60}).execute().data
+        assert [(r["kind"], r["attempts"]) for r in claimed] == [("registered", 1)]
+        assert db.rpc("claim_outbox", {"p_limit": 10}).execute().data == []
+
+        db.rpc("retry_outbox", {
+            "p_ids": [claimed[0]["id"]], "p_errors": ["bounced"], "p_max_attempts": 1, "p_backoff_seconds": 30,
+        }).execute()
+        row = db.table("notification_outbox").select("status, last_error").eq("id", claimed[0]["id"]).execute().data
+        assert row == [{"status": "failed", "last_error": "bounced"}]
+
+    def test_reminders_are_enqueued_once(self, db):
+        db.rpc("reserve_seat", {"p_event_id": 1, "p_user_id": "u3"}).execute()
+        params = {"p_event_ids": ["1", "7"], "p_lead_seconds": 3600}
+
+        assert db.rpc("enqueue_event_reminders", params).execute().data == [{"event_id": "1"}]
+        assert db.rpc("enqueue_event_reminders", params).execute().data == []
+        assert outbox(db)[-1] == ("reminder", "u3", 1)
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from db.asyncdb import execute
+from main import app
+from services.tracing import N_PLUS_ONE_THRESHOLD, RoundTripBudgetExceeded, TracingMiddleware, round_trip_budget
+
+client = TestClient(app)
+
+
+def toy_app():
+    """A two-route app whose handlers run ``n`` sequential or concurrent queries."""
+    toy = FastAPI()
+    toy.add_middleware(TracingMiddleware)
+
+    @toy.get("/sequential/{n}")
+    @round_trip_budget(2)
+    async def sequential(n: int):
+        for _ in range(n):
+            await execute(MagicMock())
+        return {}
+
+    @toy.get("/concurrent/{n}")
+    @round_trip_budget(1)
+    async def concurrent(n: int):
+        await asyncio.gather(*(execute(MagicMock()) for _ in range(n)))
+        return {}
+
+    return TestClient(toy)
+
+
+class TestRoundTripTracing:
+    @patch('main.supabase')
+    def test_response_reports_round_trips(self, mock_supabase, round_trips):
+        """Test that the Server-Timing header carries the request's round trips"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {"email": "a@bu.edu", "full_name": "A", "role": "student", "created_events": 0, "registrations": []}
+        ]
+
+        response = client.get("/users/alice")
+
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith("supabase;dur=")
+        assert response.headers["server-timing"].endswith('desc="1 round trips, 1 sequential"')
+        trace = round_trips[-1]
+        assert (trace.route, trace.budget, trace.total, trace.sequential) == ("/users/{user_id}", 1, 1, 1)
+
+    @patch('main.supabase')
+    def test_gathered_queries_count_once(self, mock_supabase, round_trips):
+        """Test that the dashboard's concurrent queries are one sequential step"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+
+        client.get("/users/alice/dashboard")
+
+        trace = round_trips[-1]
+        assert (trace.total, trace.sequential) == (3, 1)
+
+    def test_budget_overrun_fails_the_request(self):
+        """Test that the suite-wide fixture turns an overrun into a failure"""
+        toy = toy_app()
+        assert toy.get("/sequential/2").status_code == 200
+        assert toy.get("/concurrent/8").status_code == 200
+        with pytest.raises(RoundTripBudgetExceeded, match="3 sequential round trips, budget is 2"):
+            toy.get("/sequential/3")
+
+    def test_repeated_sequential_queries_are_reported(self, caplog):
+        """Test that an N+1 loop is logged"""
+        toy = toy_app()
+        n = N_PLUS_ONE_THRESHOLD + 1
+        with caplog.at_level(logging.WARNING, logger="services.tracing"):
+            with pytest.raises(RoundTripBudgetExceeded):
+                toy.get(f"/sequential/{n}")
+
+        assert f"Possible N+1: unknown unknown issued {n} times in a row by GET /sequential/{{n}}" in caplog.text
+        assert "Round-trip budget of 2 exceeded" in caplog.text
+
+    def test_every_supabase_route_declares_a_budget(self):
+        """Test that no endpoint that talks to Supabase goes unbudgeted"""
+        # Reads no rows, or streams an unbounded number of pages
+        unbudgeted = {"/", "/cache/stats", "/metrics", "/events/export"}
+        missing = [
+            route.path for route in app.routes
+            if isinstance(route, APIRoute)
+            and route.path not in unbudgeted
+            and not hasattr(route.endpoint, "round_trip_budget")
+        ]
+        assert missing == []
@@ -18,21 +18,18 @@ export default NextAuth({
       try {
         const googleId = account.providerAccountId;
 
-        const res = await fetch(`${API_BASE}/users/${googleId}`);
-
-        if (res.status === 404) {
-          await fetch(`${API_BASE}/users`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-              id: googleId,
-              name: user.name,
-              email: user.email,
-            }),
-          });
-        }
+        // One idempotent upsert: creates the user on first login,
+        // refreshes name/email afterwards.
+        await fetch(`${API_BASE}/users/${googleId}`, {
+          method: "PUT",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({
+            name: user.name,
+            email: user.email,
+          }),
+        });
       } catch (error) {
-        console.error("Error checking/creating user:", error);
+        console.error("Error saving user:", error);
       }
 
       return true;
@@ -37,38 +37,16 @@ export default function DashboardPage() {
     try {
       setLoading(true);
 
-      // 1. Fetch all events
-      const allEventsRes = await fetch(`${API_BASE}/events`);
-      const allEvents: Event[] = allEventsRes.ok ? await allEventsRes.json() : [];
+      // Profile, stats and both event lists (already sorted by start time) in one request
+      const res = await fetch(`${API_BASE}/users/${userId}/dashboard`);
+      if (!res.ok) throw new Error(`Dashboard request failed: ${res.status}`);
+      const dashboard = await res.json();
 
-      // 2. Fetch user data
-      const userRes = await fetch(`${API_BASE}/users/${userId}`);
-      const userData = userRes.ok ? await userRes.json() : null;
-
-      // 3. Fetch events created by the user
-      const createdRes = await fetch(`${API_BASE}/users/${userId}/created-events`);
-      const createdEvents: Event[] = createdRes.ok ? await createdRes.json() : [];
-
-
-      const interestedRes = await fetch(`${API_BASE}/users/${userId}/interested-events`);
-      const interested: Event[] = interestedRes.ok ? await interestedRes.json() : [];
-      setInterestedEvents(
-        interested.sort((a, b) => new Date(a.start_time).getTime() - new Date(b.start_time).getTime())
-      );
-
-      // 5. Set created events (sorted by date)
-      const sortedCreated = createdEvents.sort(
-        (a, b) => new Date(a.start_time).getTime() - new Date(b.start_time).getTime()
-      );
-      setCreatedEvents(sortedCreated);
-
-      // 6. Set user stats safely
+      setInterestedEvents(dashboard.registered_events ?? []);
+      setCreatedEvents(dashboard.created_events ?? []);
       setUserStats({
-        created_events: userData?.created_events ?? createdEvents.length,
+        created_events: dashboard.stats?.created_events ?? 0,
       });
-
-      
-
     } catch (err) {
       console.error("Dashboard fetch failed:", err);
       message.error("Failed to load dashboard data");
@@ -23,49 +23,16 @@ export default function EventDetailPage() {
   const [userRegisteredEvents, setUserRegisteredEvents] = useState<string[]>([]);
   const [isCreator, setIsCreator] = useState(false);
 
-  // Fetch user's registered events when session is available
   useEffect(() => {
-    if (status === "loading" || !session?.user?.id) return;
-
-    fetch(`${API_BASE}/users/${session.user.id}`)
-      .then(async (res) => {
-        if (!res.ok) {
-          console.warn("Could not fetch user data for registration check");
-          return null;
-        }
-        return res.json();
-      })
-      .then((userData) => {
-        if (userData?.registered_events && Array.isArray(userData.registered_events)) {
-          setUserRegisteredEvents(userData.registered_events);
-        }
-      })
-      .catch((err) => {
-        console.error("Error fetching user registered events:", err);
-      });
-  }, [session, status]);
-
-  useEffect(() => {
-    if (!id) return;
+    if (!id || status === "loading") return;
 
     setLoading(true);
 
-    fetch(`${API_BASE}/events`)
+    // One request for the event, its food items and (when logged in) our registration status
+    const query = session?.user?.id ? `?user_id=${encodeURIComponent(session.user.id)}` : "";
+    fetch(`${API_BASE}/events/${id}${query}`)
       .then(async (res) => (res.ok ? res.json() : null))
-      .then((allEvents) => {
-        if (!allEvents || allEvents.length === 0) {
-          setEvent(null);
-          setLoading(false);
-          return;
-        }
-
-        // Find the specific event by ID - handle both string and number IDs
-        const foundEvent = allEvents.find((evt: any) => {
-          // Try to match as string first, then as number
-          return evt.id.toString() === id || 
-                 parseInt(evt.id) === parseInt(id as string);
-        });
-        
+      .then((foundEvent) => {
         if (!foundEvent) {
           setEvent(null);
         } else {
@@ -78,19 +45,20 @@ export default function EventDetailPage() {
 
           // Check if user is already registered
           if (session?.user?.id) {
-            const eventIdStr = foundEvent.id.toString();
-            const isUserRegistered = userRegisteredEvents.includes(eventIdStr);
-            setIsRegistered(isUserRegistered);
+            setIsRegistered(Boolean(foundEvent.is_registered));
+            if (foundEvent.is_registered) {
+              setUserRegisteredEvents([foundEvent.id.toString()]);
+            }
           }
         }
         setLoading(false);
       })
       .catch((err) => {
-        console.error("Error fetching events:", err);
+        console.error("Error fetching event:", err);
         setEvent(null);
         setLoading(false);
       });
-  }, [id, session, userRegisteredEvents]);
+  }, [id, session, status]);
 
   const handleRegister = async () => {
     if (!session?.user?.id) {
@@ -151,23 +119,7 @@ export default function EventDetailPage() {
         ...prev,
         quantity_left: (quantityLeft - 1).toString(),
       }));
-      
-      // Send notification email using internal notif API
-      try {
-        await fetch("/api/auth/notif", {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({
-            to: session?.user?.email || session?.user?.id,
-            name: session?.user?.name || session?.user?.email || "User",
-            subject: `Registered: ${event.name}`,
-            intro: `You have successfully registered for the event \"${event.name}\".`,
-            content: `Event details:\nDate: ${event.start_time ? new Date(event.start_time).toLocaleString() : 'TBD'}\nLocation: ${event.location_name}`,
-          }),
-        });
-      } catch (notifErr) {
-        console.error("Failed to send notification:", notifErr);
-      }
+      // The confirmation email is queued and sent by the backend
     } catch (err: any) {
       console.error("Registration error:", err);
       message.error(err.message || "Failed to register. Please try again.");
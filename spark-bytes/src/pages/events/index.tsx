@@ -1,12 +1,11 @@
 "use client";
 
 import Link from "next/link";
-import { Row, Col, Spin, Empty, Checkbox, Space } from "antd";
+import { Row, Col, Spin, Empty, Checkbox, Space, Button } from "antd";
 import EventCard from "../../components/eventcard";
 import styles from "../../styles/eventcard.module.css";
 import Layout from "../../components/layout";
-import { useEffect, useState } from "react";
-import dayjs from "dayjs";
+import { useEffect, useRef, useState } from "react";
 import { API_BASE } from "../../lib/api";
 
 export default function EventsPage() {
@@ -15,48 +14,57 @@ export default function EventsPage() {
   const [filterOngoing, setFilterOngoing] = useState(false);
   const [filterKosher, setFilterKosher] = useState(false);
   const [filterHalal, setFilterHalal] = useState(false);
+  // Cursor for the page after the loaded ones (X-Next-Cursor); null when all are loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Bumped whenever the filters change, so in-flight loads can tell they are stale
+  const filterGeneration = useRef(0);
+
+  // Filtering happens on the server; ended events are always excluded.
+  const filterParams = () => {
+    const params = new URLSearchParams({ window: filterOngoing ? "now" : "active" });
+    if (filterKosher) params.set("is_kosher", "true");
+    if (filterHalal) params.set("is_halal", "true");
+    return params;
+  };
+
+  const fetchPage = async (params: URLSearchParams) => {
+    const res = await fetch(`${API_BASE}/events?${params.toString()}`);
+    return { data: await res.json(), cursor: res.headers.get("X-Next-Cursor") };
+  };
 
   useEffect(() => {
-    fetch(`${API_BASE}/events`)
-      .then((res) => res.json())
-      .then((data) => {
+    let stale = false;
+    filterGeneration.current += 1;
+    fetchPage(filterParams())
+      .then(({ data, cursor }) => {
+        if (stale) return;
         setEvents(data);
+        setNextCursor(cursor);
         setLoading(false);
       })
       .catch((err) => {console.log("Error fetching events:", err); setLoading(false);});
       // TODO: handle CORS error properly
-  }, []);
-
-  const filteredEvents = events.filter((event) => {
-    let pass = true;
-
-    // Ignore events already ended
-    const now = dayjs();
-    const end = dayjs(event.end_time);
-    if (end.isValid() && end.isBefore(now)) {
-      return false;
-    }
+    // Responses for filters the user has since changed are dropped
+    return () => { stale = true; };
+  }, [filterOngoing, filterKosher, filterHalal]);
 
-    if (filterOngoing) {
-      const start = dayjs(event.start_time);
-      const endOngoing = dayjs(event.end_time);
-      if (start.isValid() && endOngoing.isValid()) {
-        pass = pass && now.isAfter(start) && now.isBefore(endOngoing);
-      }
-    }
-
-    if (filterKosher) {
-      const foodItems = event.food_items || [];
-      pass = pass && foodItems.some((f: any) => f.is_kosher === true);
-    }
-
-    if (filterHalal) {
-      const foodItems = event.food_items || [];
-      pass = pass && foodItems.some((f: any) => f.is_halal === true);
-    }
-
-    return pass;
-  });
+  const loadMore = () => {
+    if (!nextCursor) return;
+    const params = filterParams();
+    params.set("cursor", nextCursor);
+    const generation = filterGeneration.current;
+    setLoadingMore(true);
+    fetchPage(params)
+      .then(({ data, cursor }) => {
+        // A page for filters the user has since changed would mix result sets
+        if (generation !== filterGeneration.current) return;
+        setEvents((loaded) => [...loaded, ...data]);
+        setNextCursor(cursor);
+      })
+      .catch((err) => console.log("Error fetching more events:", err))
+      .finally(() => setLoadingMore(false));
+  };
 
   if (loading) return <p>Loading...</p>;
 
@@ -79,14 +87,14 @@ export default function EventsPage() {
         </div>
         {loading ? (
           <Spin size="large" />
-        ) : filteredEvents.length === 0 ? (
+        ) : events.length === 0 ? (
           <Empty description="No events available" />
         ) : (
         <Row gutter={[16, 16]}>
-  {filteredEvents.length === 0 ? (
+  {events.length === 0 ? (
     <Empty description="No events available" />
   ) : (
-    filteredEvents.map((event) => (
+    events.map((event) => (
       <Col xs={24} sm={12} md={8} key={event.id}>
         <Link href={`/events/${event.id}`} style={{ textDecoration: "none" }}>
           <EventCard
@@ -103,6 +111,13 @@ export default function EventsPage() {
   )}
 </Row>
       )}
+        {nextCursor && (
+          <div style={{ textAlign: "center", marginTop: 24 }}>
+            <Button onClick={loadMore} loading={loadingMore}>
+              Load more events
+            </Button>
+          </div>
+        )}
       </div>
     </Layout>
   );